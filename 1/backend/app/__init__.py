@@ -1,5 +1,4 @@
-# 简化版后端 - 使用内存存储，无需数据库
-from . import simple_storage, schemas
-
-__all__ = ["simple_storage", "schemas"]
+# 后端 - 路由通过 crud 访问数据库
+from . import schemas
 
+__all__ = ["schemas"]
@@ -1,10 +1,13 @@
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
-from . import simple_storage
+from . import crud, passwords
+from .database import get_db
 
 # JWT 配置
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-here-change-in-production")
@@ -25,13 +28,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# 密码校验结果缓存（进程内）
+_password_cache = passwords.VerificationCache()
+
+# 密码哈希（KDF 计算较慢，放到线程池执行，不阻塞事件循环）
+async def get_password_hash(password: str) -> str:
+    return await run_in_threadpool(passwords.hash_password, password)
+
 # 验证用户
-def authenticate_user(username: str, password: str):
-    """验证用户凭据"""
-    return simple_storage.authenticate_user(username, password)
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    """验证用户凭据；旧格式或参数过时的哈希在登录成功时升级"""
+    user = await crud.get_user_by_username(db, username)
+    if not user:
+        return None
+    stored_hash = user.hashed_password
+    if not await run_in_threadpool(_password_cache.verify, password, stored_hash):
+        return None
+    if passwords.needs_rehash(stored_hash):
+        new_hash = await get_password_hash(password)
+        if await crud.update_password_hash(db, user.id, stored_hash, new_hash):
+            _password_cache.remember(password, new_hash)
+    return user
 
 # 获取当前用户
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security),
+                           db: AsyncSession = Depends(get_db)):
     """依赖函数：验证 JWT token 并返回当前用户"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,18 +67,18 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         if username is None:
             raise credentials_exception
         
-    except jwt.PyJWTError:
+    except JWTError:
         raise credentials_exception
     
-    # 从内存存储获取用户
-    user = simple_storage.get_user_by_username(username)
+    # 从数据库获取用户
+    user = await crud.get_user_by_username(db, username)
     if user is None:
         raise credentials_exception
     
     # 返回用户数据（排除敏感信息）
     return {
-        "id": user["id"],
-        "username": user["username"],
-        "points": user["points"],
-        "created_at": user["created_at"]
+        "id": user.id,
+        "username": user.username,
+        "points": user.points,
+        "created_at": user.created_at
     }
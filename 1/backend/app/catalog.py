@@ -0,0 +1,84 @@
+"""
+道具目录缓存
+道具定义很少变化，但商店页面和每次购买都要读取：启动时整体加载到内存，
+之后的查询不再访问数据库；crud.create_item 写入新道具后调用 invalidate，下次读取时重新加载。
+（缓存是进程内的，多进程部署时每个进程各自加载）
+"""
+import asyncio
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .models import Item
+
+
+class CatalogSnapshot:
+    """某一时刻的道具目录（只读）"""
+    __slots__ = ("items", "by_name", "by_effect", "etag")
+
+    def __init__(self, items: List[Dict]):
+        self.items = items
+        self.by_name = {item["name"]: item for item in items}
+        # 同一效果有多个道具时取 id 最小的
+        self.by_effect: Dict[str, Dict] = {}
+        for item in items:
+            self.by_effect.setdefault(item["effect"], item)
+        payload = json.dumps(items, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        self.etag = '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+
+class ItemCatalog:
+    """道具目录的进程内缓存"""
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        # 每次 invalidate 加一；加载期间目录被改动时丢弃这次加载的结果
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """道具定义变化后调用，下次读取时重新加载"""
+        self._generation += 1
+        self._snapshot = None
+
+    async def load(self, db: AsyncSession) -> CatalogSnapshot:
+        """从数据库加载整个目录"""
+        generation = self._generation
+        rows = (await db.scalars(select(Item).order_by(Item.id))).all()
+        snapshot = CatalogSnapshot([
+            {
+                "id": item.id,
+                "name": item.name,
+                "description": item.description,
+                "cost": item.cost,
+                "effect": item.effect
+            }
+            for item in rows
+        ])
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    async def snapshot(self, db: AsyncSession) -> CatalogSnapshot:
+        """当前目录；未加载或已失效时加载一次（并发请求只会触发一次查询）"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        async with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            return await self.load(db)
+
+    async def get_items(self, db: AsyncSession) -> Tuple[List[Dict], str]:
+        """返回 (道具列表, ETag)"""
+        snapshot = await self.snapshot(db)
+        return snapshot.items, snapshot.etag
+
+    async def get(self, db: AsyncSession, key: str) -> Optional[Dict]:
+        """按道具名称或效果类型（如 "delay"）查找道具"""
+        snapshot = await self.snapshot(db)
+        return snapshot.by_name.get(key) or snapshot.by_effect.get(key)
+
+
+catalog = ItemCatalog()
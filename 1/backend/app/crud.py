@@ -1,93 +1,187 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, asc
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import select, insert, update, delete, func, literal, desc, asc, true, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .catalog import catalog
 from .models import User, GameResult, Item, UserItem
-from .schemas import UserCreate, GameResultCreate, UserUpdate, ItemCreate, UserItemCreate
+from .schemas import UserCreate, GameResultCreate, ItemCreate
+
+# 排行榜排序字段
+LEADERBOARD_COLUMNS = {"time": GameResult.time_seconds, "steps": GameResult.steps}
 
 # 用户相关函数
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email))
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(User).where(User.username == username))
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    return await db.get(User, user_id)
+
+async def count_users(db: AsyncSession) -> int:
+    return await db.scalar(select(func.count(User.id)))
+
+async def create_user(db: AsyncSession, user: UserCreate, hashed_password: str, max_users: Optional[int] = None):
+    """
+    创建用户；用户名已存在或用户数已达 max_users 时返回 None。
+    人数检查写在同一条 INSERT ... SELECT ... WHERE 里，并发注册不会超出上限。
+    """
+    values = select(literal(user.username), literal(hashed_password), literal(0), literal(datetime.utcnow()))
+    if max_users is not None:
+        values = values.where(select(func.count(User.id)).scalar_subquery() < max_users)
+    stmt = insert(User).from_select(["username", "hashed_password", "points", "created_at"], values)
+    try:
+        result = await db.execute(stmt)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+    if result.rowcount == 0:
+        return None
+    return await get_user_by_username(db, user.username)
+
+async def update_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """仅当哈希仍是 old_hash 时替换（并发登录只会有一个升级生效）"""
+    result = await db.execute(
+        update(User)
+        .where(User.id == user_id, User.hashed_password == old_hash)
+        .values(hashed_password=new_hash)
+    )
+    await db.commit()
+    return result.rowcount > 0
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def _update_returning(db: AsyncSession, stmt, column, *key):
+    """
+    执行一条 UPDATE 并返回 column 更新后的值，未命中任何行时返回 None。
+    支持 UPDATE ... RETURNING 的数据库（SQLite、PostgreSQL）一次往返；
+    MySQL 不支持，在提交前于同一事务内按 key 条件读回（被更新的行已加锁，读到的就是本次更新后的值）。
+    """
+    if db.bind.dialect.update_returning:
+        return await db.scalar(stmt.returning(column))
+    result = await db.execute(stmt)
+    if result.rowcount == 0:
+        return None
+    return await db.scalar(select(column).where(*key))
 
-def get_user_by_id(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
+async def update_user_points(db: AsyncSession, user_id: int, points: int) -> Optional[int]:
+    """更新用户积分（单条 UPDATE，不会丢失并发更新），返回新积分"""
+    new_points = await _update_returning(
+        db, update(User).where(User.id == user_id).values(points=User.points + points), User.points, User.id == user_id
+    )
+    await db.commit()
+    return new_points
 
-def create_user(db: Session, user: UserCreate, hashed_password: str):
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password
+async def spend_points(db: AsyncSession, user_id: int, cost: int) -> Optional[int]:
+    """积分足够时扣除并返回剩余积分，否则返回 None（检查与扣除在同一条 UPDATE 内）"""
+    remaining = await _update_returning(
+        db,
+        update(User).where(User.id == user_id, User.points >= cost).values(points=User.points - cost),
+        User.points,
+        User.id == user_id
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
-def update_user_points(db: Session, user_id: int, points: int):
-    """更新用户积分"""
-    db_user = get_user_by_id(db, user_id)
-    if db_user:
-        db_user.points += points
-        db.commit()
-        db.refresh(db_user)
-    return db_user
+    await db.commit()
+    return remaining
 
 # 游戏结果相关函数
-def create_game_result(db: Session, result: GameResultCreate, user_id: int):
-    """创建游戏结果（关联用户ID）"""
+async def create_game_result(db: AsyncSession, result: GameResultCreate, user_id: int, award_points: int = 0):
+    """创建游戏结果（关联用户ID），award_points 在同一事务内加到用户积分上"""
     db_result = GameResult(
         game_mode=result.game_mode,
         time_seconds=result.time_seconds,
         steps=result.steps,
-        score=result.score,
+        score=result.score or 0,
         user_id=user_id
     )
     db.add(db_result)
-    db.commit()
-    db.refresh(db_result)
+    if award_points:
+        await db.execute(update(User).where(User.id == user_id).values(points=User.points + award_points))
+    await db.commit()
     return db_result
 
-def get_user_game_history(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    """查询指定用户的游戏历史（支持分页）"""
-    return db.query(GameResult).filter(
-        GameResult.user_id == user_id
-    ).order_by(desc(GameResult.created_at)).offset(skip).limit(limit).all()
+async def get_user_game_history(db: AsyncSession, user_id: int, limit: int = 100,
+                                before: Optional[Tuple[datetime, int]] = None) -> List[GameResult]:
+    """
+    查询指定用户的游戏历史（按 (created_at, id) 倒序，键集分页）
+    before 为上一页最后一条记录的 (created_at, id)，本页从它之后开始；走 (user_id, created_at, id) 索引。
+    """
+    query = select(GameResult).where(GameResult.user_id == user_id)
+    if before is not None:
+        query = query.where(tuple_(GameResult.created_at, GameResult.id) < tuple_(*before))
+    rows = await db.scalars(
+        query.order_by(desc(GameResult.created_at), desc(GameResult.id)).limit(limit)
+    )
+    return rows.all()
+
+async def get_leaderboard(db: AsyncSession, game_mode: Optional[str] = None, limit: int = 10,
+                          sort_by: str = "time", after: Optional[Tuple[int, int]] = None) -> List[Tuple[GameResult, str]]:
+    """
+    排行榜：返回 (游戏结果, 用户名) 列表，sort_by 为 "time" 或 "steps"，相同成绩先提交的靠前
+    after 为上一页最后一条的 (成绩, id)，用于键集分页。
+    """
+    column = LEADERBOARD_COLUMNS.get(sort_by, GameResult.time_seconds)
+    query = select(GameResult, User.username).join(User, GameResult.user_id == User.id)
+    if game_mode:
+        query = query.where(GameResult.game_mode == game_mode)
+    if after is not None:
+        query = query.where(tuple_(column, GameResult.id) > tuple_(*after))
+    rows = await db.execute(query.order_by(asc(column), asc(GameResult.id)).limit(limit))
+    return rows.all()
 
-def get_user_best_records(db: Session, user_id: int, game_mode: str = None):
-    """获取用户最佳记录（最快时间、最少步数）"""
-    query = db.query(GameResult).filter(GameResult.user_id == user_id)
-    
+async def get_user_best_records(db: AsyncSession, user_id: int, game_mode: str = None):
+    """
+    获取用户最佳记录（最快时间、最少步数）
+    一条 SQL 完成：两个 ORDER BY ... LIMIT 1 子查询各走 (user_id, game_mode, 字段) 索引取最小值，
+    成绩相同时取更早的记录；总局数用 COUNT 统计，不把记录加载成 ORM 对象。
+    """
+    filters = [GameResult.user_id == user_id]
     if game_mode:
-        query = query.filter(GameResult.game_mode == game_mode)
-    
-    results = query.all()
-    
-    if not results:
+        filters.append(GameResult.game_mode == game_mode)
+
+    def best_by(column):
+        return (
+            select(column.label("value"), GameResult.created_at.label("created_at"))
+            .where(*filters)
+            .order_by(asc(column), asc(GameResult.created_at), asc(GameResult.id))
+            .limit(1)
+            .subquery()
+        )
+
+    fastest = best_by(GameResult.time_seconds)
+    fewest = best_by(GameResult.steps)
+    total = select(func.count(GameResult.id)).where(*filters).scalar_subquery()
+
+    row = (await db.execute(
+        select(fastest.c.value, fastest.c.created_at, fewest.c.value, fewest.c.created_at, total)
+        .select_from(fastest)
+        .join(fewest, true())
+    )).first()
+
+    if row is None:
         return None
-    
-    # 计算最佳记录
-    fastest_time = min(results, key=lambda x: x.time_seconds)
-    fewest_steps = min(results, key=lambda x: x.steps)
-    
+
     return {
-        "fastest_time": fastest_time.time_seconds,
-        "fastest_time_date": fastest_time.created_at,
-        "fewest_steps": fewest_steps.steps,
-        "fewest_steps_date": fewest_steps.created_at,
-        "total_games": len(results)
+        "fastest_time": row[0],
+        "fastest_time_date": row[1],
+        "fewest_steps": row[2],
+        "fewest_steps_date": row[3],
+        "total_games": row[4]
     }
 
 # 道具相关函数
-def get_all_items(db: Session):
-    """获取所有可用道具"""
-    return db.query(Item).all()
+async def get_all_items(db: AsyncSession):
+    """获取所有可用道具（直接查询数据库；接口中使用 catalog 的缓存）"""
+    return (await db.scalars(select(Item))).all()
 
-def get_item_by_name(db: Session, name: str):
+async def get_item_by_name(db: AsyncSession, name: str):
     """根据名称获取道具"""
-    return db.query(Item).filter(Item.name == name).first()
+    return await db.scalar(select(Item).where(Item.name == name))
 
-def create_item(db: Session, item: ItemCreate):
+async def create_item(db: AsyncSession, item: ItemCreate):
     """创建新道具"""
     db_item = Item(
         name=item.name,
@@ -96,69 +190,78 @@ def create_item(db: Session, item: ItemCreate):
         effect=item.effect
     )
     db.add(db_item)
-    db.commit()
-    db.refresh(db_item)
+    await db.commit()
+    # 道具目录缓存失效，下次读取时重新加载
+    catalog.invalidate()
     return db_item
 
-def purchase_item(db: Session, user_id: int, item_id: int):
-    """购买道具（消耗积分）"""
-    # 获取道具信息
-    item = db.query(Item).filter(Item.id == item_id).first()
-    if not item:
+def _upsert_user_item(db: AsyncSession, user_id: int, item_id: int):
+    """插入一行数量为 1 的用户道具，已存在时数量加一（按数据库方言生成 upsert 语句）"""
+    dialect = db.bind.dialect.name
+    values = {"user_id": user_id, "item_id": item_id, "quantity": 1}
+    if dialect == "mysql":
+        stmt = mysql_insert(UserItem).values(**values)
+        return stmt.on_duplicate_key_update(quantity=UserItem.quantity + 1)
+    stmt = (postgresql_insert if dialect == "postgresql" else sqlite_insert)(UserItem).values(**values)
+    return stmt.on_conflict_do_update(
+        index_elements=[UserItem.user_id, UserItem.item_id],
+        set_={"quantity": UserItem.quantity + 1}
+    )
+
+async def purchase_item(db: AsyncSession, user_id: int, item_id: int) -> Optional[Tuple[UserItem, int]]:
+    """
+    购买道具（消耗积分），返回 (用户道具, 剩余积分)；积分不足、用户或道具不存在时返回 None
+    不预先读取用户和道具：扣分是一条带 points >= 价格 条件的 UPDATE（价格用子查询取），
+    成功后 upsert 用户道具数量，两条语句在同一事务内，并发购买不会重复扣分或丢失数量。
+    """
+    cost = select(Item.cost).where(Item.id == item_id).scalar_subquery()
+    remaining = await _update_returning(
+        db,
+        update(User).where(User.id == user_id, User.points >= cost).values(points=User.points - cost),
+        User.points,
+        User.id == user_id
+    )
+    if remaining is None:
+        await db.rollback()
         return None
-    
-    # 获取用户信息
-    user = get_user_by_id(db, user_id)
-    if not user or user.points < item.cost:
-        return None  # 积分不足
-    
-    # 检查是否已有该道具
-    user_item = db.query(UserItem).filter(
-        UserItem.user_id == user_id,
-        UserItem.item_id == item_id
-    ).first()
-    
-    if user_item:
-        # 增加数量
-        user_item.quantity += 1
+
+    upsert = _upsert_user_item(db, user_id, item_id)
+    if db.bind.dialect.insert_returning:
+        user_item = await db.scalar(upsert.returning(UserItem), execution_options={"populate_existing": True})
     else:
-        # 创建新的用户道具记录
-        user_item = UserItem(
-            user_id=user_id,
-            item_id=item_id,
-            quantity=1
-        )
-        db.add(user_item)
-    
-    # 扣除积分
-    user.points -= item.cost
-    
-    db.commit()
-    db.refresh(user_item)
-    return user_item
-
-def get_user_items(db: Session, user_id: int):
+        # MySQL 不支持 RETURNING，提交前在同一事务内读回
+        await db.execute(upsert)
+        user_item = await db.scalar(select(UserItem).where(
+            UserItem.user_id == user_id,
+            UserItem.item_id == item_id
+        ).execution_options(populate_existing=True))
+    await db.commit()
+    return user_item, remaining
+
+async def get_user_items(db: AsyncSession, user_id: int):
     """获取用户拥有的所有道具"""
-    return db.query(UserItem).filter(UserItem.user_id == user_id).all()
+    return (await db.scalars(select(UserItem).where(UserItem.user_id == user_id))).all()
 
-def use_item(db: Session, user_id: int, item_name: str):
-    """使用道具"""
-    item = get_item_by_name(db, item_name)
+async def use_item(db: AsyncSession, user_id: int, item_name: str):
+    """使用道具（数量大于 0 时原子地减一，用完删除该行），返回道具目录中的道具信息"""
+    item = await catalog.get(db, item_name)
     if not item:
         return None
-    
-    user_item = db.query(UserItem).filter(
-        UserItem.user_id == user_id,
-        UserItem.item_id == item.id
-    ).first()
-    
-    if not user_item or user_item.quantity <= 0:
+
+    owned = (UserItem.user_id == user_id, UserItem.item_id == item["id"])
+    remaining = await _update_returning(
+        db,
+        update(UserItem).where(*owned, UserItem.quantity > 0).values(quantity=UserItem.quantity - 1),
+        UserItem.quantity,
+        *owned
+    )
+    if remaining is None:
+        await db.rollback()
         return None
-    
-    # 减少道具数量
-    user_item.quantity -= 1
-    if user_item.quantity == 0:
-        db.delete(user_item)
-    
-    db.commit()
-    return item
\ No newline at end of file
+
+    if remaining == 0:
+        # 条件里再检查一次数量，避免删掉并发购买刚加回来的道具
+        await db.execute(delete(UserItem).where(*owned, UserItem.quantity <= 0))
+
+    await db.commit()
+    return item
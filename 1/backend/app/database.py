@@ -1,72 +1,183 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
 from .config import Config
 
-# 创建数据库引擎 - 为SQLite配置连接池
-engine = create_engine(
-    Config.SQLALCHEMY_DATABASE_URI,
-    connect_args={"check_same_thread": False},  # SQLite特定配置
-    poolclass=None  # 禁用连接池，避免SQLite线程安全问题
-)
+# 同步驱动 URL -> 对应的异步驱动
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+}
 
-# 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def to_async_url(url: str) -> str:
+    """把 sqlite:///、postgresql:// 等同步 URL 转换为异步驱动的 URL（已是异步驱动则原样返回）"""
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def is_sqlite_memory(url: str) -> bool:
+    """sqlite://、sqlite:///:memory: 或 mode=memory 的内存库"""
+    path = url.partition("://")[2].lstrip("/")
+    return path == "" or path.startswith(":memory:") or "mode=memory" in path
+
+
+def engine_options(url: str) -> dict:
+    """
+    按方言选择连接池参数：服务器数据库使用可调大小的队列连接池；
+    SQLite 文件库使用驱动默认的连接池，内存库只能共用一个连接（StaticPool），
+    二者都不接受 pool_size / max_overflow / pool_timeout。
+    """
+    if url.startswith("sqlite"):
+        if is_sqlite_memory(url):
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        return {"pool_pre_ping": True}
+    return {
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+DATABASE_URL = to_async_url(Config.SQLALCHEMY_DATABASE_URI)
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# 创建异步数据库引擎，服务器数据库的连接池大小可通过环境变量调整
+engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+
+if IS_SQLITE:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record):
+        # WAL 允许读写并发；busy_timeout 让并发写入排队等待而不是立即报 database is locked
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={Config.DB_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+# 创建会话工厂（提交后对象仍可读取，避免在响应序列化时触发额外查询）
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # 创建基础模型类
 Base = declarative_base()
 
-# 数据库依赖函数
-def get_db():
-    db = SessionLocal()
-    try:
+# 数据库依赖函数：每个请求一个会话，请求结束时归还连接
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def _drop_legacy_tables(sync_conn):
+    """
+    早期版本的 users.email 为 NOT NULL，简化版注册没有邮箱。
+    旧库中还没有用户时直接重建相关表；已有用户则提示手动处理。
+    """
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("users"):
+        return
+    email = next((c for c in inspector.get_columns("users") if c["name"] == "email"), None)
+    if email is None or email["nullable"]:
+        return
+    if sync_conn.execute(text("SELECT COUNT(*) FROM users")).scalar():
+        print("警告: users.email 仍为 NOT NULL，注册会失败；请备份后删除数据库文件重新创建")
+        return
+    for table in ("user_items", "game_results", "users"):
+        sync_conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    print("已重建旧版用户表")
+
+
+def _merge_duplicate_user_items(sync_conn):
+    """
+    旧库的 user_items 没有 (user_id, item_id) 唯一索引，同一用户同一道具可能有多行；
+    补建唯一索引前把数量合并到 id 最小的一行，删除其余各行。
+    """
+    inspector = inspect(sync_conn)
+    if not inspector.has_table("user_items"):
+        return
+    if any(index["name"] == "uq_user_items_user_item" for index in inspector.get_indexes("user_items")):
+        return
+    duplicates = sync_conn.execute(text(
+        "SELECT user_id, item_id, MIN(id), SUM(quantity) FROM user_items "
+        "GROUP BY user_id, item_id HAVING COUNT(*) > 1"
+    )).all()
+    for user_id, item_id, keep_id, quantity in duplicates:
+        sync_conn.execute(text("UPDATE user_items SET quantity = :quantity WHERE id = :id"),
+                          {"quantity": quantity, "id": keep_id})
+        sync_conn.execute(text("DELETE FROM user_items WHERE user_id = :user_id AND item_id = :item_id AND id <> :id"),
+                          {"user_id": user_id, "item_id": item_id, "id": keep_id})
+    if duplicates:
+        print(f"已合并 {len(duplicates)} 组重复的用户道具记录")
+
+
+def _create_schema(sync_conn):
+    _drop_legacy_tables(sync_conn)
+    _merge_duplicate_user_items(sync_conn)
+    Base.metadata.create_all(sync_conn)
+    # create_all 不会给已存在的表补建索引，这里逐个检查
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+# 初始道具；effect 为 "delay"/"block" 的两项对应游戏客户端 buy_item 使用的道具类型
+INITIAL_ITEMS = [
+    {
+        "name": "增时器",
+        "description": "为困难模式增加60秒时间",
+        "cost": 15,
+        "effect": "time_extension"
+    },
+    {
+        "name": "翻牌器",
+        "description": "直接翻开一张卡片，无需配对",
+        "cost": 10,
+        "effect": "instant_flip"
+    },
+    {
+        "name": "提示器",
+        "description": "高亮显示一对匹配的卡片",
+        "cost": 12,
+        "effect": "hint"
+    },
+    {
+        "name": "连击加成",
+        "description": "下一次匹配获得双倍积分",
+        "cost": 20,
+        "effect": "double_score"
+    },
+    {
+        "name": "延时道具",
+        "description": "为动态迷宫模式增加5秒时间",
+        "cost": 10,
+        "effect": "delay"
+    },
+    {
+        "name": "阻挡道具",
+        "description": "一段时间内阻止未配对的卡片重新打乱",
+        "cost": 15,
+        "effect": "block"
+    }
+]
+
 
 # 初始化数据库表
-def init_db():
-    from .models import User, GameResult, Item, UserItem
-    Base.metadata.create_all(bind=engine)
-    
-    # 创建一些初始道具
-    db = SessionLocal()
-    try:
-        # 检查是否已有道具数据
-        items_count = db.query(Item).count()
-        if items_count == 0:
-            initial_items = [
-                {
-                    "name": "增时器",
-                    "description": "为困难模式增加60秒时间",
-                    "cost": 15,
-                    "effect": "time_extension"
-                },
-                {
-                    "name": "翻牌器",
-                    "description": "直接翻开一张卡片，无需配对",
-                    "cost": 10,
-                    "effect": "instant_flip"
-                },
-                {
-                    "name": "提示器",
-                    "description": "高亮显示一对匹配的卡片",
-                    "cost": 12,
-                    "effect": "hint"
-                },
-                {
-                    "name": "连击加成",
-                    "description": "下一次匹配获得双倍积分",
-                    "cost": 20,
-                    "effect": "double_score"
-                }
-            ]
-            
-            for item_data in initial_items:
-                item = Item(**item_data)
-                db.add(item)
-            
-            db.commit()
-            print("已创建初始道具数据")
-    finally:
-        db.close()
\ No newline at end of file
+async def init_db():
+    from .models import Item
+
+    async with engine.begin() as conn:
+        await conn.run_sync(_create_schema)
+
+    # 创建初始道具（按名称补齐缺少的道具，已有的道具不会被修改）
+    async with AsyncSessionLocal() as db:
+        existing = set((await db.scalars(select(Item.name))).all())
+        missing = [item_data for item_data in INITIAL_ITEMS if item_data["name"] not in existing]
+        if missing:
+            db.add_all(Item(**item_data) for item_data in missing)
+            await db.commit()
+            print(f"已创建初始道具数据（{len(missing)} 个）")
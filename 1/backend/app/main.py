@@ -1,13 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from .catalog import catalog
+from .database import AsyncSessionLocal, engine, init_db
 from .routes.auth import router as auth_router
 from .routes.game import router as game_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时建表、写入初始数据并加载道具目录，关闭时释放连接池
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        await catalog.load(db)
+    yield
+    await engine.dispose()
+
 # 初始化FastAPI应用
-app = FastAPI(title="Card Game Backend (Simplified)")
+app = FastAPI(title="Card Game Backend", lifespan=lifespan)
 
-# 注册路由
-app.include_router(auth_router, prefix="/auth", tags=["认证"])
-app.include_router(game_router, prefix="/game", tags=["游戏"])
+# 注册路由（路径前缀 /auth、/game 在各自的 APIRouter 中定义）
+app.include_router(auth_router, tags=["认证"])
+app.include_router(game_router, tags=["游戏"])
 
 @app.get("/health")
 def health_check():
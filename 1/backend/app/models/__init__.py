@@ -1,5 +1,5 @@
 from ..database import Base
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, Index
 from sqlalchemy.orm import relationship
 import datetime
 
@@ -9,7 +9,7 @@ class User(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
-    email = Column(String(100), unique=True, index=True, nullable=False)
+    email = Column(String(100), unique=True, index=True, nullable=True)  # 简化版注册不需要邮箱
     hashed_password = Column(String(255), nullable=False)
     points = Column(Integer, default=0)  # 用户积分
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
@@ -34,6 +34,18 @@ class GameResult(Base):
     # 反向关联用户
     user = relationship("User", back_populates="game_results")
 
+    __table_args__ = (
+        # 最佳记录查询：按用户和模式过滤后直接取索引中最小的一条
+        Index("ix_game_results_user_mode_time", "user_id", "game_mode", "time_seconds"),
+        Index("ix_game_results_user_mode_steps", "user_id", "game_mode", "steps"),
+        # 键集分页：历史记录按 (created_at, id) 倒序，排行榜按 (成绩, id) 正序，索引与排序键一致
+        Index("ix_game_results_user_created", "user_id", "created_at", "id"),
+        Index("ix_game_results_mode_time", "game_mode", "time_seconds", "id"),
+        Index("ix_game_results_mode_steps", "game_mode", "steps", "id"),
+        Index("ix_game_results_time", "time_seconds", "id"),
+        Index("ix_game_results_steps", "steps", "id"),
+    )
+
 # 道具定义模型
 class Item(Base):
     __tablename__ = "items"
@@ -60,4 +72,9 @@ class UserItem(Base):
     
     # 反向关联
     user = relationship("User", back_populates="user_items")
-    item = relationship("Item", back_populates="user_items")
\ No newline at end of file
+    item = relationship("Item", back_populates="user_items")
+
+    # 每个用户每种道具只有一行（购买时按此约束做 upsert）；用唯一索引实现，init_db 可以补建到已有的表上
+    __table_args__ = (
+        Index("uq_user_items_user_item", "user_id", "item_id", unique=True),
+    )
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+键集分页（keyset pagination）游标
+游标记录上一页最后一行的排序键（如 (created_at, id)），下一页用 WHERE (排序键) > 游标 直接从索引定位，
+不像 OFFSET 那样需要先扫描并丢弃前面的所有行，翻到多深都是同样的开销。
+游标对客户端是不透明的字符串（JSON 经 urlsafe base64 编码）。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+
+
+class InvalidCursor(ValueError):
+    """游标格式错误或与当前查询不匹配"""
+
+
+def encode_cursor(*values: Any) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], length: int) -> Optional[List[Any]]:
+    """解码游标，返回长度为 length 的值列表；cursor 为空时返回 None"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor("无效的分页游标") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor("无效的分页游标")
+    return values
+
+
+def parse_datetime(value: Any) -> datetime:
+    if not isinstance(value, str):
+        raise InvalidCursor("无效的分页游标")
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise InvalidCursor("无效的分页游标") from e
+
+
+def parse_int(value: Any) -> int:
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise InvalidCursor("无效的分页游标")
+    return value
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from datetime import timedelta
-from .. import schemas, simple_storage
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, crud
+from ..config import Config
+from ..database import get_db
 from ..auth import (
     get_current_user,
+    get_password_hash,
     create_access_token,
     authenticate_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
@@ -11,24 +15,25 @@ from ..auth import (
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: schemas.UserCreate):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
     """用户注册接口（简化版，无邮箱）"""
     # 检查用户数量限制
-    if len(simple_storage.users) >= simple_storage.MAX_USERS:
+    if await crud.count_users(db) >= Config.MAX_USERS:
         raise HTTPException(
             status_code=400,
-            detail=f"用户数量已达上限（最多{simple_storage.MAX_USERS}人）"
+            detail=f"用户数量已达上限（最多{Config.MAX_USERS}人）"
         )
     
     # 检查用户名是否已存在
-    if simple_storage.get_user_by_username(user.username):
+    if await crud.get_user_by_username(db, user.username):
         raise HTTPException(
             status_code=400,
             detail="用户名已存在"
         )
     
-    # 创建新用户
-    new_user = simple_storage.create_user(user.username, user.password)
+    # 创建新用户（插入时会再次原子地检查人数和用户名，并发注册同样安全）
+    hashed_password = await get_password_hash(user.password)
+    new_user = await crud.create_user(db, user, hashed_password, max_users=Config.MAX_USERS)
     if not new_user:
         raise HTTPException(
             status_code=400,
@@ -37,17 +42,17 @@ def register(user: schemas.UserCreate):
     
     # 返回用户数据（排除敏感信息）
     return {
-        "id": new_user["id"],
-        "username": new_user["username"],
-        "points": new_user["points"],
-        "created_at": new_user["created_at"]
+        "id": new_user.id,
+        "username": new_user.username,
+        "points": new_user.points,
+        "created_at": new_user.created_at
     }
 
 @router.post("/login", response_model=schemas.Token)
-def login(user_credentials: schemas.UserLogin):
+async def login(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(get_db)):
     """用户登录"""
-    # 验证用户凭据
-    user = authenticate_user(user_credentials.username, user_credentials.password)
+    # 验证用户凭据（密码 KDF 计算在线程池中进行，不阻塞事件循环）
+    user = await authenticate_user(db, user_credentials.username, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,12 +63,12 @@ def login(user_credentials: schemas.UserLogin):
     # 创建访问令牌
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user["username"]}, expires_delta=access_token_expires
+        data={"sub": user.username}, expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=schemas.UserResponse)
-def read_users_me(current_user = Depends(get_current_user)):
+async def read_users_me(current_user = Depends(get_current_user)):
     """获取当前用户信息"""
     return current_user
@@ -1,105 +1,184 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Literal, Optional
 from datetime import datetime
-from .. import schemas, simple_storage
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, crud
 from ..auth import get_current_user
+from ..catalog import catalog
+from ..database import get_db
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor, parse_datetime, parse_int
 
 router = APIRouter(prefix="/game", tags=["game"])
 
+def result_to_dict(result, username: str):
+    """游戏结果转换为响应格式"""
+    return {
+        "id": result.id,
+        "username": username,
+        "game_mode": result.game_mode,
+        "time_seconds": result.time_seconds,
+        "steps": result.steps,
+        "score": result.score or 0,
+        "created_at": result.created_at
+    }
+
 @router.post("/upload_result", response_model=schemas.GameResultResponse)
-async def upload_game_result(result: schemas.GameResultCreate):
+async def upload_game_result(result: schemas.GameResultCreate, db: AsyncSession = Depends(get_db)):
     """上传游戏结果"""
     # 检查用户是否存在
-    user = simple_storage.get_user_by_username(result.username)
+    user = await crud.get_user_by_username(db, result.username)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
-    
-    # 创建游戏结果
-    db_result = simple_storage.add_game_result(
-        username=result.username,
-        game_mode=result.game_mode,
-        time_seconds=result.time_seconds,
-        steps=result.steps,
-        score=result.score or 0
-    )
-    
+
     # 计算积分（根据游戏时间和步数计算）
     if result.game_mode == "simple":
         points = 10 if (result.time_seconds <= 120 and result.steps <= 50) else 5
     else:  # hard mode
         points = 20 if (result.time_seconds <= 180 and result.steps <= 100) else 10
-    
-    # 更新用户积分
-    simple_storage.update_user_points(result.username, points)
-    
-    return db_result
+
+    # 创建游戏结果并更新用户积分（同一事务）
+    db_result = await crud.create_game_result(db, result, user.id, award_points=points)
+
+    return result_to_dict(db_result, user.username)
 
 @router.post("/upload_step")
-async def upload_game_step(step: schemas.GameStepCreate):
+async def upload_game_step(step: schemas.GameStepCreate, db: AsyncSession = Depends(get_db)):
     """上传游戏步骤（简化版，只记录）"""
     # 检查用户是否存在
-    user = simple_storage.get_user_by_username(step.username)
+    user = await crud.get_user_by_username(db, step.username)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
-    
+
     return {"status": "ok", "message": "步骤已记录"}
 
+async def _history_page(db: AsyncSession, username: str, limit: int, cursor: Optional[str] = None):
+    """按 (created_at, id) 倒序取一页历史记录，返回 (记录字典列表, next_cursor)"""
+    try:
+        values = decode_cursor(cursor, 2)
+        before = (parse_datetime(values[0]), parse_int(values[1])) if values else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    user = await crud.get_user_by_username(db, username)
+    if not user:
+        return [], None
+
+    # 多取一条判断是否还有下一页
+    results = await crud.get_user_game_history(db, user.id, limit=limit + 1, before=before)
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        next_cursor = encode_cursor(results[-1].created_at, results[-1].id)
+    return [result_to_dict(result, user.username) for result in results], next_cursor
+
 @router.get("/history", response_model=List[schemas.GameResultResponse])
 async def get_game_history(
     username: str,
-    limit: int = 100
+    limit: int = Query(100, ge=1),
+    db: AsyncSession = Depends(get_db)
 ):
-    """获取用户的游戏历史记录"""
-    return simple_storage.get_user_game_history(username, limit)
+    """获取用户最近的游戏历史记录（从新到旧，返回列表；需要翻页时使用 /history/page）"""
+    history, _ = await _history_page(db, username, limit)
+    return history
+
+@router.get("/history/page", response_model=schemas.GameHistoryPage)
+async def get_game_history_page(
+    username: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """分页获取游戏历史记录（键集分页：把上一页的 next_cursor 作为 cursor 传入获取下一页）"""
+    history, next_cursor = await _history_page(db, username, limit, cursor)
+    return {"history": history, "next_cursor": next_cursor}
 
 @router.get("/leaderboard")
 async def get_leaderboard(
     game_mode: Optional[str] = None,
-    limit: int = 10
+    limit: int = Query(10, ge=1, le=1000),
+    sort_by: Literal["time", "steps"] = "time",
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
 ):
-    """获取全球排行榜（按时间排序）"""
-    results = simple_storage.get_leaderboard(game_mode, limit)
-    
+    """获取全球排行榜（sort_by: time 按时间排序, steps 按步数排序；cursor 为上一页返回的 next_cursor）"""
+    try:
+        # 游标里带上排序方式，换了排序方式的旧游标直接拒绝
+        values = decode_cursor(cursor, 3)
+        if values and values[0] != sort_by:
+            raise InvalidCursor("分页游标与排序方式不匹配")
+        after = (parse_int(values[1]), parse_int(values[2])) if values else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = await crud.get_leaderboard(db, game_mode, limit + 1, sort_by, after=after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        value = last.time_seconds if sort_by == "time" else last.steps
+        next_cursor = encode_cursor(sort_by, value, last.id)
+
     # 转换为响应格式
     leaderboard = []
-    for result in results:
+    for result, username in rows:
         leaderboard.append({
-            "username": result["username"],
-            "time_seconds": result["time_seconds"],
-            "steps": result["steps"],
-            "game_mode": result["game_mode"],
-            "score": result["score"],
-            "date": result["created_at"].isoformat() if isinstance(result["created_at"], datetime) else str(result["created_at"])
+            "username": username,
+            "time_seconds": result.time_seconds,
+            "steps": result.steps,
+            "game_mode": result.game_mode,
+            "score": result.score or 0,
+            "date": result.created_at.isoformat() if isinstance(result.created_at, datetime) else str(result.created_at)
         })
-    
-    return {"leaderboard": leaderboard}
+
+    return {"leaderboard": leaderboard, "next_cursor": next_cursor}
+
+@router.get("/items", response_model=List[schemas.ItemResponse])
+async def list_items(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """商店道具列表（来自内存中的道具目录），支持 If-None-Match 条件请求"""
+    items, etag = await catalog.get_items(db)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return items
 
 @router.post("/buy_item")
-async def buy_item(request: schemas.BuyItemRequest):
-    """购买道具（简化版）"""
-    user = simple_storage.get_user_by_username(request.username)
+async def buy_item(request: schemas.BuyItemRequest, db: AsyncSession = Depends(get_db)):
+    """购买道具：扣除积分并记入用户道具"""
+    user = await crud.get_user_by_username(db, request.username)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
-    
-    # 道具价格
-    item_costs = {
-        "delay": 10,
-        "block": 15
-    }
-    
-    cost = item_costs.get(request.item)
-    if not cost:
+
+    # 道具以道具目录为准（按名称或效果类型查找）
+    item = await catalog.get(db, request.item)
+    if not item:
         raise HTTPException(status_code=400, detail="无效的道具类型")
-    
-    if user["points"] < cost:
+
+    # 扣分（带余额条件的单条 UPDATE）与增加道具数量在同一事务内，并发购买不会把积分扣成负数
+    purchased = await crud.purchase_item(db, user.id, item["id"])
+    if purchased is None:
         raise HTTPException(status_code=400, detail="积分不足")
-    
-    # 扣除积分
-    simple_storage.update_user_points(request.username, -cost)
-    
-    # 返回更新后的积分
-    updated_user = simple_storage.get_user_by_username(request.username)
+    user_item, remaining = purchased
+
     return {
         "message": "购买成功",
-        "points": updated_user["points"]
+        "points": remaining,
+        "quantity": user_item.quantity
+    }
+
+@router.post("/use_item")
+async def use_item(request: schemas.UseItemRequest, db: AsyncSession = Depends(get_db)):
+    """使用道具：数量减一，没有该道具时返回 400"""
+    user = await crud.get_user_by_username(db, request.username)
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
+
+    item = await crud.use_item(db, user.id, request.item)
+    if item is None:
+        raise HTTPException(status_code=400, detail="没有可用的该道具")
+
+    return {
+        "message": "使用成功",
+        "item": item["name"],
+        "effect": item["effect"]
     }
@@ -34,6 +34,11 @@ class GameResultResponse(BaseModel):
     score: int = 0
     created_at: datetime
 
+# 游戏历史分页响应（next_cursor 为空表示没有更多记录）
+class GameHistoryPage(BaseModel):
+    history: List[GameResultResponse]
+    next_cursor: Optional[str] = None
+
 # 创建游戏结果模型
 class GameResultCreate(BaseModel):
     username: str
@@ -52,4 +57,25 @@ class GameStepCreate(BaseModel):
 # 道具购买请求（简化版）
 class BuyItemRequest(BaseModel):
     username: str
-    item: str  # "delay" 或 "block"
+    item: str  # 道具名称或效果类型，如 "delay"、"block"
+
+# 使用道具请求
+class UseItemRequest(BaseModel):
+    username: str
+    item: str  # 道具名称或效果类型
+
+
+# 创建道具模型
+class ItemCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    cost: int
+    effect: str
+
+# 道具响应模型
+class ItemResponse(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    cost: int
+    effect: str
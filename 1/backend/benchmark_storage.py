@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+存储并发压测
+后端路由实际使用的 crud（异步 SQLAlchemy，临时 SQLite 库）：多个协程同时上传游戏结果、扣积分和购买道具
+检查：
+- 游戏记录 id 唯一且连续
+- 积分没有丢失更新，也不会被扣成负数
+- 购买成功的次数与用户道具数量一致
+用法: python benchmark_storage.py [协程数] [每协程操作数]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+USERS = 10
+ITEM_COST = 15
+REWARD = 5
+
+
+async def crud_worker(index: int, ops: int, item_id: int):
+    from app import crud, schemas
+    from app.database import AsyncSessionLocal
+
+    username = f"user{index % USERS}"
+    spent = 0
+    bought = 0
+    async with AsyncSessionLocal() as db:
+        # 购买失败时会回滚会话，已加载的对象随之过期，这里只保留 id
+        user_id = (await crud.get_user_by_username(db, username)).id
+        for i in range(ops):
+            result = schemas.GameResultCreate(username=username, game_mode="simple",
+                                              time_seconds=60 + i % 50, steps=20 + i % 30)
+            await crud.create_game_result(db, result, user_id, award_points=REWARD)
+            if await crud.spend_points(db, user_id, ITEM_COST) is not None:
+                spent += ITEM_COST
+            if await crud.purchase_item(db, user_id, item_id) is not None:
+                bought += 1
+    return username, spent, bought
+
+
+async def run_crud(tasks: int, ops: int) -> bool:
+    """
+    通过后端路由使用的 crud 函数压测（每个协程一个会话，连接来自连接池）。
+    需要在导入 app.database 之前把 DATABASE_URL 指向临时库。
+    """
+    from sqlalchemy import func, select
+    from app import crud, schemas
+    from app.database import AsyncSessionLocal, engine, init_db
+    from app.models import GameResult, User, UserItem
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        for i in range(USERS):
+            await crud.create_user(db, schemas.UserCreate(username=f"user{i}", password="x"), "x")
+        item = await crud.get_item_by_name(db, "延时道具")
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*(crud_worker(n, ops, item.id) for n in range(tasks)))
+    elapsed = time.perf_counter() - start
+
+    async with AsyncSessionLocal() as db:
+        ids = (await db.scalars(select(GameResult.id))).all()
+        points = dict((await db.execute(select(User.username, User.points))).all())
+        quantities = dict((await db.execute(
+            select(User.username, func.sum(UserItem.quantity))
+            .join(UserItem, UserItem.user_id == User.id)
+            .group_by(User.username)
+        )).all())
+    await engine.dispose()
+
+    total_ops = tasks * ops
+    ids_ok = sorted(ids) == list(range(1, total_ops + 1))
+    expected = {f"user{i}": 0 for i in range(USERS)}
+    expected_items = {f"user{i}": 0 for i in range(USERS)}
+    for username, spent, bought in outcomes:
+        expected[username] += ops * REWARD - spent - bought * item.cost
+        expected_items[username] += bought
+    points_ok = points == expected
+    items_ok = all(quantities.get(u, 0) == expected_items[u] for u in expected_items)
+    negative = [u for u in points if points[u] < 0]
+
+    print(f"[crud/SQLite] {tasks} 协程 x {ops} 次: {elapsed:.2f}s, {total_ops / elapsed:.0f} 次/秒")
+    print(f"  记录 id 唯一且连续: {ids_ok}")
+    print(f"  积分一致: {points_ok}")
+    print(f"  道具数量一致: {items_ok}")
+    print(f"  出现负积分的用户: {negative or '无'}")
+    return ids_ok and points_ok and items_ok and not negative
+
+
+if __name__ == "__main__":
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'benchmark.db')}"
+        ok = asyncio.run(run_crud(tasks, ops))
+    print("\n通过" if ok else "\n失败")
+    sys.exit(0 if ok else 1)
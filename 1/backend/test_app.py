@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 import sys
 import os
+import asyncio
+from sqlalchemy import text
 
 # 设置Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -15,7 +17,7 @@ def test_app():
         print("✓ 应用导入成功")
         
         # 导入数据库
-        from app.database import engine, SessionLocal
+        from app.database import engine, AsyncSessionLocal
         from app.models import User, GameResult, Item, UserItem
         print("✓ 数据库模型导入成功")
         
@@ -28,15 +30,17 @@ def test_app():
         print("✓ 路由导入成功")
         
         # 测试数据库连接
-        db = SessionLocal()
+        async def ping():
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("SELECT 1"))
+            await engine.dispose()
+
         try:
-            result = db.execute("SELECT 1")
+            asyncio.run(ping())
             print("✓ 数据库连接测试成功")
         except Exception as e:
             print(f"✗ 数据库连接失败: {e}")
             return False
-        finally:
-            db.close()
         
         print("\n所有测试通过！应用可以正常启动。")
         return True
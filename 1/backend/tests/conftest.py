@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+# 后端以 backend/ 为工作目录导入（如 from app import crud）；
+# 数据库地址必须在导入 app.database 之前指向临时库
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="card_game_test_"), "test.db")
+
+
+@pytest.fixture
+def run_db():
+    """
+    返回 run(coro_fn)：在新的事件循环中重建表结构并执行 coro_fn(session_factory)，结束后释放连接池
+    （连接绑定在事件循环上，每个测试用完即释放）。
+    """
+    from app.catalog import catalog
+    from app.database import AsyncSessionLocal, Base, engine, init_db
+
+    def run(coro_fn):
+        async def main():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await init_db()
+            catalog.invalidate()
+            try:
+                return await coro_fn(AsyncSessionLocal)
+            finally:
+                await engine.dispose()
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "read-back"])
+def returning(request, monkeypatch):
+    """分别以支持和不支持 RETURNING（模拟 MySQL）的方言运行"""
+    from app.database import engine
+    dialect = engine.sync_engine.dialect
+    monkeypatch.setattr(dialect, "update_returning", request.param)
+    monkeypatch.setattr(dialect, "insert_returning", request.param)
+    return request.param
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select, text
+
+from app import crud, schemas
+from app.database import Base, _create_schema
+from app.models import User, UserItem
+from app.routes import game
+
+
+async def _user_with_points(sessions, points):
+    async with sessions() as db:
+        user = await crud.create_user(db, schemas.UserCreate(username="alice", password="x"), "x")
+        await crud.update_user_points(db, user.id, points)
+        return user.id
+
+
+def test_concurrent_purchases_never_overspend(run_db, returning):
+    async def scenario(sessions):
+        user_id = await _user_with_points(sessions, 100)
+        async with sessions() as db:
+            item = await crud.get_item_by_name(db, "延时道具")  # 价格 10
+
+        async def buy():
+            async with sessions() as db:
+                return await crud.purchase_item(db, user_id, item.id)
+
+        results = await asyncio.gather(*(buy() for _ in range(25)))
+        purchases = [r for r in results if r is not None]
+        assert len(purchases) == 10
+        assert sorted(remaining for _, remaining in purchases) == list(range(0, 100, 10))
+        async with sessions() as db:
+            assert (await db.get(User, user_id)).points == 0
+            rows = (await db.scalars(select(UserItem).where(UserItem.user_id == user_id))).all()
+            assert [(row.item_id, row.quantity) for row in rows] == [(item.id, 10)]
+
+    run_db(scenario)
+
+
+def test_use_item_decrements_and_removes_row(run_db, returning):
+    async def scenario(sessions):
+        user_id = await _user_with_points(sessions, 30)
+        async with sessions() as db:
+            item = await crud.get_item_by_name(db, "阻挡道具")  # 价格 15
+            assert (await crud.purchase_item(db, user_id, item.id))[0].quantity == 1
+            assert (await crud.purchase_item(db, user_id, item.id))[0].quantity == 2
+            assert await crud.purchase_item(db, user_id, item.id) is None
+
+            assert (await crud.use_item(db, user_id, "block"))["name"] == "阻挡道具"
+            assert [row.quantity for row in await crud.get_user_items(db, user_id)] == [1]
+            assert await crud.use_item(db, user_id, "阻挡道具") is not None
+            assert await crud.get_user_items(db, user_id) == []
+            assert await crud.use_item(db, user_id, "block") is None
+            assert await crud.use_item(db, user_id, "no-such-item") is None
+
+    run_db(scenario)
+
+
+def test_buy_and_use_item_routes_record_inventory(run_db):
+    async def scenario(sessions):
+        await _user_with_points(sessions, 20)
+        async with sessions() as db:
+            bought = await game.buy_item(schemas.BuyItemRequest(username="alice", item="delay"), db)
+            assert bought["points"] == 10 and bought["quantity"] == 1
+            with pytest.raises(HTTPException) as exc:
+                await game.buy_item(schemas.BuyItemRequest(username="alice", item="block"), db)
+            assert exc.value.status_code == 400
+
+            used = await game.use_item(schemas.UseItemRequest(username="alice", item="delay"), db)
+            assert used["effect"] == "delay"
+            with pytest.raises(HTTPException) as exc:
+                await game.use_item(schemas.UseItemRequest(username="alice", item="delay"), db)
+            assert exc.value.status_code == 400
+
+    run_db(scenario)
+
+
+def test_schema_merges_duplicate_user_items_before_unique_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        # 旧库没有唯一索引，同一用户同一道具有多行
+        conn.execute(text("DROP INDEX uq_user_items_user_item"))
+        conn.execute(text("INSERT INTO users (id, username, hashed_password, points) VALUES (1, 'a', 'x', 0)"))
+        conn.execute(text("INSERT INTO items (id, name, cost, effect) VALUES (1, 'i1', 1, 'e1'), (2, 'i2', 1, 'e2')"))
+        conn.execute(text("INSERT INTO user_items (id, user_id, item_id, quantity) VALUES "
+                          "(1, 1, 1, 2), (2, 1, 2, 1), (3, 1, 1, 3), (4, 1, 1, 1)"))
+    with engine.begin() as conn:
+        _create_schema(conn)
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, item_id, quantity FROM user_items ORDER BY id")).all()
+        indexes = conn.execute(text("PRAGMA index_list(user_items)")).all()
+    engine.dispose()
+    assert [tuple(row) for row in rows] == [(1, 1, 6), (2, 2, 1)]
+    assert any(index[1] == "uq_user_items_user_item" and index[2] for index in indexes)
@@ -0,0 +1,61 @@
+import asyncio
+
+from app import crud, schemas
+
+
+async def _create_users(sessions, count, points=0):
+    ids = []
+    async with sessions() as db:
+        for i in range(count):
+            user = await crud.create_user(db, schemas.UserCreate(username=f"user{i}", password="x"), "x")
+            if points:
+                await crud.update_user_points(db, user.id, points)
+            ids.append(user.id)
+    return ids
+
+
+def test_update_user_points_returns_new_value(run_db, returning):
+    async def scenario(sessions):
+        (user_id,) = await _create_users(sessions, 1)
+        async with sessions() as db:
+            assert await crud.update_user_points(db, user_id, 30) == 30
+            assert await crud.update_user_points(db, user_id, -5) == 25
+            assert await crud.update_user_points(db, user_id + 100, 5) is None
+            assert await crud.spend_points(db, user_id, 20) == 5
+            assert await crud.spend_points(db, user_id, 20) is None
+            assert (await crud.get_user_by_id(db, user_id)).points == 5
+
+    run_db(scenario)
+
+
+def test_concurrent_spend_points_never_goes_negative(run_db, returning):
+    async def scenario(sessions):
+        (user_id,) = await _create_users(sessions, 1, points=100)
+
+        async def spend():
+            async with sessions() as db:
+                return await crud.spend_points(db, user_id, 15)
+
+        results = await asyncio.gather(*(spend() for _ in range(20)))
+        successes = [r for r in results if r is not None]
+        assert len(successes) == 6
+        assert sorted(successes) == [10, 25, 40, 55, 70, 85]
+        async with sessions() as db:
+            assert (await crud.get_user_by_id(db, user_id)).points == 10
+
+    run_db(scenario)
+
+
+def test_create_user_respects_limit_under_concurrency(run_db):
+    async def scenario(sessions):
+        async def register(i):
+            async with sessions() as db:
+                return await crud.create_user(db, schemas.UserCreate(username=f"u{i}", password="x"), "x", 5)
+
+        created = await asyncio.gather(*(register(i) for i in range(12)))
+        assert sum(user is not None for user in created) == 5
+        async with sessions() as db:
+            assert await crud.count_users(db) == 5
+            assert await crud.create_user(db, schemas.UserCreate(username="u0", password="x"), "x") is None
+
+    run_db(scenario)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.database import engine_options, to_async_url
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:", "sqlite:///file:shared?mode=memory&uri=true"])
+def test_sqlite_memory_uses_static_pool(url):
+    options = engine_options(to_async_url(url))
+    assert options["poolclass"] is StaticPool
+    assert "pool_size" not in options
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_sqlite_memory_engine_keeps_data_across_sessions(url):
+    async def main():
+        url_async = to_async_url(url)
+        memory_engine = create_async_engine(url_async, **engine_options(url_async))
+        try:
+            async with memory_engine.begin() as conn:
+                await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+                await conn.execute(text("INSERT INTO t VALUES (1)"))
+            # StaticPool 共用同一个连接，另一次连接仍能看到同一个内存库
+            async with memory_engine.connect() as conn:
+                return (await conn.execute(text("SELECT x FROM t"))).scalar()
+        finally:
+            await memory_engine.dispose()
+
+    assert asyncio.run(main()) == 1
+
+
+def test_sqlite_file_has_no_queue_pool_arguments(tmp_path):
+    options = engine_options(to_async_url(f"sqlite:///{tmp_path / 'test.db'}"))
+    assert not {"pool_size", "max_overflow", "pool_timeout", "poolclass"} & options.keys()
+
+
+@pytest.mark.parametrize("url", ["postgresql://u:p@localhost/db", "mysql+pymysql://u:p@localhost/db"])
+def test_server_dialects_use_queue_pool_settings(url):
+    options = engine_options(to_async_url(url))
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_recycle"} <= options.keys()
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app import crud, schemas
+from app.main import app
+from app.models import GameResult
+from app.routes import game
+
+TIE = datetime(2024, 5, 1, 12, 0, 0)
+
+
+async def _seed(sessions):
+    """两位用户共 12 条记录：成绩和时间大量重复，只能靠 id 区分先后"""
+    async with sessions() as db:
+        alice = await crud.create_user(db, schemas.UserCreate(username="alice", password="x"), "x")
+        bob = await crud.create_user(db, schemas.UserCreate(username="bob", password="x"), "x")
+        for i in range(12):
+            db.add(GameResult(user_id=alice.id if i % 3 else bob.id, game_mode="simple",
+                              time_seconds=30 + i % 2, steps=20 + i % 4, score=0,
+                              created_at=TIE if i < 8 else datetime(2024, 5, 2)))
+        await db.commit()
+
+
+async def _collect(fetch, page_size):
+    items, cursor, pages = [], None, 0
+    while True:
+        page, cursor = await fetch(page_size, cursor)
+        assert len(page) <= page_size
+        items.extend(page)
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 5])
+def test_history_pages_cover_every_record_once(run_db, page_size):
+    async def scenario(sessions):
+        await _seed(sessions)
+        async with sessions() as db:
+            async def fetch(limit, cursor):
+                page = await game.get_game_history_page("alice", limit=limit, cursor=cursor, db=db)
+                return page["history"], page["next_cursor"]
+
+            items, _ = await _collect(fetch, page_size)
+            full = await game.get_game_history("alice", limit=1000, db=db)
+        keys = [(item["created_at"], item["id"]) for item in items]
+        assert keys == sorted(keys, reverse=True)
+        assert len(set(keys)) == len(keys) == 8
+        # 不分页的 /history 仍返回记录列表
+        assert isinstance(full, list)
+        assert [item["id"] for item in full] == [item["id"] for item in items]
+
+    run_db(scenario)
+
+
+@pytest.mark.parametrize("sort_by,field", [("time", "time_seconds"), ("steps", "steps")])
+def test_leaderboard_pages_follow_value_then_id(run_db, sort_by, field):
+    async def scenario(sessions):
+        await _seed(sessions)
+        async with sessions() as db:
+            async def fetch(limit, cursor):
+                page = await game.get_leaderboard(game_mode="simple", limit=limit, sort_by=sort_by,
+                                                  cursor=cursor, db=db)
+                return page["leaderboard"], page["next_cursor"]
+
+            items, pages = await _collect(fetch, 5)
+            expected = await crud.get_leaderboard(db, "simple", 100, sort_by)
+        assert pages == 3
+        assert [item[field] for item in items] == [getattr(row[0], field) for row in expected]
+        assert len(items) == 12
+
+    run_db(scenario)
+
+
+def test_cursor_for_other_sort_is_rejected(run_db):
+    async def scenario(sessions):
+        await _seed(sessions)
+        async with sessions() as db:
+            page = await game.get_leaderboard(limit=2, sort_by="time", cursor=None, db=db)
+            with pytest.raises(HTTPException) as exc:
+                await game.get_leaderboard(limit=2, sort_by="steps", cursor=page["next_cursor"], db=db)
+            assert exc.value.status_code == 400
+            with pytest.raises(HTTPException):
+                await game.get_game_history_page("alice", limit=2, cursor="not-a-cursor", db=db)
+
+    run_db(scenario)
+
+
+def test_sort_by_and_limit_are_validated():
+    # 参数校验在访问数据库之前完成，不需要启动服务
+    client = TestClient(app)
+    assert client.get("/game/leaderboard", params={"sort_by": "score"}).status_code == 422
+    assert client.get("/game/history/page", params={"username": "a", "limit": 0}).status_code == 422
+
+
+def test_routes_have_single_prefix():
+    # README_STARTUP.md 与客户端脚本使用的路径
+    paths = set(app.openapi()["paths"])
+    assert {"/auth/register", "/auth/login", "/game/items", "/game/history",
+            "/game/history/page", "/game/leaderboard"} <= paths
+    assert not [path for path in paths if path.startswith(("/game/game", "/auth/auth"))]
@@ -0,0 +1,39 @@
+import hashlib
+import importlib.util
+import os
+
+import pytest
+
+from app import passwords
+
+# 游戏本地存储使用的 core/passwords.py；按文件路径加载，不把游戏目录加入导入路径
+GAME_PASSWORDS_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "core", "passwords.py")
+_spec = importlib.util.spec_from_file_location("game_passwords", GAME_PASSWORDS_FILE)
+game_passwords = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(game_passwords)
+
+SCHEMES = [scheme for scheme in ("scrypt", "pbkdf2_sha256") if scheme != "scrypt" or hasattr(hashlib, "scrypt")]
+
+
+@pytest.mark.parametrize("scheme", SCHEMES)
+@pytest.mark.parametrize("source, target", [(game_passwords, passwords), (passwords, game_passwords)],
+                         ids=["game-to-backend", "backend-to-game"])
+def test_hashes_verify_on_both_sides(scheme, source, target):
+    stored = source.hash_password("s3cret", scheme)
+    assert target.verify_password("s3cret", stored)
+    assert not target.verify_password("wrong", stored)
+    assert target.needs_rehash(stored) == source.needs_rehash(stored)
+
+
+def test_legacy_hash_is_accepted_and_upgraded_on_both_sides():
+    legacy = hashlib.sha256(b"s3cret").hexdigest()
+    for module in (passwords, game_passwords):
+        assert module.verify_password("s3cret", legacy)
+        assert module.needs_rehash(legacy)
+
+
+def test_default_parameters_match():
+    for name in ("DEFAULT_SCHEME", "SCRYPT_N", "SCRYPT_R", "SCRYPT_P", "PBKDF2_ITERATIONS",
+                 "SALT_BYTES", "HASH_BYTES"):
+        assert getattr(passwords, name) == getattr(game_passwords, name), name
@@ -0,0 +1,211 @@
+import time
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from core.utils import fisher_yates_shuffle
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，缺失时退回标准库 array 列
+    np = None
+
+
+class BoardCard:
+    """
+    CardBoard 中单个位置的轻量视图，对外提供与 core.card.Card 相同的属性和方法，
+    读写都直接落到棋盘的列数组上。
+    """
+    __slots__ = ("_board", "_index")
+
+    def __init__(self, board: "CardBoard", index: int):
+        self._board = board
+        self._index = index
+
+    @property
+    def id(self) -> str:
+        return self._board.id_table[int(self._board.codes[self._index])]
+
+    @property
+    def is_flipped(self) -> bool:
+        return bool(self._board.flipped[self._index])
+
+    @is_flipped.setter
+    def is_flipped(self, value: bool) -> None:
+        self._board.flipped[self._index] = bool(value)
+
+    @property
+    def is_matched(self) -> bool:
+        return bool(self._board.matched[self._index])
+
+    @is_matched.setter
+    def is_matched(self, value: bool) -> None:
+        self._board.matched[self._index] = bool(value)
+
+    @property
+    def score_weight(self) -> int:
+        return int(self._board.score_weight[self._index])
+
+    @score_weight.setter
+    def score_weight(self, value: int) -> None:
+        self._board.score_weight[self._index] = value
+
+    @property
+    def last_flipped_time(self) -> float:
+        return float(self._board.last_flipped_time[self._index])
+
+    @last_flipped_time.setter
+    def last_flipped_time(self, value: float) -> None:
+        self._board.last_flipped_time[self._index] = value
+
+    def flip(self):
+        self._board.flip(self._index)
+
+    def hide(self):
+        self._board.hide(self._index)
+
+    def set_matched(self):
+        self._board.set_matched(self._index)
+
+
+class CardBoard:
+    """
+    列式（struct-of-arrays）卡片存储：用于替代 List[Card]。
+    每一列是一个连续数组：
+      - codes: 卡片 ID 编码（id_table 的下标）
+      - flipped / matched: 状态标记
+      - last_flipped_time: 最后翻看时间（供 RiskTracker 使用）
+      - score_weight: 分值权重
+    安装了 numpy 时整盘扫描使用向量化掩码，否则退回标准库 array/bytearray。
+    下标访问返回 BoardCard 视图，因此可以像 List[Card] 一样使用。
+    """
+
+    def __init__(self, card_ids: List[str], score_weight: int = 10,
+                 clock: Callable[[], float] = time.time):
+        self.clock = clock
+        # ID 驻留：相同字符串只保存一份，列中只存整数编码
+        self.id_table: List[str] = []
+        self._code_of: Dict[str, int] = {}
+        codes = [self._intern(card_id) for card_id in card_ids]
+
+        size = len(card_ids)
+        if np is not None:
+            self.codes = np.array(codes, dtype=np.int32)
+            self.flipped = np.zeros(size, dtype=bool)
+            self.matched = np.zeros(size, dtype=bool)
+            self.last_flipped_time = np.zeros(size, dtype=np.float64)
+            self.score_weight = np.full(size, score_weight, dtype=np.int32)
+        else:
+            self.codes = array('i', codes)
+            self.flipped = bytearray(size)
+            self.matched = bytearray(size)
+            self.last_flipped_time = array('d', [0.0]) * size
+            self.score_weight = array('i', [score_weight]) * size
+
+    def _intern(self, card_id: str) -> int:
+        code = self._code_of.get(card_id)
+        if code is None:
+            code = len(self.id_table)
+            self._code_of[card_id] = code
+            self.id_table.append(card_id)
+        return code
+
+    def code_of(self, card_id: str) -> Optional[int]:
+        return self._code_of.get(card_id)
+
+    # ========== 序列协议（兼容 List[Card]） ==========
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> BoardCard:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("卡片下标超出范围。")
+        return BoardCard(self, index)
+
+    def __iter__(self) -> Iterator[BoardCard]:
+        for index in range(len(self)):
+            yield BoardCard(self, index)
+
+    # ========== 单卡操作（与 Card 语义一致） ==========
+
+    def flip(self, index: int) -> None:
+        if not self.flipped[index]:
+            self.flipped[index] = True
+            self.last_flipped_time[index] = self.clock()
+
+    def hide(self, index: int) -> None:
+        if not self.matched[index]:
+            self.flipped[index] = False
+
+    def set_matched(self, index: int) -> None:
+        self.matched[index] = True
+        self.flipped[index] = True
+
+    # ========== 整盘扫描 ==========
+
+    def hide_flipped(self, indices: Optional[Iterable[int]] = None) -> None:
+        """
+        盖回翻开但未配对的卡片。indices 给定时只处理这些位置（调用方增量维护的翻开集合），
+        否则扫描整盘；已配对的卡片保持翻开。
+        """
+        if np is not None:
+            if indices is None:
+                self.flipped &= self.matched
+            else:
+                idx = np.fromiter(indices, dtype=np.intp)
+                self.flipped[idx] &= self.matched[idx]
+            return
+        for i in (range(len(self.flipped)) if indices is None else indices):
+            if self.flipped[i] and not self.matched[i]:
+                self.flipped[i] = 0
+
+    def all_matched(self, ignore_code: Optional[int] = None) -> bool:
+        """整盘判断是否所有卡片都已配对；ignore_code 对应的卡片（如单张）不参与判断。"""
+        if np is not None:
+            done = self.matched
+            if ignore_code is not None:
+                done = done | (self.codes == ignore_code)
+            return bool(done.all())
+        for i in range(len(self.matched)):
+            if not self.matched[i] and self.codes[i] != ignore_code:
+                return False
+        return True
+
+    def unmatched_indices(self) -> List[int]:
+        if np is not None:
+            return np.flatnonzero(~self.matched).tolist()
+        return [i for i in range(len(self.matched)) if not self.matched[i]]
+
+    def shuffle_subset(self, indices: List[int]) -> None:
+        """在给定下标之间随机交换整张卡片（所有列一起移动）。"""
+        if not indices:
+            return
+        source = fisher_yates_shuffle(indices)
+        if np is not None:
+            dst = np.asarray(indices, dtype=np.intp)
+            src = np.asarray(source, dtype=np.intp)
+            for column in (self.codes, self.flipped, self.matched,
+                           self.last_flipped_time, self.score_weight):
+                column[dst] = column[src]
+        else:
+            for column in (self.codes, self.flipped, self.matched,
+                           self.last_flipped_time, self.score_weight):
+                values = [column[i] for i in source]
+                for i, v in zip(indices, values):
+                    column[i] = v
+
+    def grid_state(self, rows: int, cols: int) -> List[List[Tuple[str, bool, bool]]]:
+        """按 rows×cols 返回 (id, is_flipped, is_matched) 网格。"""
+        id_table = self.id_table
+        if np is not None:
+            ids = [id_table[code] for code in self.codes.tolist()]
+            flipped = self.flipped.tolist()
+            matched = self.matched.tolist()
+        else:
+            ids = [id_table[code] for code in self.codes]
+            flipped = [bool(v) for v in self.flipped]
+            matched = [bool(v) for v in self.matched]
+        cells = list(zip(ids, flipped, matched))
+        return [cells[r * cols:(r + 1) * cols] for r in range(rows)]
@@ -0,0 +1,37 @@
+from typing import Tuple
+
+
+class FlipResult:
+    """
+    一次翻牌操作的结果，供主控制器直接判断后续状态，无需再读取整个网格。
+    kind:
+      - ignored:    无效翻牌（已翻开/已配对/超时），positions 为空
+      - first:      翻开了本轮第一张牌，positions 为 (第一张,)
+      - matched:    第二张牌与第一张配对成功，positions 为 (第一张, 第二张)
+      - mismatched: 第二张牌配对失败，两张牌保持翻开等待 hide_all_flipped，positions 同上
+    """
+    __slots__ = ("kind", "positions")
+
+    IGNORED = "ignored"
+    FIRST = "first"
+    MATCHED = "matched"
+    MISMATCHED = "mismatched"
+
+    def __init__(self, kind: str, positions: Tuple[Tuple[int, int], ...] = ()):
+        self.kind = kind
+        self.positions = positions
+
+    @property
+    def matched(self) -> bool:
+        return self.kind == FlipResult.MATCHED
+
+    @property
+    def mismatched(self) -> bool:
+        return self.kind == FlipResult.MISMATCHED
+
+    def __repr__(self) -> str:
+        return f"FlipResult({self.kind!r}, {self.positions!r})"
+
+
+# 无效翻牌没有附带信息，复用同一个实例
+FLIP_IGNORED = FlipResult(FlipResult.IGNORED)
@@ -0,0 +1,127 @@
+"""
+密码哈希：加盐、可调强度的 KDF（优先 scrypt，不可用时退回 PBKDF2-SHA256）。
+存储格式把算法和参数与哈希值放在一起，每个用户可以有不同的参数：
+    scrypt$<n>$<r>$<p>$<salt>$<hash>
+    pbkdf2_sha256$<iterations>$<salt>$<hash>
+旧版本的无盐 SHA-256（64 位十六进制）仍可校验，needs_rehash 返回 True 以便登录成功后升级。
+"""
+import base64
+import hashlib
+import hmac
+import os
+from collections import OrderedDict
+from threading import Lock
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 260000
+SALT_BYTES = 16
+HASH_BYTES = 32
+DEFAULT_SCHEME = "scrypt" if hasattr(hashlib, "scrypt") else "pbkdf2_sha256"
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # maxmem 需要容纳 128 * n * r 字节的工作内存
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r, dklen=HASH_BYTES)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=HASH_BYTES)
+
+
+def hash_password(password: str, scheme: str = DEFAULT_SCHEME) -> str:
+    """生成带随机盐和参数的密码哈希"""
+    salt = os.urandom(SALT_BYTES)
+    if scheme == "scrypt":
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+    if scheme == "pbkdf2_sha256":
+        digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+        return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64encode(salt)}${_b64encode(digest)}"
+    raise ValueError(f"不支持的密码哈希算法: {scheme}")
+
+
+def _compute(password: str, stored: str) -> bytes:
+    """按 stored 中记录的算法和参数重新计算哈希，格式不识别时抛出 ValueError"""
+    parts = stored.split("$")
+    if parts[0] == "scrypt" and len(parts) == 6:
+        return _scrypt(password, _b64decode(parts[4]), int(parts[1]), int(parts[2]), int(parts[3]))
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        return _pbkdf2(password, _b64decode(parts[2]), int(parts[1]))
+    raise ValueError("无法识别的密码哈希格式")
+
+
+def is_legacy_hash(stored: str) -> bool:
+    return "$" not in stored
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """校验密码（比较使用常数时间）"""
+    if is_legacy_hash(stored):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored)
+    try:
+        digest = _compute(password, stored)
+    except ValueError:
+        return False
+    return hmac.compare_digest(_b64encode(digest), stored.rsplit("$", 1)[1])
+
+
+def needs_rehash(stored: str) -> bool:
+    """旧格式或参数低于当前默认值的哈希需要在下次登录成功时重新生成"""
+    if is_legacy_hash(stored):
+        return True
+    parts = stored.split("$")
+    if parts[0] != DEFAULT_SCHEME:
+        return True
+    if parts[0] == "scrypt":
+        return (int(parts[1]), int(parts[2]), int(parts[3])) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return int(parts[1]) < PBKDF2_ITERATIONS
+
+
+class VerificationCache:
+    """
+    最近校验成功的 (密码, 哈希) 组合缓存，重复登录时跳过 KDF 计算。
+    缓存键是以进程内随机密钥计算的 HMAC，内存中不保存明文密码；哈希变化（改密或升级）后旧条目自然失效。
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._key = os.urandom(32)
+        self._entries: "OrderedDict[bytes, None]" = OrderedDict()
+        self._lock = Lock()
+
+    def _cache_key(self, password: str, stored: str) -> bytes:
+        return hmac.new(self._key, stored.encode() + b"\0" + password.encode(), hashlib.sha256).digest()
+
+    def verify(self, password: str, stored: str) -> bool:
+        key = self._cache_key(password, stored)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True
+        if not verify_password(password, stored):
+            return False
+        self._remember_key(key)
+        return True
+
+    def remember(self, password: str, stored: str) -> None:
+        """记录一个已知正确的组合（例如刚升级生成的新哈希）"""
+        self._remember_key(self._cache_key(password, stored))
+
+    def _remember_key(self, key: bytes) -> None:
+        with self._lock:
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
@@ -0,0 +1,60 @@
+import heapq
+import itertools
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class TimerScheduler:
+    """
+    基于最小堆的定时回调调度器（时间单位为毫秒，与 pygame.time.get_ticks 一致）。
+    每个定时器有一个名称，同名定时器重新安排时会替换旧的（旧条目在堆中惰性作废）。
+    主循环每帧调用 run_due(now) 触发到期回调，并用 next_deadline() 决定空闲等待时长，
+    从而替代 pygame.time.wait 之类的阻塞等待。
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, str]] = []
+        # 名称 -> (序号, 回调)；序号与堆顶条目不一致说明该条目已被替换或取消
+        self._active: Dict[str, Tuple[int, Callable[[], None]]] = {}
+        self._counter = itertools.count()
+
+    def schedule(self, name: str, deadline: int, callback: Callable[[], None]) -> None:
+        """在 deadline 时刻触发 callback，替换同名的已有定时器"""
+        seq = next(self._counter)
+        self._active[name] = (seq, callback)
+        heapq.heappush(self._heap, (deadline, seq, name))
+
+    def cancel(self, name: str) -> None:
+        self._active.pop(name, None)
+
+    def cancel_all(self) -> None:
+        self._active.clear()
+        self._heap.clear()
+
+    def is_scheduled(self, name: str) -> bool:
+        return name in self._active
+
+    def _discard_stale(self) -> None:
+        heap = self._heap
+        while heap:
+            deadline, seq, name = heap[0]
+            entry = self._active.get(name)
+            if entry is not None and entry[0] == seq:
+                return
+            heapq.heappop(heap)
+
+    def next_deadline(self) -> Optional[int]:
+        """最近一个有效定时器的到期时刻，没有则返回 None"""
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def run_due(self, now: int) -> int:
+        """触发所有 deadline <= now 的定时器，返回触发的个数"""
+        fired = 0
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return fired
+            _, seq, name = heapq.heappop(self._heap)
+            _, callback = self._active.pop(name)
+            callback()
+            fired += 1
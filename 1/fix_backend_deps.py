@@ -28,7 +28,8 @@ def main():
     required_packages = [
         "fastapi==0.104.1",
         "uvicorn[standard]==0.24.0",
-        "sqlalchemy==2.0.23",
+        "sqlalchemy[asyncio]==2.0.23",
+        "aiosqlite==0.19.0",
         "passlib[bcrypt]==1.7.4",
         "python-jose[cryptography]==3.3.0",
         "pydantic==2.5.0",
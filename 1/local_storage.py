@@ -1,30 +1,327 @@
 """
 本地存储系统 - 替代后端
-使用JSON文件存储所有数据
+使用JSON文件存储所有数据：
+  - game_data.json：完整快照（首行为带版本号和各段校验和的头部，之后是各段数据）
+  - game_data.json.bak：上一份完好的快照，当前快照损坏时从它恢复
+  - game_data.json.journal：快照之后的增量修改日志（每行一条紧凑 JSON 记录，只追加）
+每次修改只向日志追加一行，日志达到一定条数后再压缩进快照；启动时先读快照再重放日志。
+启动时只读取用户数据，游戏记录段在第一次查询历史/排行榜时才读取。
+开启写回（write_behind_ms）后，修改只在内存中生效并排队，由后台线程合并写盘。
 """
 import json
 import os
 import hashlib
-from datetime import datetime
-from typing import Optional, Dict, List
+import io
+import shutil
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import repeat
+from typing import Optional, Dict, List, Tuple
+
+from core.passwords import VerificationCache, hash_password, needs_rehash
 
 STORAGE_FILE = "game_data.json"
+JOURNAL_SUFFIX = ".journal"
+COMPACT_EVERY = 500  # 日志累计多少条记录后压缩进快照
+WRITE_BEHIND_MS = 500  # 写回模式下后台线程两次写盘的最小间隔
+BACKUP_SUFFIX = ".bak"
+SNAPSHOT_FORMAT = "memory-maze-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FORMATS = ("json", "binary")
+
+# 二进制格式中游戏记录的列：整数列与字符串驻留列（存驻留表下标），created_at 存为微秒整数
+RESULT_INT_COLUMNS = ("id", "time_seconds", "steps", "score")
+RESULT_STR_COLUMNS = ("username", "game_mode", "result")
+RESULT_KEYS = set(RESULT_INT_COLUMNS + RESULT_STR_COLUMNS + ("created_at",))
+EPOCH = datetime(1970, 1, 1)
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+class SnapshotError(Exception):
+    """快照文件损坏（头部无效、长度不符或校验和不匹配）"""
+
+
+def _to_little_endian(column: array) -> bytes:
+    if sys.byteorder != "little":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_little_endian(typecode: str, raw: bytes) -> array:
+    column = array(typecode)
+    column.frombytes(raw)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+def encode_results_columnar(results: List[Dict]) -> bytes:
+    """
+    把游戏记录编码为列式二进制：
+      4 字节长度 + 驻留字符串表（JSON），4 字节记录数，
+      然后依次是 id/time_seconds/steps/score 与各字符串列下标（int32），created_at（int64 微秒）
+    无法按列编码的记录（缺字段、多字段、整数列不是 int32 范围内的整数或时间格式不标准）抛出 ValueError。
+    """
+    tables: Dict[str, List[str]] = {name: [] for name in RESULT_STR_COLUMNS}
+    codes: Dict[str, Dict[str, int]] = {name: {} for name in RESULT_STR_COLUMNS}
+    int_columns = {name: array('i') for name in RESULT_INT_COLUMNS + RESULT_STR_COLUMNS}
+    created_at = array('q')
+    for r in results:
+        if set(r) != RESULT_KEYS:
+            raise ValueError(f"游戏记录字段不符合列式格式: {sorted(r)}")
+        for name in RESULT_INT_COLUMNS:
+            value = r[name]
+            # array('i') 对浮点/None 抛 TypeError、对超出范围的值抛 OverflowError，这里统一报 ValueError
+            if type(value) is not int or not INT32_MIN <= value <= INT32_MAX:
+                raise ValueError(f"无法按 int32 编码的 {name}: {value!r}")
+            int_columns[name].append(value)
+        for name in RESULT_STR_COLUMNS:
+            code = codes[name].get(r[name])
+            if code is None:
+                code = codes[name][r[name]] = len(tables[name])
+                tables[name].append(r[name])
+            int_columns[name].append(code)
+        if not isinstance(r["created_at"], str):
+            raise ValueError(f"无法无损编码的时间: {r['created_at']!r}")
+        created = datetime.fromisoformat(r["created_at"])
+        if created.tzinfo is not None or created.isoformat() != r["created_at"]:
+            raise ValueError(f"无法无损编码的时间: {r['created_at']}")
+        created_at.append((created - EPOCH) // timedelta(microseconds=1))
+    
+    table_bytes = json.dumps(tables, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    parts = [struct.pack("<I", len(table_bytes)), table_bytes, struct.pack("<I", len(results))]
+    parts.extend(_to_little_endian(int_columns[name]) for name in RESULT_INT_COLUMNS + RESULT_STR_COLUMNS)
+    parts.append(_to_little_endian(created_at))
+    return b"".join(parts)
+
+
+def decode_results_columnar(body: bytes) -> List[Dict]:
+    """encode_results_columnar 的逆操作"""
+    (table_len,) = struct.unpack_from("<I", body, 0)
+    tables = json.loads(body[4:4 + table_len])
+    offset = 4 + table_len
+    (count,) = struct.unpack_from("<I", body, offset)
+    offset += 4
+    columns = {}
+    for name in RESULT_INT_COLUMNS + RESULT_STR_COLUMNS:
+        size = count * array('i').itemsize
+        columns[name] = _from_little_endian('i', body[offset:offset + size]).tolist()
+        offset += size
+    created_at = _from_little_endian('q', body[offset:offset + count * array('q').itemsize]).tolist()
+    
+    for name in RESULT_STR_COLUMNS:
+        table = tables[name]
+        columns[name] = [table[code] for code in columns[name]]
+    # 逐行构造 datetime 是主要开销，用 map 链在 C 层完成转换
+    created_at = map(datetime.isoformat, map(EPOCH.__add__, map(timedelta, repeat(0), repeat(0), created_at)))
+    return [{"id": i, "username": u, "game_mode": m, "time_seconds": t, "steps": st,
+             "score": sc, "result": r, "created_at": c}
+            for i, u, m, t, st, sc, r, c in zip(columns["id"], columns["username"], columns["game_mode"],
+                                                columns["time_seconds"], columns["steps"], columns["score"],
+                                                columns["result"], created_at)]
+
+
+def encode_snapshot(data: Dict, snapshot_format: str = "json") -> bytes:
+    """
+    把内存数据编码为快照：
+      第一行是 JSON 头部 {"format", "version", "sections": [{"name", "length", "sha256", "encoding"}, ...]}
+      之后依次是 meta / users / game_results 三段；
+      snapshot_format 为 "binary" 时 game_results 段使用列式二进制编码，其余段仍为紧凑 JSON
+    """
+    meta = {k: v for k, v in data.items() if k not in ("users", "game_results")}
+    # 记录条数放在 meta 中，延迟读取游戏记录时无需解析记录段即可分配新 id
+    meta["result_count"] = len(data["game_results"])
+    results_encoding = "json"
+    results_body = None
+    if snapshot_format == "binary":
+        try:
+            results_body = encode_results_columnar(data["game_results"])
+            results_encoding = "columnar"
+        except ValueError as e:
+            print(f"游戏记录无法使用二进制格式，改用 JSON: {e}")
+    if results_body is None:
+        results_body = json.dumps(data["game_results"], ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    sections = [
+        ("meta", "json", json.dumps(meta, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')),
+        ("users", "json", json.dumps(data["users"], ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')),
+        ("game_results", results_encoding, results_body),
+    ]
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "sections": [{"name": name, "length": len(body), "sha256": hashlib.sha256(body).hexdigest(),
+                      "encoding": encoding}
+                     for name, encoding, body in sections],
+    }
+    return json.dumps(header, separators=(',', ':')).encode('utf-8') + b"\n" + b"".join(body for _, _, body in sections)
+
+
+def _decode_section(section: Dict, body: bytes):
+    if len(body) != section["length"] or hashlib.sha256(body).hexdigest() != section["sha256"]:
+        raise SnapshotError(f"快照段 {section['name']} 校验失败")
+    if section.get("encoding", "json") == "columnar":
+        return decode_results_columnar(body)
+    return json.loads(body)
+
+
+def read_snapshot(f, lazy_sections: Tuple[str, ...] = ()) -> Tuple[Dict, Dict[str, Dict]]:
+    """
+    从二进制文件对象读取快照。lazy_sections 中的段不读取，只记录其位置，
+    返回 (data, {段名: 段描述（含文件内偏移 offset）})，之后可用 read_snapshot_section 单独读取。
+    旧版本的纯 JSON 文件（没有头部）只能整体解析，不支持延迟读取。
+    """
+    first_line = f.readline()
+    try:
+        header = json.loads(first_line)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+        f.seek(0)
+        try:
+            return json.loads(f.read()), {}
+        except ValueError as e:
+            raise SnapshotError(f"无法解析快照: {e}")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"不支持的快照版本: {header.get('version')}")
+    
+    sections = {}
+    lazy = {}
+    offset = len(first_line)
+    for section in header["sections"]:
+        if section["name"] in lazy_sections:
+            lazy[section["name"]] = dict(section, offset=offset)
+            f.seek(section["length"], os.SEEK_CUR)
+        else:
+            sections[section["name"]] = _decode_section(section, f.read(section["length"]))
+        offset += section["length"]
+    data = sections["meta"]
+    data["users"] = sections["users"]
+    data["game_results"] = sections.get("game_results", [])
+    return data, lazy
+
+
+def read_snapshot_section(path: str, section: Dict):
+    """按 read_snapshot 记录的位置读取并校验单个段"""
+    with open(path, 'rb') as f:
+        f.seek(section["offset"])
+        return _decode_section(section, f.read(section["length"]))
+
+
+def decode_snapshot(raw: bytes) -> Dict:
+    """解码完整快照；旧版本的纯 JSON 文件（没有头部）直接按 JSON 解析"""
+    return read_snapshot(io.BytesIO(raw))[0]
+
+
+def convert_snapshot(src: str, dst: Optional[str] = None, snapshot_format: str = "binary") -> str:
+    """把快照（包括旧版纯 JSON 文件）转换为指定格式，dst 缺省时原地转换"""
+    with open(src, 'rb') as f:
+        data = decode_snapshot(f.read())
+    dst = dst or src
+    tmp_file = dst + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(encode_snapshot(data, snapshot_format))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, dst)
+    return dst
+
+
+def apply_record(data: Dict, record: Dict):
+    """把一条日志记录应用到数据字典；引用不存在的用户时抛出 KeyError"""
+    op = record["op"]
+    users = data["users"]
+    if op == "user":
+        users[record["user"]["username"]] = record["user"]
+    elif op == "password":
+        users[record["u"]]["password_hash"] = record["h"]
+    elif op == "points":
+        users[record["u"]]["points"] += record["d"]
+    elif op == "item":
+        user = users[record["u"]]
+        user["points"] += record.get("p", 0)
+        user["items"][record["t"]] = user["items"].get(record["t"], 0) + record["d"]
+    elif op == "result":
+        data["game_results"].append(record["r"])
+
 
 class LocalStorage:
     """本地存储管理器"""
     
-    def __init__(self, storage_file: str = STORAGE_FILE):
+    def __init__(self, storage_file: str = STORAGE_FILE, compact_every: int = COMPACT_EVERY,
+                 write_behind_ms: Optional[int] = None, snapshot_format: str = "json"):
+        """
+        write_behind_ms: 为 None 时每次修改立即写入日志；
+        否则修改只标记为待写，由后台线程最多每 write_behind_ms 毫秒合并写盘一次。
+        snapshot_format: 写快照使用的格式，"json" 或 "binary"（游戏记录按列二进制存储）；
+        读取时按快照头部自动识别，与该参数无关。
+        """
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"不支持的快照格式: {snapshot_format}")
         self.storage_file = storage_file
+        self.snapshot_format = snapshot_format
+        self.journal_file = storage_file + JOURNAL_SUFFIX
+        self.compact_every = compact_every
+        self.write_behind_ms = write_behind_ms
+        # _lock 保护内存数据与待写队列；_flush_lock 保证同一时间只有一个线程在写盘
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._pending: List[str] = []
+        self._password_cache = VerificationCache()
+        # 启动时只读取用户数据；游戏记录段在第一次查询历史/排行榜（或压缩快照）时才读取。
+        # _lazy_results 为 (快照路径, 段描述)，加载前新增的记录暂存在 data["game_results"] 中
+        self._lazy_results: Optional[Tuple[str, Dict]] = None
         self.data = self._load_data()
+        self._snapshot_result_count = self.data.pop("result_count", 0)
+        # 按用户的游戏记录索引（创建顺序）与各模式的最佳记录，插入时增量维护
+        self._results_by_user: Dict[str, List[Dict]] = {}
+        self._best_records: Dict[Tuple[str, Optional[str]], Dict] = {}
+        if self._lazy_results is None:
+            for result in self.data["game_results"]:
+                self._index_result(result)
+        # 日志序号：快照记录已包含的最后一条日志序号，重放时跳过不大于它的记录
+        self._journal_seq = self.data.get("journal_seq", 0)
+        self._journal_count = self._replay_journal()
+        self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        if self._journal_count >= self.compact_every:
+            self.compact()
+        
+        self._dirty = threading.Event()
+        self._closing = threading.Event()
+        self._flusher = None
+        if write_behind_ms is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="LocalStorageFlusher", daemon=True)
+            self._flusher.start()
     
     def _load_data(self) -> Dict:
-        """加载数据文件"""
-        if os.path.exists(self.storage_file):
+        """加载数据文件；当前快照损坏时退回上一份完好的快照"""
+        backup_file = self.storage_file + BACKUP_SUFFIX
+        candidates = [path for path in (self.storage_file, backup_file) if os.path.exists(path)]
+        for path in candidates:
             try:
-                with open(self.storage_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self._init_data()
+                with open(path, 'rb') as f:
+                    data, lazy = read_snapshot(f, lazy_sections=("game_results",))
+            except (OSError, SnapshotError, ValueError, KeyError) as e:
+                print(f"快照 {path} 无法读取: {e}")
+                continue
+            if path == backup_file:
+                print(f"已从备份快照 {backup_file} 恢复数据")
+            if "game_results" in lazy:
+                if "result_count" in data:
+                    self._lazy_results = (path, lazy["game_results"])
+                else:
+                    # 较早的快照没有保存记录条数，无法在不读取记录的情况下分配 id，直接读取
+                    data["game_results"] = self._read_results_section(path, lazy["game_results"])
+            return data
+        if candidates:
+            # 所有快照都已损坏：保留现场供人工排查，不直接覆盖
+            corrupt_file = f"{self.storage_file}.corrupt-{int(time.time())}"
+            os.replace(self.storage_file if os.path.exists(self.storage_file) else backup_file, corrupt_file)
+            print(f"快照全部损坏，已另存为 {corrupt_file}，使用空数据启动")
         return self._init_data()
     
     def _init_data(self) -> Dict:
@@ -35,48 +332,254 @@ class LocalStorage:
             "max_users": 10
         }
     
-    def _save_data(self):
-        """保存数据到文件"""
+    def _save_data(self, content: bytes):
+        """
+        保存快照：写临时文件并 fsync，把当前快照改名为 .bak，再把临时文件原子替换为正式快照。
+        任何一步中途崩溃，磁盘上都至少保留一份完好的快照。
+        """
+        tmp_file = self.storage_file + ".tmp"
         try:
-            with open(self.storage_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2, default=str)
+            with open(tmp_file, 'wb') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(self.storage_file):
+                os.replace(self.storage_file, self.storage_file + BACKUP_SUFFIX)
+            os.replace(tmp_file, self.storage_file)
+            self._fsync_dir()
         except Exception as e:
             print(f"保存数据失败: {e}")
+            return False
+        return True
+    
+    def _fsync_dir(self):
+        """同步目录项，保证改名操作落盘（Windows 不支持打开目录，直接跳过）"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.storage_file)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    # ========== 修改日志 ==========
+    
+    def _replay_journal(self) -> int:
+        """重放快照之后的日志记录，返回日志中的有效记录数"""
+        if not os.path.exists(self.journal_file):
+            return 0
+        count = 0
+        good_size = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 最后一行可能因崩溃只写了一半，丢弃它及之后的内容
+                    print(f"日志记录损坏，已丢弃第 {count + 1} 条之后的内容")
+                    break
+                good_size += len(line)
+                count += 1
+                if record["s"] > self._journal_seq:
+                    if record["s"] > self._journal_seq + 1:
+                        # 从备份快照恢复时，两份快照之间的修改已随日志压缩丢失
+                        print(f"日志记录 {self._journal_seq + 1}~{record['s'] - 1} 缺失")
+                    try:
+                        self._apply(record)
+                    except KeyError:
+                        print(f"日志记录 {record['s']} 引用了不存在的用户，已跳过")
+                    self._journal_seq = record["s"]
+        if good_size < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(good_size)
+        return count
+    
+    def _apply(self, record: Dict):
+        """把一条日志记录应用到内存数据（实时修改与启动重放共用）"""
+        apply_record(self.data, record)
+        if record["op"] == "result" and self._lazy_results is None:
+            self._index_result(record["r"])
+    
+    def _ensure_results(self) -> List[Dict]:
+        """确保游戏记录已从快照读入内存并建立索引，返回完整的记录列表"""
+        with self._lock:
+            if self._lazy_results is not None:
+                path, section = self._lazy_results
+                loaded = self._read_results_section(path, section)
+                self._lazy_results = None
+                self.data["game_results"] = loaded + self.data["game_results"]
+                for result in self.data["game_results"]:
+                    self._index_result(result)
+            return self.data["game_results"]
+    
+    def _result_count(self) -> int:
+        """游戏记录总数（记录段未加载时用快照中保存的条数计算）"""
+        if self._lazy_results is not None:
+            return self._snapshot_result_count + len(self.data["game_results"])
+        return len(self.data["game_results"])
+    
+    def _read_results_section(self, path: str, section: Dict) -> List[Dict]:
+        """读取快照中的游戏记录段；损坏时退回备份快照中的记录"""
+        try:
+            return read_snapshot_section(path, section)
+        except (OSError, SnapshotError, ValueError) as e:
+            print(f"快照 {path} 的游戏记录无法读取: {e}")
+        backup_file = self.storage_file + BACKUP_SUFFIX
+        if path != backup_file and os.path.exists(backup_file):
+            try:
+                with open(backup_file, 'rb') as f:
+                    print(f"游戏记录从备份快照 {backup_file} 恢复，之后新增的记录可能缺失")
+                    return read_snapshot(f)[0]["game_results"]
+            except (OSError, SnapshotError, ValueError, KeyError) as e:
+                print(f"备份快照 {backup_file} 无法读取: {e}")
+        # 保留损坏的快照供人工排查，避免下次压缩时被覆盖
+        corrupt_file = f"{self.storage_file}.corrupt-{int(time.time())}"
+        shutil.copyfile(path, corrupt_file)
+        print(f"游戏记录无法恢复，已另存损坏快照为 {corrupt_file}")
+        return []
+    
+    def _index_result(self, result: Dict):
+        """把一条游戏记录加入用户索引，并更新该用户的最佳记录"""
+        username = result["username"]
+        self._results_by_user.setdefault(username, []).append(result)
+        if result["result"] != "victory":
+            return
+        # None 表示不区分模式的汇总
+        for game_mode in (None, result["game_mode"]):
+            best = self._best_records.get((username, game_mode))
+            if best is None:
+                self._best_records[(username, game_mode)] = {"fastest": result, "fewest": result, "total": 1}
+                continue
+            best["total"] += 1
+            if result["time_seconds"] < best["fastest"]["time_seconds"]:
+                best["fastest"] = result
+            if result["steps"] < best["fewest"]["steps"]:
+                best["fewest"] = result
+    
+    def _append(self, record: Dict):
+        """
+        应用一条修改并加入待写队列，调用方必须持有 _lock。
+        需要先检查再修改的操作在同一个加锁区内完成检查和 _append，释放锁后再调用 _request_flush
+        （非写回模式下立即写盘）。
+        """
+        self._journal_seq += 1
+        record["s"] = self._journal_seq
+        self._apply(record)
+        self._pending.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._journal_count += 1
+    
+    def _request_flush(self):
+        """写盘（写回模式下通知后台线程）；不能在持有 _lock 时调用，否则会与 flush 的加锁顺序相反"""
+        if self._flusher is None:
+            self.flush()
+        else:
+            self._dirty.set()
+    
+    def _flush_loop(self):
+        """后台写盘线程：有待写修改时写盘，两次写盘之间至少间隔 write_behind_ms"""
+        interval = self.write_behind_ms / 1000.0
+        while not self._closing.is_set():
+            self._dirty.wait()
+            self._dirty.clear()
+            if self._closing.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"后台写盘失败: {e}")
+            self._closing.wait(interval)
+    
+    def flush(self, compact: bool = False):
+        """
+        把待写的日志记录写入磁盘；日志达到 compact_every 条（或 compact=True）时压缩成新快照。
+        只在持有 _lock 时取出待写记录和序列化快照，真正的磁盘写入在锁外进行。
+        """
+        with self._flush_lock:
+            with self._lock:
+                lines = self._pending
+                self._pending = []
+                snapshot = None
+                compacted = 0
+                if compact or self._journal_count >= self.compact_every:
+                    self._ensure_results()
+                    self.data["journal_seq"] = self._journal_seq
+                    snapshot = encode_snapshot(self.data, self.snapshot_format)
+                    compacted = self._journal_count
+                    self._journal_count = 0
+            
+            if lines:
+                try:
+                    self._journal.writelines(lines)
+                    self._journal.flush()
+                except Exception as e:
+                    print(f"写入日志失败: {e}")
+            if snapshot is None:
+                return
+            # 快照写成功后日志中的记录都已包含在快照里，可以清空
+            if self._save_data(snapshot):
+                self._journal.close()
+                self._journal = open(self.journal_file, 'w', encoding='utf-8')
+            else:
+                with self._lock:
+                    self._journal_count += compacted
+    
+    def compact(self):
+        """把当前数据写成新快照并清空日志"""
+        self.flush(compact=True)
+    
+    def close(self):
+        """退出前停止后台线程，写完待写修改并压缩日志"""
+        if self._journal.closed:
+            return
+        if self._flusher is not None:
+            self._closing.set()
+            self._dirty.set()
+            self._flusher.join()
+            self._flusher = None
+        if self._journal_count:
+            self.compact()
+        else:
+            self.flush()
+        self._journal.close()
     
     def _hash_password(self, password: str) -> str:
-        """密码哈希（仅用于演示）"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """密码哈希（加盐 KDF，参数随哈希一起保存）"""
+        return hash_password(password)
     
     # ========== 用户管理 ==========
     
     def register_user(self, username: str, password: str) -> Dict:
-        """注册用户"""
-        users = self.data["users"]
-        
-        # 检查用户数量限制
-        if len(users) >= self.data["max_users"]:
-            raise Exception(f"用户数量已达上限（最多{self.data['max_users']}人）")
-        
-        # 检查用户名是否已存在
-        if username in users:
-            raise Exception("用户名已存在")
+        """注册用户（KDF 计算较慢，可在工作线程中调用）"""
+        # 先在锁外计算哈希，避免长时间占用存储锁
+        password_hash = self._hash_password(password)
         
-        # 创建新用户
-        user_id = len(users) + 1
-        user_data = {
-            "id": user_id,
-            "username": username,
-            "password_hash": self._hash_password(password),
-            "points": 50,  # 新用户初始积分
-            "items": {
-                "delay": 0,  # 延时道具数量
-                "block": 0,  # 阻挡道具数量
-                "reveal": 0  # 直接翻牌道具数量
-            },
-            "created_at": datetime.now().isoformat()
-        }
-        users[username] = user_data
-        self._save_data()
+        with self._lock:
+            users = self.data["users"]
+            
+            # 检查用户数量限制
+            if len(users) >= self.data["max_users"]:
+                raise Exception(f"用户数量已达上限（最多{self.data['max_users']}人）")
+            
+            # 检查用户名是否已存在
+            if username in users:
+                raise Exception("用户名已存在")
+            
+            # 创建新用户
+            user_id = len(users) + 1
+            user_data = {
+                "id": user_id,
+                "username": username,
+                "password_hash": password_hash,
+                "points": 50,  # 新用户初始积分
+                "items": {
+                    "delay": 0,  # 延时道具数量
+                    "block": 0,  # 阻挡道具数量
+                    "reveal": 0  # 直接翻牌道具数量
+                },
+                "created_at": datetime.now().isoformat()
+            }
+            self._append({"op": "user", "user": user_data})
+        self._request_flush()
         
         return {
             "id": user_data["id"],
@@ -86,111 +589,119 @@ class LocalStorage:
         }
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
-        """验证用户"""
-        users = self.data["users"]
-        if username not in users:
-            return None
-        
-        user = users[username]
-        password_hash = self._hash_password(password)
+        """
+        验证用户（KDF 计算较慢，可在工作线程中调用）；旧格式哈希在验证成功后自动升级。
+        在锁内读取哈希，锁外做 KDF 计算；升级时在锁内确认哈希未被并发修改后再写入，只有一次升级生效。
+        """
+        with self._lock:
+            user = self.data["users"].get(username)
+            if user is None:
+                return None
+            stored_hash = user["password_hash"]
         
-        if user["password_hash"] != password_hash:
+        if not self._password_cache.verify(password, stored_hash):
             return None
         
-        return {
-            "id": user["id"],
-            "username": user["username"],
-            "points": user["points"],
-            "items": user["items"],
-            "created_at": user["created_at"]
-        }
+        if needs_rehash(stored_hash):
+            new_hash = self._hash_password(password)
+            with self._lock:
+                rehashed = self.data["users"][username]["password_hash"] == stored_hash
+                if rehashed:
+                    self._append({"op": "password", "u": username, "h": new_hash})
+            if rehashed:
+                self._request_flush()
+                self._password_cache.remember(password, new_hash)
+        
+        return self.get_user(username)
     
     def get_user(self, username: str) -> Optional[Dict]:
         """获取用户信息"""
-        users = self.data["users"]
-        if username not in users:
-            return None
-        
-        user = users[username]
-        return {
-            "id": user["id"],
-            "username": user["username"],
-            "points": user["points"],
-            "items": user["items"],
-            "created_at": user["created_at"]
-        }
+        with self._lock:
+            users = self.data["users"]
+            if username not in users:
+                return None
+            
+            user = users[username]
+            return {
+                "id": user["id"],
+                "username": user["username"],
+                "points": user["points"],
+                "items": dict(user["items"]),
+                "created_at": user["created_at"]
+            }
     
     def update_user_points(self, username: str, points: int):
         """更新用户积分"""
-        users = self.data["users"]
-        if username in users:
-            users[username]["points"] += points
-            self._save_data()
-            return users[username]["points"]
-        return None
+        with self._lock:
+            users = self.data["users"]
+            if username not in users:
+                return None
+            self._append({"op": "points", "u": username, "d": points})
+            new_points = users[username]["points"]
+        self._request_flush()
+        return new_points
     
     def buy_item(self, username: str, item_type: str, cost: int) -> bool:
-        """购买道具"""
-        users = self.data["users"]
-        if username not in users:
-            return False
-        
-        user = users[username]
-        if user["points"] < cost:
-            return False
-        
-        user["points"] -= cost
-        if item_type in user["items"]:
-            user["items"][item_type] += 1
-        else:
-            user["items"][item_type] = 1
-        
-        self._save_data()
+        """购买道具（余额检查与扣分在同一个加锁区内，并发购买不会重复扣分）"""
+        with self._lock:
+            users = self.data["users"]
+            if username not in users:
+                return False
+            
+            user = users[username]
+            if user["points"] < cost:
+                return False
+            
+            self._append({"op": "item", "u": username, "t": item_type, "d": 1, "p": -cost})
+        self._request_flush()
         return True
     
     def use_item(self, username: str, item_type: str) -> bool:
-        """使用道具"""
-        users = self.data["users"]
-        if username not in users:
-            return False
-        
-        user = users[username]
-        if item_type not in user["items"] or user["items"][item_type] <= 0:
-            return False
-        
-        user["items"][item_type] -= 1
-        self._save_data()
+        """使用道具（数量检查与扣减在同一个加锁区内）"""
+        with self._lock:
+            users = self.data["users"]
+            if username not in users:
+                return False
+            
+            user = users[username]
+            if item_type not in user["items"] or user["items"][item_type] <= 0:
+                return False
+            
+            self._append({"op": "item", "u": username, "t": item_type, "d": -1})
+        self._request_flush()
         return True
     
     # ========== 游戏记录 ==========
     
     def add_game_result(self, username: str, game_mode: str, time_seconds: int, 
                        steps: int, score: int = 0, result: str = "victory"):
-        """添加游戏结果"""
-        result_data = {
-            "id": len(self.data["game_results"]) + 1,
-            "username": username,
-            "game_mode": game_mode,
-            "time_seconds": time_seconds,
-            "steps": steps,
-            "score": score,
-            "result": result,
-            "created_at": datetime.now().isoformat()
-        }
-        self.data["game_results"].append(result_data)
-        self._save_data()
+        """添加游戏结果（分配 id 与写入在同一个加锁区内，并发添加不会得到相同的 id）"""
+        with self._lock:
+            result_data = {
+                "id": self._result_count() + 1,
+                "username": username,
+                "game_mode": game_mode,
+                "time_seconds": time_seconds,
+                "steps": steps,
+                "score": score,
+                "result": result,
+                "created_at": datetime.now().isoformat()
+            }
+            self._append({"op": "result", "r": result_data})
+        self._request_flush()
         return result_data
     
     def get_user_history(self, username: str, limit: int = 100) -> List[Dict]:
-        """获取用户游戏历史"""
-        results = [r for r in self.data["game_results"] if r["username"] == username]
-        return sorted(results, key=lambda x: x["created_at"], reverse=True)[:limit]
+        """获取用户游戏历史（按创建时间倒序，直接从用户索引末尾切片）"""
+        self._ensure_results()
+        results = self._results_by_user.get(username, [])
+        return results[max(len(results) - limit, 0):][::-1]
     
     def get_leaderboard(self, game_mode: Optional[str] = None, sort_by: str = "time", limit: int = 10) -> List[Dict]:
         """获取排行榜
         sort_by: "time" 按时间排序, "steps" 按步数排序
         """
-        results = self.data["game_results"].copy()
+        results = self._ensure_results().copy()
         
         # 过滤游戏模式
         if game_mode:
@@ -208,14 +719,11 @@ class LocalStorage:
         return results[:limit]
     
     def get_user_best_records(self, username: str, game_mode: Optional[str] = None) -> Dict:
-        """获取用户最佳记录"""
-        user_results = [r for r in self.data["game_results"] 
-                       if r["username"] == username and r["result"] == "victory"]
+        """获取用户最佳记录（读取插入时维护的汇总，O(1)）"""
+        self._ensure_results()
+        best = self._best_records.get((username, game_mode or None))
         
-        if game_mode:
-            user_results = [r for r in user_results if r["game_mode"] == game_mode]
-        
-        if not user_results:
+        if best is None:
             return {
                 "fastest_time": None,
                 "fastest_time_date": None,
@@ -224,14 +732,76 @@ class LocalStorage:
                 "total_games": 0
             }
         
-        fastest = min(user_results, key=lambda x: x["time_seconds"])
-        fewest = min(user_results, key=lambda x: x["steps"])
+        fastest = best["fastest"]
+        fewest = best["fewest"]
         
         return {
             "fastest_time": fastest["time_seconds"],
             "fastest_time_date": fastest["created_at"],
             "fewest_steps": fewest["steps"],
             "fewest_steps_date": fewest["created_at"],
-            "total_games": len(user_results)
+            "total_games": best["total"]
         }
 
+
+def load_storage_data(storage_file: str = STORAGE_FILE) -> Dict:
+    """
+    只读地读取 LocalStorage 的完整数据，供导入到其他存储时使用：
+    快照无法读取时用备份快照，再在内存中重放日志。不创建、截断、改名或改写任何文件。
+    """
+    data = None
+    for path in (storage_file, storage_file + BACKUP_SUFFIX):
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'rb') as f:
+                data = read_snapshot(f)[0]
+            break
+        except (OSError, SnapshotError, ValueError, KeyError) as e:
+            print(f"快照 {path} 无法读取: {e}")
+    if data is None:
+        data = {"users": {}, "game_results": [], "max_users": 10}
+    data.pop("result_count", None)
+
+    journal_seq = data.get("journal_seq", 0)
+    journal_file = storage_file + JOURNAL_SUFFIX
+    if os.path.exists(journal_file):
+        with open(journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 写到一半的日志尾部：只忽略，不截断（文件归 LocalStorage 自己修复）
+                    break
+                if record["s"] > journal_seq:
+                    try:
+                        apply_record(data, record)
+                    except KeyError:
+                        print(f"日志记录 {record['s']} 引用了不存在的用户，已跳过")
+                    journal_seq = record["s"]
+    return data
+
+
+def create_storage(backend: Optional[str] = None):
+    """
+    按配置创建存储：backend 为 "json"（默认，LocalStorage）或 "sqlite"（SQLiteStorage）。
+    未指定时读取环境变量 GAME_STORAGE。SQLite 库首次创建时会导入已有的 JSON 数据。
+    """
+    backend = backend or os.environ.get("GAME_STORAGE", "json")
+    if backend == "sqlite":
+        from sqlite_storage import SQLiteStorage, SQLITE_FILE
+        return SQLiteStorage(SQLITE_FILE, import_from=STORAGE_FILE)
+    # 游戏内使用写回模式，避免每次配对成功都在主循环里写盘
+    return LocalStorage(write_behind_ms=WRITE_BEHIND_MS,
+                        snapshot_format=os.environ.get("GAME_SNAPSHOT_FORMAT", "json"))
+
+
+if __name__ == "__main__":
+    # 快照格式转换：python local_storage.py game_data.json --format binary
+    import argparse
+    parser = argparse.ArgumentParser(description="转换 LocalStorage 快照格式")
+    parser.add_argument("src", nargs="?", default=STORAGE_FILE)
+    parser.add_argument("--dst", default=None, help="输出文件，缺省时原地转换")
+    parser.add_argument("--format", choices=SNAPSHOT_FORMATS, default="binary")
+    args = parser.parse_args()
+    print(f"已转换: {convert_snapshot(args.src, args.dst, args.format)}")
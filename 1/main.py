@@ -1,11 +1,17 @@
 import pygame
 import sys
+import threading
 import time
 import os
 from ui import GameUI
 from modes.simple_mode import SimpleGame
 from modes.dynamic_maze import DynamicMazeGame
-from local_storage import LocalStorage
+from local_storage import create_storage
+from core.flip_result import FlipResult
+from core.timers import TimerScheduler
+
+# 工作线程完成登录/注册后投递到主循环的事件
+AUTH_RESULT_EVENT = pygame.USEREVENT + 1
 
 class MemoryMatchGame:
     """记忆迷宫游戏主控制器"""
@@ -16,8 +22,12 @@ class MemoryMatchGame:
         self.screen = pygame.display.set_mode((1000, 700))
         pygame.display.set_caption("Memory Match Game")
         
+        # 定时调度器：翻牌展示、胜利过渡、消息过期等延时操作都在这里排队，不阻塞主循环
+        self.timers = TimerScheduler()
+        
         # 初始化UI模块
         self.ui = GameUI(self.screen)
+        self.ui.timers = self.timers
         
         # 游戏状态
         self.current_game = None
@@ -31,9 +41,15 @@ class MemoryMatchGame:
         self.step_count = 0
         self.timer_active = False
         self.waiting_to_hide = False
+        self.flip_timer = 0
+        self.victory_pending = False  # 最后一对已配对，等待进入胜利界面
+        self.last_hud_second = None  # HUD 上次显示的秒数，变化时才重绘
         
         # 本地存储系统（替代后端）
-        self.storage = LocalStorage()
+        self.storage = create_storage()
+        
+        # 登录/注册的密码哈希计算较慢，在工作线程中进行
+        self.auth_pending = False
         
         # 用户信息
         self.user_logged_in = False
@@ -46,26 +62,71 @@ class MemoryMatchGame:
     
     
     def run(self):
-        """主游戏循环"""
+        """主游戏循环（事件驱动：界面没有变化时阻塞等待事件，不再空转重绘）"""
         while self.running:
-            # 处理事件
+            # 处理事件（空闲时阻塞等待）
             self.handle_events()
             
             # 更新游戏状态
             self.update_game_state()
             
-            # 渲染界面
-            self.ui.render(self.game_state, self.current_game, self.waiting_to_hide, self.elapsed_time, self.step_count, self.points, self.user_logged_in, self.username, self.user_items)
-            
-            # 控制帧率
-            self.clock.tick(60)
+            # 渲染界面（仅在被标记为需要重绘时）
+            if self.ui.dirty:
+                self.ui.render(self.game_state, self.current_game, self.waiting_to_hide, self.elapsed_time, self.step_count, self.points, self.user_logged_in, self.username, self.user_items)
+                # 控制帧率
+                self.clock.tick(60)
         
+        # 把未压缩的修改日志写回快照
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
         pygame.quit()
         sys.exit()
 
+    def get_reveal_ms(self):
+        """翻牌后的展示时长（毫秒）"""
+        if hasattr(self.current_game, 'get_reveal_duration_ms'):
+            return self.current_game.get_reveal_duration_ms()
+        return 1000  # 默认1秒
+
+    def get_idle_timeout_ms(self):
+        """距离下一次定时变化（计时器跳秒、定时回调到期）的毫秒数，没有则返回 None"""
+        now = pygame.time.get_ticks()
+        deadlines = []
+        next_deadline = self.timers.next_deadline()
+        if next_deadline is not None:
+            deadlines.append(next_deadline)
+        if self.timer_active and self.game_state == "game" and not self.victory_pending:
+            # HUD 上的时间按秒显示，只需在跳秒时刷新
+            if hasattr(self.current_game, 'get_remaining_time_ms'):
+                ms_to_tick = self.current_game.get_remaining_time_ms() % 1000 or 1000
+            else:
+                ms_to_tick = 1000 - int((time.time() - self.start_time) * 1000) % 1000
+            deadlines.append(now + ms_to_tick)
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - now)
+
+    def wait_for_events(self):
+        """空闲时阻塞等待事件，最多等到下一次定时变化"""
+        timeout = self.get_idle_timeout_ms()
+        if timeout is None:
+            event = pygame.event.wait()
+        elif timeout == 0:
+            return pygame.event.get()
+        else:
+            event = pygame.event.wait(timeout)
+        if event.type == pygame.NOEVENT:
+            return []
+        return [event] + pygame.event.get()
+
     def handle_events(self):
         """处理游戏事件"""
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        if not events and not self.ui.dirty:
+            events = self.wait_for_events()
+        for event in events:
+            # 任何输入都可能改变界面（按钮悬停、输入框文字、翻牌等）
+            self.ui.invalidate()
             if event.type == pygame.QUIT:
                 self.running = False
             
@@ -85,6 +146,9 @@ class MemoryMatchGame:
                 # 再处理功能键
                 self.handle_keyboard(event.key)
             
+            elif event.type == AUTH_RESULT_EVENT:
+                self.handle_auth_result(event)
+            
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:
                     mouse_pos = pygame.mouse.get_pos()
@@ -192,7 +256,7 @@ class MemoryMatchGame:
     
     def handle_game_click(self, mouse_pos):
         """处理游戏中的点击"""
-        if self.waiting_to_hide:
+        if self.waiting_to_hide or self.victory_pending:
             print("正在等待隐藏，忽略点击")
             return  # 正在处理翻牌，忽略点击
         
@@ -251,58 +315,89 @@ class MemoryMatchGame:
         elif action == "refresh":
             self.show_leaderboard()
     
+    def run_auth_task(self, action, func, *args):
+        """在工作线程中执行登录/注册（密码 KDF 计算较慢），完成后通过事件通知主循环"""
+        self.auth_pending = True
+        
+        def worker():
+            try:
+                result = func(*args)
+                error = None
+            except Exception as e:
+                result = None
+                error = str(e)
+            pygame.event.post(pygame.event.Event(AUTH_RESULT_EVENT, action=action, result=result, error=error))
+        
+        threading.Thread(target=worker, name=f"auth-{action}", daemon=True).start()
+    
+    def handle_auth_result(self, event):
+        """处理工作线程返回的登录/注册结果"""
+        self.auth_pending = False
+        if event.action == "login":
+            self.finish_login(event.result, event.error)
+        elif event.action == "register":
+            self.finish_register(event.result, event.error)
+    
     def authenticate_user(self, username, password):
         """认证用户（使用本地存储）"""
-        try:
-            if not username or not username.strip():
-                if hasattr(self.ui, 'show_message'):
-                    self.ui.show_message("登录失败", "请输入用户名")
-                return
-            if not password or not password.strip():
-                if hasattr(self.ui, 'show_message'):
-                    self.ui.show_message("登录失败", "请输入密码")
-                return
-            
-            user_data = self.storage.authenticate_user(username, password)
-            if user_data:
-                self.user_logged_in = True
-                self.username = user_data["username"]
-                self.points = user_data["points"]
-                self.user_items = user_data.get("items", {"delay": 0, "block": 0, "reveal": 0})
-                self.return_to_menu()
-                print("登录成功！")
-            else:
-                if hasattr(self.ui, 'show_message'):
-                    self.ui.show_message("登录失败", "用户名或密码错误")
-        except Exception as e:
-            print(f"登录失败: {e}")
+        if self.auth_pending:
+            return
+        if not username or not username.strip():
+            if hasattr(self.ui, 'show_message'):
+                self.ui.show_message("登录失败", "请输入用户名")
+            return
+        if not password or not password.strip():
             if hasattr(self.ui, 'show_message'):
-                self.ui.show_message("登录失败", str(e))
+                self.ui.show_message("登录失败", "请输入密码")
+            return
+        
+        self.run_auth_task("login", self.storage.authenticate_user, username, password)
+    
+    def finish_login(self, user_data, error=None):
+        """登录校验完成"""
+        if error:
+            print(f"登录失败: {error}")
+            if hasattr(self.ui, 'show_message'):
+                self.ui.show_message("登录失败", error)
+        elif user_data:
+            self.user_logged_in = True
+            self.username = user_data["username"]
+            self.points = user_data["points"]
+            self.user_items = user_data.get("items", {"delay": 0, "block": 0, "reveal": 0})
+            self.return_to_menu()
+            print("登录成功！")
+        else:
+            if hasattr(self.ui, 'show_message'):
+                self.ui.show_message("登录失败", "用户名或密码错误")
     
     def register_user(self, username, password):
         """注册用户（使用本地存储）"""
-        try:
-            if not username or not username.strip():
-                if hasattr(self.ui, 'show_message'):
-                    self.ui.show_message("注册失败", "请输入用户名")
-                return
-            if not password or not password.strip():
-                if hasattr(self.ui, 'show_message'):
-                    self.ui.show_message("注册失败", "请输入密码")
-                return
-            
-            user_data = self.storage.register_user(username, password)
-            if user_data:
-                if hasattr(self.ui, 'show_message'):
-                    self.ui.show_message("注册成功", "请登录")
-                self.show_login()
-            else:
-                if hasattr(self.ui, 'show_message'):
-                    self.ui.show_message("注册失败", "注册失败，请重试")
-        except Exception as e:
-            print(f"注册失败: {e}")
+        if self.auth_pending:
+            return
+        if not username or not username.strip():
+            if hasattr(self.ui, 'show_message'):
+                self.ui.show_message("注册失败", "请输入用户名")
+            return
+        if not password or not password.strip():
+            if hasattr(self.ui, 'show_message'):
+                self.ui.show_message("注册失败", "请输入密码")
+            return
+        
+        self.run_auth_task("register", self.storage.register_user, username, password)
+    
+    def finish_register(self, user_data, error=None):
+        """注册完成"""
+        if error:
+            print(f"注册失败: {error}")
+            if hasattr(self.ui, 'show_message'):
+                self.ui.show_message("注册失败", error)
+        elif user_data:
             if hasattr(self.ui, 'show_message'):
-                self.ui.show_message("注册失败", str(e))
+                self.ui.show_message("注册成功", "请登录")
+            self.show_login()
+        else:
+            if hasattr(self.ui, 'show_message'):
+                self.ui.show_message("注册失败", "注册失败，请重试")
     
     def buy_delay_item(self):
         """购买延时道具（使用本地存储）"""
@@ -451,7 +546,7 @@ class MemoryMatchGame:
         try:
             self.current_game = SimpleGame(4, 4)
             self.game_state = "game"
-            self.waiting_to_hide = False
+            self.cancel_game_timers()
             self.start_time = time.time()
             self.timer_active = True
             self.step_count = 0
@@ -475,7 +570,7 @@ class MemoryMatchGame:
                 
                 print(f"道具同步后 - 游戏道具: 延时={self.current_game.delay_item_count}, 阻挡={self.current_game.block_item_count}")
             self.game_state = "game"
-            self.waiting_to_hide = False
+            self.cancel_game_timers()
             self.start_time = time.time()
             self.timer_active = True
             self.step_count = 0
@@ -584,74 +679,71 @@ class MemoryMatchGame:
     def flip_card(self, row, col):
         """翻牌操作"""
         try:
-            # flip_card返回True表示配对成功，False表示配对失败或第一次翻牌
-            matched = self.current_game.flip_card(row, col)
+            # 游戏返回结构化的翻牌结果（第一张 / 配对成功 / 配对失败 / 无效），无需读取整个网格
+            result = self.current_game.flip(row, col)
+            if result.kind == FlipResult.IGNORED:
+                # 点到已翻开/已配对的卡牌（或已超时）不算一步
+                return
             self.step_count += 1
             
-            if matched:
+            if result.matched:
                 # 配对成功 - 也需要等待一段时间让用户看到匹配的卡牌
                 print("配对成功！")
                 self.handle_pair_matched()
                 # 设置等待状态，让匹配成功的卡牌也显示一段时间
-                self.waiting_to_hide = True
-                self.flip_timer = pygame.time.get_ticks()
+                self.start_reveal_wait()
                 # 检查游戏是否完成
                 if self.current_game.is_completed():
-                    # 游戏完成，但也要等待显示时间
-                    pygame.time.wait(1000)  # 等待1秒让用户看到最后匹配的卡牌
-                    self.game_state = "victory"
-                    print("游戏完成！")
-                    self.upload_game_result("victory")
-                    # 刷新用户信息
-                    if self.user_logged_in:
-                        user = self.storage.get_user(self.username)
-                        if user:
-                            self.points = user["points"]
-            else:
-                # 检查是否有两张卡片被翻开但未匹配（配对失败，需要隐藏）
-                flipped_count = 0
-                if hasattr(self.current_game, 'get_grid_state'):
-                    grid_state = self.current_game.get_grid_state()
-                    for row in grid_state:
-                        for card_id, is_flipped, is_matched in row:
-                            if is_flipped and not is_matched:
-                                flipped_count += 1
-                
-                # 如果有两张卡片被翻开但未匹配，说明配对失败，需要隐藏
-                if flipped_count == 2:
-                    self.waiting_to_hide = True
-                    self.flip_timer = pygame.time.get_ticks()
+                    # 游戏完成，1秒后再进入胜利界面，让用户看到最后匹配的卡牌（期间不阻塞主循环）
+                    self.victory_pending = True
+                    self.timers.schedule("victory", pygame.time.get_ticks() + 1000, self.finish_victory)
+            elif result.mismatched:
+                # 两张卡片被翻开但未匹配，展示一段时间后隐藏
+                self.start_reveal_wait()
         except Exception as e:
             print(f"翻牌错误: {e}")
             import traceback
             traceback.print_exc()
     
-    def is_second_flip(self):
-        """检查是否是第二次翻牌（配对失败的情况）"""
-        # 如果_first_selected和_second_selected都已设置，说明已经完成配对检查
-        # 如果_first_selected已设置但_second_selected为None，说明只翻了一张牌
-        # 配对失败后，两者都会被重置为None
-        # 所以这里应该检查：是否已经完成配对检查但配对失败
-        if not hasattr(self.current_game, '_first_selected'):
-            return False
-        # 如果_first_selected为None，说明没有翻牌或已重置，不是第二次翻牌
-        if self.current_game._first_selected is None:
-            return False
-        # 如果_second_selected不为None，说明已经完成配对检查
-        if self.current_game._second_selected is not None:
-            return False
-        # 如果_first_selected不为None但_second_selected为None，说明只翻了一张牌
-        # 但这不是"第二次翻牌"的情况，因为第二次翻牌会触发配对检查
-        # 实际上，配对失败后，两者都会被重置，所以这里应该检查是否有翻开的卡片
-        # 更简单的方法：检查是否有两张卡片被翻开但未匹配
-        flipped_count = 0
-        if hasattr(self.current_game, 'get_grid_state'):
-            grid_state = self.current_game.get_grid_state()
-            for row in grid_state:
-                for card_id, is_flipped, is_matched in row:
-                    if is_flipped and not is_matched:
-                        flipped_count += 1
-        return flipped_count == 2
+    def start_reveal_wait(self):
+        """翻开的两张牌展示一段时间后再隐藏"""
+        self.waiting_to_hide = True
+        self.flip_timer = pygame.time.get_ticks()
+        self.timers.schedule("hide_flipped", self.flip_timer + self.get_reveal_ms(), self.finish_reveal_wait)
+    
+    def finish_reveal_wait(self):
+        """展示时间到：隐藏未匹配的卡片，必要时提示洗牌"""
+        # 对局已结束（如超时失败）时保持结束时的画面
+        if self.current_game and self.game_state == "game":
+            # 检查是否需要洗牌
+            if hasattr(self.current_game, 'pending_shuffle') and self.current_game.pending_shuffle:
+                if hasattr(self.ui, 'show_message'):
+                    self.ui.show_message("洗牌", "连续匹配失败，正在洗牌...")
+                print("触发洗牌！")
+            # 只隐藏未匹配的卡片，已匹配的卡片保持显示
+            self.current_game.hide_all_flipped()
+        self.waiting_to_hide = False
+        self.ui.invalidate()
+    
+    def finish_victory(self):
+        """胜利过渡结束，进入胜利界面"""
+        self.victory_pending = False
+        self.game_state = "victory"
+        self.ui.invalidate()
+        print("游戏完成！")
+        self.upload_game_result("victory")
+        # 刷新用户信息
+        if self.user_logged_in:
+            user = self.storage.get_user(self.username)
+            if user:
+                self.points = user["points"]
+    
+    def cancel_game_timers(self):
+        """离开或重开对局时取消未触发的对局定时器"""
+        self.timers.cancel("hide_flipped")
+        self.timers.cancel("victory")
+        self.waiting_to_hide = False
+        self.victory_pending = False
     
     def handle_pair_matched(self):
         """处理配对成功"""
@@ -665,37 +757,35 @@ class MemoryMatchGame:
     
     def update_game_state(self):
         """更新游戏状态（如计时器等）"""
-        if self.timer_active and self.game_state == "game":
+        # 触发到期的定时回调（翻牌隐藏、胜利过渡、消息过期）
+        self.timers.run_due(pygame.time.get_ticks())
+        # 胜利过渡期间停止计时，用时按完成时刻计算
+        if self.timer_active and self.game_state == "game" and not self.victory_pending:
             current_time = time.time()
             self.elapsed_time = int(current_time - self.start_time)
             
+            # HUD 显示的秒数变化时才需要重绘
+            hud_second = self.elapsed_time
+            if hasattr(self.current_game, 'get_remaining_time_ms'):
+                hud_second = self.current_game.get_remaining_time_ms() // 1000
+            if hud_second != self.last_hud_second:
+                self.last_hud_second = hud_second
+                self.ui.invalidate()
+            
             # 检查困难模式的时间限制
             if hasattr(self.current_game, 'is_time_over'):
                 if self.current_game.is_time_over():
                     self.game_state = "defeat"
+                    self.ui.invalidate()
                     print("时间到！你输了。")
                     self.upload_game_result("defeat")
             else:
                 # 简单模式：3分钟倒计时
                 if self.elapsed_time >= 180:  # 3分钟倒计时
                     self.game_state = "defeat"
+                    self.ui.invalidate()
                     print("时间到！你输了。")
                     self.upload_game_result("defeat")
-                    
-            if self.waiting_to_hide:
-                reveal_ms = 1000  # 默认1秒
-                if hasattr(self.current_game, 'get_reveal_duration_ms'):
-                    reveal_ms = self.current_game.get_reveal_duration_ms()
-                if pygame.time.get_ticks() - self.flip_timer > reveal_ms:
-                    if self.current_game:
-                        # 检查是否需要洗牌
-                        if hasattr(self.current_game, 'pending_shuffle') and self.current_game.pending_shuffle:
-                            if hasattr(self.ui, 'show_message'):
-                                self.ui.show_message("洗牌", "连续匹配失败，正在洗牌...")
-                            print("触发洗牌！")
-                        # 只隐藏未匹配的卡片，已匹配的卡片保持显示
-                        self.current_game.hide_all_flipped()
-                    self.waiting_to_hide = False
     
     def upload_game_result(self, result):
         """保存游戏结果到本地存储"""
@@ -745,12 +835,16 @@ class MemoryMatchGame:
         # 停止文本输入模式
         pygame.key.stop_text_input()
         self.current_game = None
-        self.waiting_to_hide = False
+        self.cancel_game_timers()
         self.timer_active = False
         self.start_time = 0
         self.elapsed_time = 0
         self.step_count = 0
         
+        # 对局结束，把写回队列中的修改落盘
+        if hasattr(self.storage, 'flush'):
+            self.storage.flush()
+        
         # 刷新用户信息（从本地存储）
         if self.user_logged_in:
             user = self.storage.get_user(self.username)
@@ -1,13 +1,19 @@
-from typing import List, Tuple, Dict, Optional
-from core.card import Card
-from core.utils import fisher_yates_shuffle, is_valid_position, shuffle_subset_inplace
+from typing import Callable, List, Set, Tuple, Dict, Optional
+from core.board import BoardCard, CardBoard
+from core.flip_result import FLIP_IGNORED, FlipResult
+from core.utils import fisher_yates_shuffle, is_valid_position
 import time
 
 
 class DynamicMazeGame:
 
 
-    def __init__(self, rows: int, cols: int, patterns: List[str] = None):
+    def __init__(self, rows: int, cols: int, patterns: List[str] = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        clock: 时间来源（秒），默认使用 time.time；无界面模拟时可注入虚拟时钟。
+        """
+        self._clock = clock
 
         self.rows = rows
         self.cols = cols
@@ -29,7 +35,8 @@ class DynamicMazeGame:
             paired_ids.append(self.single_id)
 
         shuffled = fisher_yates_shuffle(paired_ids)
-        self.nodes: List[Card] = [Card(card_id) for card_id in shuffled]
+        # 列式存储：节点以数组列保存，nodes[idx] 返回与 Card 接口一致的视图
+        self.nodes: CardBoard = CardBoard(shuffled, clock=clock)
 
         self.graph: Dict[int, List[int]] = self._build_grid_adjacency()
 
@@ -41,14 +48,20 @@ class DynamicMazeGame:
         self.pending_shuffle: bool = False
         self.shuffle_block_until: float = 0.0
         self.time_limit_ms: int = 180000
-        self.started_at: float = time.time()
+        self.started_at: float = self._clock()
         self.game_over: bool = False
         self.reveal_duration_ms: int = 1000
         self.last_shuffle_at: float = 0.0
+        self.shuffle_count: int = 0
         self.delay_item_count: int = 1
         self.block_item_count: int = 1
         self.matched_pairs: int = 0
         self.shuffle_counting_started: bool = False
+        # 增量维护：剩余未配对的对数（单张不计入）、当前翻开未配对的位置
+        self._unmatched_pairs: int = needed
+        self._flipped_positions: Set[Tuple[int, int]] = set()
+        # 状态发生变化、界面需要重绘的位置（界面局部重绘时取走）
+        self._changed_positions: Set[Tuple[int, int]] = set()
 
     def _index(self, row: int, col: int) -> int:
         return row * self.cols + col
@@ -104,37 +117,46 @@ class DynamicMazeGame:
                     dq.append(v)
         return -1
 
-    def get_card(self, row: int, col: int) -> Card:
+    def get_card(self, row: int, col: int) -> BoardCard:
         if not is_valid_position(row, col, self.rows, self.cols):
             raise IndexError("坐标超出网格范围。")
         return self.nodes[self._index(row, col)]
 
     def flip_card(self, row: int, col: int) -> bool:
+        """
+        翻开位于 (row, col) 的卡片，返回是否配对成功（兼容旧接口，详见 flip）。
+        """
+        return self.flip(row, col).matched
+
+    def flip(self, row: int, col: int) -> FlipResult:
         """
         翻开位于 (row, col) 的卡片。
         - 第一次翻牌：任意节点允许
         - 第二次翻牌：必须是第一次的邻居节点（graph 中距离为 1）
-        返回：是否配对成功（True 表示成功配对；False 表示未配对）
+        返回：FlipResult（first / matched / mismatched / ignored）
         失败时保留两张牌为翻开状态，等待外部调用 hide_all_flipped() 盖回。
         """
         if not is_valid_position(row, col, self.rows, self.cols):
             raise IndexError("坐标超出网格范围。")
         if self.is_time_over():
             self.game_over = True
-            return False
+            return FLIP_IGNORED
 
         card = self.get_card(row, col)
         if card.is_matched or card.is_flipped:
-            return False  # 已配对或已翻开，不可重复翻
+            return FLIP_IGNORED  # 已配对或已翻开，不可重复翻
 
+        card.flip()
+        self._flipped_positions.add((row, col))
+        self._changed_positions.add((row, col))
         if self._first_selected is None:
-            card.flip()
             self._first_selected = (row, col)
-            return False
+            return FlipResult(FlipResult.FIRST, ((row, col),))
 
-        card.flip()
+        first = self._first_selected
         self._second_selected = (row, col)
-        return self._evaluate_pair()
+        kind = FlipResult.MATCHED if self._evaluate_pair() else FlipResult.MISMATCHED
+        return FlipResult(kind, (first, (row, col)))
 
     def _evaluate_pair(self) -> bool:
         r1, c1 = self._first_selected
@@ -146,6 +168,10 @@ class DynamicMazeGame:
         if card1.id == card2.id:
             card1.set_matched()
             card2.set_matched()
+            self._flipped_positions.discard((r1, c1))
+            self._flipped_positions.discard((r2, c2))
+            self._changed_positions.update(((r1, c1), (r2, c2)))
+            self._unmatched_pairs -= 1
             pair_score = card1.score_weight + card2.score_weight
             self.score += pair_score
             matched = True
@@ -159,7 +185,7 @@ class DynamicMazeGame:
         else:
             if self.shuffle_counting_started:
                 self.fail_count += 1
-                if self.fail_count >= self.shuffle_threshold and time.time() >= self.shuffle_block_until:
+                if self.fail_count >= self.shuffle_threshold and self._clock() >= self.shuffle_block_until:
                     self.pending_shuffle = True
                     self.fail_count = 0
 
@@ -169,34 +195,34 @@ class DynamicMazeGame:
         return matched
 
     def hide_all_flipped(self) -> None:
-        for card in self.nodes:
-            if card.is_flipped and not card.is_matched:
-                card.hide()
-        if self.pending_shuffle and time.time() >= self.shuffle_block_until:
+        # 只把增量维护的翻开位置交给棋盘批量盖回，不扫描整盘
+        self.nodes.hide_flipped([self._index(r, c) for r, c in self._flipped_positions])
+        self._changed_positions.update(self._flipped_positions)
+        self._flipped_positions.clear()
+        if self.pending_shuffle and self._clock() >= self.shuffle_block_until:
             self._shuffle_unmatched()
             self.pending_shuffle = False
 
+    def pop_changed_positions(self) -> Set[Tuple[int, int]]:
+        """返回并清空上次调用以来状态发生变化的位置（界面据此只重绘这些卡牌）"""
+        changed = self._changed_positions
+        self._changed_positions = set()
+        return changed
+
+    def get_flipped_count(self) -> int:
+        """当前翻开但未配对的卡片数量"""
+        return len(self._flipped_positions)
+
     def is_completed(self) -> bool:
-        for card in self.nodes:
-            if self.single_id is not None and card.id == self.single_id:
-                continue
-            if not card.is_matched:
-                return False
-        return True
+        # 增量计数，O(1)；与整盘扫描 nodes.all_matched(ignore_code=单张编码) 的结果一致
+        return self._unmatched_pairs == 0
 
     def get_grid_state(self) -> List[List[Tuple[str, bool, bool]]]:
         """
         适配现有 UI：返回二维网格状态 (id, is_flipped, is_matched)。
         虽然内部是图结构，但这里按照 rows×cols 映射到网格便于渲染。
         """
-        state: List[List[Tuple[str, bool, bool]]] = []
-        for r in range(self.rows):
-            row_state: List[Tuple[str, bool, bool]] = []
-            for c in range(self.cols):
-                card = self.get_card(r, c)
-                row_state.append((card.id, card.is_flipped, card.is_matched))
-            state.append(row_state)
-        return state
+        return self.nodes.grid_state(self.rows, self.cols)
 
     def get_graph_state(self) -> Dict[str, List]:
         """
@@ -240,13 +266,12 @@ class DynamicMazeGame:
         return self._first_selected, positions
 
     def _shuffle_unmatched(self) -> None:
-        indices: List[int] = []
-        for idx, card in enumerate(self.nodes):
-            if not card.is_matched:
-                indices.append(idx)
+        indices = self.nodes.unmatched_indices()
         if indices:
-            shuffle_subset_inplace(self.nodes, indices)
-            self.last_shuffle_at = time.time()
+            self.nodes.shuffle_subset(indices)
+            self._changed_positions.update(self._rc_from_index(idx) for idx in indices)
+            self.last_shuffle_at = self._clock()
+            self.shuffle_count += 1
 
     def use_item_delay(self, seconds: int) -> None:
         if self.delay_item_count > 0:
@@ -256,13 +281,13 @@ class DynamicMazeGame:
     def use_item_block_shuffle(self, duration_seconds: int) -> None:
         if self.block_item_count > 0:
             self.block_item_count -= 1
-            self.shuffle_block_until = time.time() + max(0, duration_seconds)
+            self.shuffle_block_until = self._clock() + max(0, duration_seconds)
 
     def is_time_over(self) -> bool:
         return self.get_remaining_time_ms() <= 0
 
     def get_remaining_time_ms(self) -> int:
-        elapsed = int((time.time() - self.started_at) * 1000)
+        elapsed = int((self._clock() - self.started_at) * 1000)
         remaining = self.time_limit_ms - elapsed
         return remaining if remaining > 0 else 0
 
@@ -271,7 +296,7 @@ class DynamicMazeGame:
 
     def get_shuffle_status(self) -> Dict[str, int | bool]:
         remaining = self.shuffle_threshold - self.fail_count
-        recently = (time.time() - self.last_shuffle_at) < 2.0
+        recently = (self._clock() - self.last_shuffle_at) < 2.0
         if remaining < 0:
             remaining = 0
         return {
@@ -284,7 +309,7 @@ class DynamicMazeGame:
         }
 
     def get_block_remaining_seconds(self) -> int:
-        left = int(self.shuffle_block_until - time.time())
+        left = int(self.shuffle_block_until - self._clock())
         return left if left > 0 else 0
 
     def get_item_counts(self) -> Dict[str, int]:
@@ -1,5 +1,6 @@
-from typing import List, Tuple
+from typing import List, Set, Tuple
 from core.card import Card
+from core.flip_result import FLIP_IGNORED, FlipResult
 from core.utils import fisher_yates_shuffle, is_valid_position
 
 class SimpleGame:
@@ -53,6 +54,14 @@ class SimpleGame:
         self.fail_count: int = 0
         self.shuffle_threshold: int = 8
         self.pending_shuffle: bool = False
+        self.shuffle_count: int = 0
+        # 是否打印配对日志（批量模拟时关闭）
+        self.verbose: bool = True
+        # 增量维护：剩余未配对的对数、当前翻开未配对的位置
+        self._unmatched_pairs: int = needed
+        self._flipped_positions: Set[Tuple[int, int]] = set()
+        # 状态发生变化、界面需要重绘的位置（界面局部重绘时取走）
+        self._changed_positions: Set[Tuple[int, int]] = set()
 
     def get_card(self, row: int, col: int) -> Card:
         if not is_valid_position(row, col, self.rows, self.cols):
@@ -61,8 +70,13 @@ class SimpleGame:
 
     def flip_card(self, row: int, col: int) -> bool:
         """
-        翻开位于 (row, col) 的卡片。
-        返回值为布尔，表示是否已完成一次配对检查并更新分数/状态。
+        翻开位于 (row, col) 的卡片，返回是否配对成功（兼容旧接口，详见 flip）。
+        """
+        return self.flip(row, col).matched
+
+    def flip(self, row: int, col: int) -> FlipResult:
+        """
+        翻开位于 (row, col) 的卡片，返回本次翻牌的 FlipResult。
         逻辑：
           - 不能翻已经匹配的卡或当前正在翻的同一张
           - 第一次翻牌记录为第一张
@@ -75,16 +89,20 @@ class SimpleGame:
 
         card = self.grid[row][col]
         if card.is_matched or card.is_flipped:
-            return False  # 无法再次翻开或已配对
+            return FLIP_IGNORED  # 无法再次翻开或已配对
 
         card.flip()
+        self._flipped_positions.add((row, col))
+        self._changed_positions.add((row, col))
 
         if self._first_selected is None:
             self._first_selected = (row, col)
-            return False
+            return FlipResult(FlipResult.FIRST, ((row, col),))
         else:
+            first = self._first_selected
             self._second_selected = (row, col)
-            return self._evaluate_pair()
+            kind = FlipResult.MATCHED if self._evaluate_pair() else FlipResult.MISMATCHED
+            return FlipResult(kind, (first, (row, col)))
 
     def _evaluate_pair(self) -> bool:
         """
@@ -105,18 +123,25 @@ class SimpleGame:
         if matched:
             card1.set_matched()
             card2.set_matched()
+            self._flipped_positions.discard((r1, c1))
+            self._flipped_positions.discard((r2, c2))
+            self._changed_positions.update(((r1, c1), (r2, c2)))
+            self._unmatched_pairs -= 1
             # 通过基础分值和权重累加分数
             pair_score = card1.score_weight + card2.score_weight
             self.score += pair_score
             self.fail_count = 0  # 重置失败计数
-            print(f"配对成功！卡片ID: {id1} == {id2}")
+            if self.verbose:
+                print(f"配对成功！卡片ID: {id1} == {id2}")
         else:
             self.fail_count += 1
-            print(f"配对失败！卡片ID: {id1} != {id2}, 失败次数: {self.fail_count}")
+            if self.verbose:
+                print(f"配对失败！卡片ID: {id1} != {id2}, 失败次数: {self.fail_count}")
             # 检查是否需要洗牌
             if self.fail_count >= self.shuffle_threshold:
                 self.pending_shuffle = True
-                print(f"触发洗牌！连续失败 {self.fail_count} 次")
+                if self.verbose:
+                    print(f"触发洗牌！连续失败 {self.fail_count} 次")
 
         # 重置选中记录，准备下一轮
         self._first_selected = None
@@ -128,11 +153,12 @@ class SimpleGame:
     def hide_all_flipped(self) -> None:
         """
         将所有处于翻开但未匹配的卡片隐藏回背面状态。
+        只遍历记录中的翻开位置（至多两张），无需扫描整个网格。
         """
-        for row in self.grid:
-            for card in row:
-                if card.is_flipped and not card.is_matched:
-                    card.hide()
+        for r, c in self._flipped_positions:
+            self.grid[r][c].hide()
+        self._changed_positions.update(self._flipped_positions)
+        self._flipped_positions.clear()
         
         # 如果需要洗牌，执行洗牌操作
         if self.pending_shuffle:
@@ -161,14 +187,23 @@ class SimpleGame:
         # 将洗牌后的卡片重新分配到原来的位置
         for i, (r, c) in enumerate(unmatched_positions):
             self.grid[r][c] = shuffled_cards[i]
+        self._changed_positions.update(unmatched_positions)
+        self._flipped_positions.clear()
+        self.shuffle_count += 1
+
+    def pop_changed_positions(self) -> Set[Tuple[int, int]]:
+        """返回并清空上次调用以来状态发生变化的位置（界面据此只重绘这些卡牌）"""
+        changed = self._changed_positions
+        self._changed_positions = set()
+        return changed
+
+    def get_flipped_count(self) -> int:
+        """当前翻开但未配对的卡片数量"""
+        return len(self._flipped_positions)
 
     def is_completed(self) -> bool:
-        """检查所有卡片是否均已配对完成。"""
-        for row in self.grid:
-            for card in row:
-                if not card.is_matched:
-                    return False
-        return True
+        """检查所有卡片是否均已配对完成（O(1)，基于未配对计数）。"""
+        return self._unmatched_pairs == 0
 
     def get_grid_state(self) -> List[List[Tuple[str, bool, bool]]]:
         """
@@ -191,7 +226,10 @@ class SimpleGame:
         self._first_selected = None
         self._second_selected = None
         self.score = 0
+        self._unmatched_pairs = (self.rows * self.cols) // 2
+        self._flipped_positions.clear()
         for row in self.grid:
             for card in row:
                 card.is_flipped = False
                 card.is_matched = False
+        self._changed_positions.update((r, c) for r in range(self.rows) for c in range(self.cols))
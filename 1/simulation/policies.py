@@ -0,0 +1,202 @@
+"""
+无界面模拟使用的玩家策略。
+每个策略只通过 observe / on_matched / on_shuffle 获知牌面信息，
+与真人玩家看到的内容一致，不会直接读取游戏内部的牌序。
+"""
+import random
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+Position = Tuple[int, int]
+
+
+class PositionPool:
+    """支持 O(1) 添加、删除与随机抽取的位置集合。"""
+
+    def __init__(self):
+        self._items: List[Position] = []
+        self._index: Dict[Position, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, pos: Position) -> bool:
+        return pos in self._index
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def add(self, pos: Position) -> None:
+        if pos not in self._index:
+            self._index[pos] = len(self._items)
+            self._items.append(pos)
+
+    def discard(self, pos: Position) -> None:
+        idx = self._index.pop(pos, None)
+        if idx is None:
+            return
+        last = self._items.pop()
+        if idx < len(self._items):
+            self._items[idx] = last
+            self._index[last] = idx
+
+    def choice(self, rng: random.Random, exclude: Optional[Position] = None) -> Optional[Position]:
+        n = len(self._items)
+        if n == 0 or (n == 1 and self._items[0] == exclude):
+            return None
+        while True:
+            pos = self._items[rng.randrange(n)]
+            if pos != exclude:
+                return pos
+
+
+class Policy:
+    """玩家策略基类：维护仍可翻开（未配对）的位置集合。"""
+
+    name = "base"
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.face_down = PositionPool()
+
+    def reset(self, rows: int, cols: int) -> None:
+        self.face_down = PositionPool()
+        for r in range(rows):
+            for c in range(cols):
+                self.face_down.add((r, c))
+
+    def choose_first(self) -> Optional[Position]:
+        raise NotImplementedError
+
+    def choose_second(self, first: Position, first_id: str) -> Optional[Position]:
+        raise NotImplementedError
+
+    def observe(self, pos: Position, card_id: str) -> None:
+        """某个位置被翻开，看到了卡片 ID。"""
+
+    def on_matched(self, first: Position, second: Position) -> None:
+        self.face_down.discard(first)
+        self.face_down.discard(second)
+
+    def on_shuffle(self) -> None:
+        """未配对卡片被重新洗牌，已记住的位置全部失效。"""
+
+
+class RandomPolicy(Policy):
+    """完全随机：不记忆任何已翻开的卡片。"""
+
+    name = "random"
+
+    def choose_first(self) -> Optional[Position]:
+        return self.face_down.choice(self.rng)
+
+    def choose_second(self, first: Position, first_id: str) -> Optional[Position]:
+        return self.face_down.choice(self.rng, exclude=first)
+
+
+class LimitedMemoryPolicy(Policy):
+    """
+    有限记忆：最多记住 capacity 个位置的卡片 ID（最近看到的优先保留）。
+    - 记忆中有成对的 ID 时直接翻这一对
+    - 否则先翻一张没见过的牌，若记忆中有同 ID 的位置则翻它，否则再翻一张没见过的
+    capacity 为 None 时即为完美记忆。
+    """
+
+    name = "limited"
+
+    def __init__(self, capacity: Optional[int] = 8, seed: Optional[int] = None):
+        super().__init__(seed)
+        self.capacity = capacity
+        self.memory: "OrderedDict[Position, str]" = OrderedDict()
+        self.by_id: Dict[str, Set[Position]] = {}
+        # 记忆中已凑齐两个位置的 ID
+        self.ready: Set[str] = set()
+        self.unknown = PositionPool()
+
+    def reset(self, rows: int, cols: int) -> None:
+        super().reset(rows, cols)
+        self._forget_all()
+
+    def _forget_all(self) -> None:
+        self.memory.clear()
+        self.by_id.clear()
+        self.ready.clear()
+        self.unknown = PositionPool()
+        for pos in self.face_down:
+            self.unknown.add(pos)
+
+    def _forget(self, pos: Position) -> None:
+        card_id = self.memory.pop(pos, None)
+        if card_id is None:
+            return
+        positions = self.by_id[card_id]
+        positions.discard(pos)
+        if len(positions) < 2:
+            self.ready.discard(card_id)
+        if not positions:
+            del self.by_id[card_id]
+        if pos in self.face_down:
+            self.unknown.add(pos)
+
+    def choose_first(self) -> Optional[Position]:
+        if self.ready:
+            card_id = next(iter(self.ready))
+            return next(iter(self.by_id[card_id]))
+        pos = self.unknown.choice(self.rng)
+        if pos is None:
+            pos = self.face_down.choice(self.rng)
+        return pos
+
+    def choose_second(self, first: Position, first_id: str) -> Optional[Position]:
+        for pos in self.by_id.get(first_id, ()):
+            if pos != first:
+                return pos
+        pos = self.unknown.choice(self.rng, exclude=first)
+        if pos is None:
+            pos = self.face_down.choice(self.rng, exclude=first)
+        return pos
+
+    def observe(self, pos: Position, card_id: str) -> None:
+        self.unknown.discard(pos)
+        if pos in self.memory:
+            self.memory.move_to_end(pos)
+            return
+        self.memory[pos] = card_id
+        positions = self.by_id.setdefault(card_id, set())
+        positions.add(pos)
+        if len(positions) >= 2:
+            self.ready.add(card_id)
+        if self.capacity is not None:
+            while len(self.memory) > self.capacity:
+                self._forget(next(iter(self.memory)))
+
+    def on_matched(self, first: Position, second: Position) -> None:
+        super().on_matched(first, second)
+        self._forget(first)
+        self._forget(second)
+
+    def on_shuffle(self) -> None:
+        self._forget_all()
+
+
+class PerfectMemoryPolicy(LimitedMemoryPolicy):
+    """完美记忆：记住每一张翻开过的卡片。"""
+
+    name = "perfect"
+
+    def __init__(self, seed: Optional[int] = None):
+        super().__init__(capacity=None, seed=seed)
+
+
+POLICIES = {
+    RandomPolicy.name: RandomPolicy,
+    PerfectMemoryPolicy.name: PerfectMemoryPolicy,
+    LimitedMemoryPolicy.name: LimitedMemoryPolicy,
+}
+
+
+def make_policy(name: str, seed: Optional[int] = None, **kwargs) -> Policy:
+    """按名称创建策略：random / perfect / limited（limited 可传 capacity）。"""
+    if name not in POLICIES:
+        raise ValueError(f"未知策略: {name}，可选: {', '.join(POLICIES)}")
+    return POLICIES[name](seed=seed, **kwargs)
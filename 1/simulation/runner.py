@@ -0,0 +1,316 @@
+"""
+无界面批量模拟：不依赖 pygame 窗口，直接驱动 SimpleGame / DynamicMazeGame，
+用虚拟时钟推进时间，并通过 multiprocessing 进程池并行跑大量对局。
+
+用法示例（在 1/ 目录下）：
+    python -m simulation.runner --mode hard --policy limited --games 100000 --workers 8
+    python -m simulation.runner --mode hard --shuffle-threshold 6 8 10 --time-limit-ms 120000 180000
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 允许以脚本方式直接运行（python simulation/runner.py）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modes.simple_mode import SimpleGame
+from modes.dynamic_maze import DynamicMazeGame
+from simulation.policies import make_policy
+
+
+class SimClock:
+    """虚拟时钟（秒），供游戏对象替代 time.time。"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance_ms(self, ms: int) -> None:
+        self.now += ms / 1000.0
+
+
+class SimConfig:
+    """
+    单组模拟参数。
+    time_limit_ms: 困难模式写入 game.time_limit_ms；简单模式按同样时限判负（与主程序 180 秒一致）
+    think_ms: 玩家每次翻牌的思考时间
+    reveal_ms: 每轮翻两张后的展示时间（None 时使用游戏自身的 reveal 时长，简单模式为 1000）
+    delay_items / block_items: 困难模式开局道具数量（None 表示沿用游戏默认值）
+    max_steps: 防止策略死循环的步数上限
+    """
+
+    def __init__(self, mode: str = "simple", rows: Optional[int] = None, cols: Optional[int] = None,
+                 policy: str = "perfect", policy_kwargs: Optional[Dict] = None,
+                 shuffle_threshold: Optional[int] = None, time_limit_ms: int = 180000,
+                 think_ms: int = 800, reveal_ms: Optional[int] = None,
+                 delay_items: Optional[int] = None, block_items: Optional[int] = None,
+                 delay_seconds: int = 5, block_seconds: int = 5, max_steps: int = 100000):
+        if mode not in ("simple", "hard"):
+            raise ValueError("mode 必须为 'simple' 或 'hard'")
+        self.mode = mode
+        # 默认尺寸与主程序一致：简单模式 4x4，困难模式 7x7
+        default_size = 4 if mode == "simple" else 7
+        self.rows = rows or default_size
+        self.cols = cols or default_size
+        self.policy = policy
+        self.policy_kwargs = policy_kwargs or {}
+        self.shuffle_threshold = shuffle_threshold
+        self.time_limit_ms = time_limit_ms
+        self.think_ms = think_ms
+        self.reveal_ms = reveal_ms
+        self.delay_items = delay_items
+        self.block_items = block_items
+        self.delay_seconds = delay_seconds
+        self.block_seconds = block_seconds
+        self.max_steps = max_steps
+
+    def replace(self, **changes) -> "SimConfig":
+        params = dict(self.__dict__)
+        params.update(changes)
+        return SimConfig(**params)
+
+
+class SimStats:
+    """可合并的聚合统计（各进程分别累计，最后合并）。"""
+
+    def __init__(self):
+        self.games = 0
+        self.victories = 0
+        self.time_over = 0
+        self.aborted = 0
+        self.total_steps = 0
+        self.max_steps = 0
+        self.total_shuffles = 0
+        self.total_sim_ms = 0
+
+    def add(self, result: str, steps: int, shuffles: int, sim_ms: int) -> None:
+        self.games += 1
+        if result == "victory":
+            self.victories += 1
+        elif result == "defeat":
+            self.time_over += 1
+        else:
+            self.aborted += 1
+        self.total_steps += steps
+        self.max_steps = max(self.max_steps, steps)
+        self.total_shuffles += shuffles
+        self.total_sim_ms += sim_ms
+
+    def merge(self, other: "SimStats") -> None:
+        self.games += other.games
+        self.victories += other.victories
+        self.time_over += other.time_over
+        self.aborted += other.aborted
+        self.total_steps += other.total_steps
+        self.max_steps = max(self.max_steps, other.max_steps)
+        self.total_shuffles += other.total_shuffles
+        self.total_sim_ms += other.total_sim_ms
+
+    def summary(self) -> Dict:
+        n = self.games or 1
+        return {
+            "games": self.games,
+            "completion_rate": self.victories / n,
+            "time_over_rate": self.time_over / n,
+            "aborted": self.aborted,
+            "avg_steps": self.total_steps / n,
+            "max_steps": self.max_steps,
+            "avg_shuffles": self.total_shuffles / n,
+            "avg_game_seconds": self.total_sim_ms / n / 1000.0,
+        }
+
+
+def _make_game(config: SimConfig, clock: SimClock):
+    if config.mode == "simple":
+        game = SimpleGame(config.rows, config.cols)
+        game.verbose = False
+    else:
+        game = DynamicMazeGame(config.rows, config.cols, clock=clock)
+        game.time_limit_ms = config.time_limit_ms
+        if config.delay_items is not None:
+            game.delay_item_count = config.delay_items
+        if config.block_items is not None:
+            game.block_item_count = config.block_items
+    if config.shuffle_threshold is not None:
+        game.shuffle_threshold = config.shuffle_threshold
+    return game
+
+
+def _use_items(game, config: SimConfig) -> None:
+    """困难模式的简单道具策略：时间快用完时延时，即将洗牌时阻挡。"""
+    if game.delay_item_count > 0 and game.get_remaining_time_ms() < config.delay_seconds * 1000:
+        game.use_item_delay(config.delay_seconds)
+    if (game.block_item_count > 0 and game.shuffle_counting_started
+            and game.get_block_remaining_seconds() == 0
+            and game.shuffle_threshold - game.fail_count <= 1):
+        game.use_item_block_shuffle(config.block_seconds)
+
+
+def play_game(config: SimConfig, policy) -> Tuple[str, int, int, int]:
+    """
+    模拟一局游戏。
+    返回 (result, steps, shuffles, sim_ms)，result 为 victory / defeat / aborted。
+    步数统计与主程序一致：每翻一张牌计 1 步。
+    """
+    clock = SimClock()
+    game = _make_game(config, clock)
+    policy.reset(game.rows, game.cols)
+    hard = config.mode == "hard"
+    reveal_ms = config.reveal_ms
+    if reveal_ms is None:
+        reveal_ms = game.get_reveal_duration_ms() if hard else 1000
+
+    def time_over() -> bool:
+        if hard:
+            return game.is_time_over()
+        return clock.now * 1000 >= config.time_limit_ms
+
+    steps = 0
+    shuffles_seen = 0
+    result = "aborted"
+    while steps < config.max_steps:
+        if game.is_completed():
+            result = "victory"
+            break
+        if time_over():
+            result = "defeat"
+            break
+        if hard:
+            _use_items(game, config)
+
+        first = policy.choose_first()
+        if first is None:
+            break
+        game.flip(*first)
+        steps += 1
+        first_id = game.get_card(*first).id
+        policy.observe(first, first_id)
+        clock.advance_ms(config.think_ms)
+        if time_over():
+            result = "defeat"
+            break
+
+        second = policy.choose_second(first, first_id)
+        if second is None:
+            break
+        matched = game.flip(*second).matched
+        steps += 1
+        policy.observe(second, game.get_card(*second).id)
+        clock.advance_ms(config.think_ms)
+
+        if matched:
+            policy.on_matched(first, second)
+        clock.advance_ms(reveal_ms)
+        game.hide_all_flipped()
+        if game.shuffle_count != shuffles_seen:
+            shuffles_seen = game.shuffle_count
+            policy.on_shuffle()
+
+    return result, steps, game.shuffle_count, int(clock.now * 1000)
+
+
+def _run_chunk(task: Tuple[SimConfig, int, int]) -> SimStats:
+    """进程池任务：用独立种子跑 count 局并返回聚合统计。"""
+    config, count, seed = task
+    # 游戏内部的洗牌使用全局 random，策略使用自己的 Random 实例
+    random.seed(seed)
+    policy = make_policy(config.policy, seed=seed, **config.policy_kwargs)
+    stats = SimStats()
+    for _ in range(count):
+        stats.add(*play_game(config, policy))
+    return stats
+
+
+def run_batch(config: SimConfig, games: int, workers: Optional[int] = None,
+              seed: Optional[int] = None, chunk_size: int = 500) -> SimStats:
+    """
+    并行模拟 games 局。workers 为 1 时在当前进程内运行（便于调试和性能分析）。
+    seed 固定时结果可复现（与 workers 数量无关）。
+    """
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    tasks = []
+    remaining = games
+    index = 0
+    while remaining > 0:
+        count = min(chunk_size, remaining)
+        tasks.append((config, count, seed + index))
+        remaining -= count
+        index += 1
+
+    total = SimStats()
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        for task in tasks:
+            total.merge(_run_chunk(task))
+        return total
+
+    with multiprocessing.Pool(processes=min(workers, len(tasks))) as pool:
+        for stats in pool.imap_unordered(_run_chunk, tasks):
+            total.merge(stats)
+    return total
+
+
+def sweep(base: SimConfig, grid: Dict[str, Iterable], games: int,
+          workers: Optional[int] = None, seed: Optional[int] = None) -> List[Tuple[Dict, Dict]]:
+    """对 grid 中各参数取值的笛卡尔积逐一模拟，返回 [(参数, 统计摘要), ...]。"""
+    keys = list(grid)
+    results = []
+    for values in itertools.product(*(list(grid[k]) for k in keys)):
+        params = dict(zip(keys, values))
+        stats = run_batch(base.replace(**params), games, workers=workers, seed=seed)
+        results.append((params, stats.summary()))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="记忆迷宫无界面批量模拟")
+    parser.add_argument("--mode", choices=["simple", "hard"], default="simple")
+    parser.add_argument("--rows", type=int)
+    parser.add_argument("--cols", type=int)
+    parser.add_argument("--policy", choices=["random", "perfect", "limited"], default="perfect")
+    parser.add_argument("--memory", type=int, default=8, help="limited 策略的记忆容量")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--think-ms", type=int, default=800)
+    parser.add_argument("--shuffle-threshold", type=int, nargs="+")
+    parser.add_argument("--time-limit-ms", type=int, nargs="+", default=[180000])
+    parser.add_argument("--delay-items", type=int, nargs="+")
+    parser.add_argument("--block-items", type=int, nargs="+")
+    args = parser.parse_args(argv)
+
+    policy_kwargs = {"capacity": args.memory} if args.policy == "limited" else {}
+    base = SimConfig(mode=args.mode, rows=args.rows, cols=args.cols, policy=args.policy,
+                     policy_kwargs=policy_kwargs, think_ms=args.think_ms)
+    grid = {"time_limit_ms": args.time_limit_ms}
+    if args.shuffle_threshold:
+        grid["shuffle_threshold"] = args.shuffle_threshold
+    if args.delay_items:
+        grid["delay_items"] = args.delay_items
+    if args.block_items:
+        grid["block_items"] = args.block_items
+
+    started = time.perf_counter()
+    results = sweep(base, grid, args.games, workers=args.workers, seed=args.seed)
+    elapsed = time.perf_counter() - started
+
+    for params, summary in results:
+        print(f"{params}: 完成率 {summary['completion_rate']:.2%}, "
+              f"超时率 {summary['time_over_rate']:.2%}, "
+              f"平均步数 {summary['avg_steps']:.1f}, "
+              f"平均洗牌 {summary['avg_shuffles']:.2f}, "
+              f"平均用时 {summary['avg_game_seconds']:.1f}s")
+    total_games = args.games * len(results)
+    print(f"共 {total_games} 局，耗时 {elapsed:.2f}s（{total_games / elapsed:.0f} 局/秒）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+本地存储系统 - SQLite 版本
+与 LocalStorage 提供相同的接口，游戏记录存放在带索引的表中，
+排行榜、历史记录和最佳记录查询都走索引，不再随历史记录总数线性变慢。
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional, Dict, List
+
+from core.passwords import VerificationCache, hash_password, needs_rehash
+from local_storage import BACKUP_SUFFIX, load_storage_data
+
+SQLITE_FILE = "game_data.db"
+DEFAULT_ITEMS = ("delay", "block", "reveal")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_items (
+    username TEXT NOT NULL,
+    item_type TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (username, item_type)
+);
+CREATE TABLE IF NOT EXISTS game_results (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    game_mode TEXT NOT NULL,
+    time_seconds INTEGER NOT NULL,
+    steps INTEGER NOT NULL,
+    score INTEGER NOT NULL DEFAULT 0,
+    result TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_results_mode_result_time ON game_results (game_mode, result, time_seconds);
+CREATE INDEX IF NOT EXISTS ix_results_mode_result_steps ON game_results (game_mode, result, steps);
+CREATE INDEX IF NOT EXISTS ix_results_user_created ON game_results (username, created_at);
+"""
+
+RESULT_COLUMNS = "id, username, game_mode, time_seconds, steps, score, result, created_at"
+
+
+class SQLiteStorage:
+    """SQLite 存储管理器（接口与 LocalStorage 一致）"""
+
+    def __init__(self, db_file: str = SQLITE_FILE, import_from: Optional[str] = None, max_users: int = 10):
+        self.db_file = db_file
+        self.max_users = max_users
+        self._password_cache = VerificationCache()
+        # sqlite3 连接不能跨线程使用：每个线程（如登录校验的工作线程）各自打开一个连接
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+        # 首次创建数据库时导入旧的 JSON 数据（快照写到一半崩溃时可能只剩 .bak）
+        if import_from and self._is_empty() and (
+                os.path.exists(import_from) or os.path.exists(import_from + BACKUP_SUFFIX)):
+            self.import_json(import_from)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False 仅为了 close() 能在主线程关闭其他线程的连接，连接本身不跨线程共享
+            conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    def import_json(self, json_file: str):
+        """从 LocalStorage 的数据导入用户和游戏记录（快照之后写入日志的修改也一并导入）"""
+        try:
+            data = load_storage_data(json_file)
+        except Exception as e:
+            print(f"导入 JSON 数据失败: {e}")
+            return
+        with self.conn:
+            for user in data.get("users", {}).values():
+                self.conn.execute(
+                    "INSERT INTO users (id, username, password_hash, points, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (user["id"], user["username"], user["password_hash"], user["points"], user["created_at"]))
+                self.conn.executemany(
+                    "INSERT INTO user_items (username, item_type, count) VALUES (?, ?, ?)",
+                    [(user["username"], item_type, count) for item_type, count in user["items"].items()])
+            self.conn.executemany(
+                f"INSERT INTO game_results ({RESULT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r["id"], r["username"], r["game_mode"], r["time_seconds"], r["steps"],
+                  r.get("score", 0), r["result"], r["created_at"]) for r in data.get("game_results", [])])
+        self.max_users = data.get("max_users", self.max_users)
+        print(f"已从 {json_file} 导入 {len(data.get('game_results', []))} 条游戏记录")
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _hash_password(self, password: str) -> str:
+        """密码哈希（加盐 KDF，参数随哈希一起保存）"""
+        return hash_password(password)
+
+    def _get_items(self, username: str) -> Dict[str, int]:
+        items = {item_type: 0 for item_type in DEFAULT_ITEMS}
+        for row in self.conn.execute("SELECT item_type, count FROM user_items WHERE username = ?", (username,)):
+            items[row["item_type"]] = row["count"]
+        return items
+
+    # ========== 用户管理 ==========
+
+    def register_user(self, username: str, password: str) -> Dict:
+        """注册用户（KDF 计算较慢，可在工作线程中调用）"""
+        password_hash = self._hash_password(password)
+        created_at = datetime.now().isoformat()
+
+        # 人数检查、重名检查与插入在同一个写事务内完成（BEGIN IMMEDIATE 先取得写锁），并发注册不会超出上限
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            user_count = self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+            # 检查用户数量限制
+            if user_count >= self.max_users:
+                raise Exception(f"用户数量已达上限（最多{self.max_users}人）")
+
+            # 检查用户名是否已存在
+            if self.conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone():
+                raise Exception("用户名已存在")
+
+            cursor = self.conn.execute(
+                "INSERT INTO users (id, username, password_hash, points, created_at) VALUES (?, ?, ?, ?, ?)",
+                (user_count + 1, username, password_hash, 50, created_at))
+            self.conn.executemany(
+                "INSERT INTO user_items (username, item_type, count) VALUES (?, ?, 0)",
+                [(username, item_type) for item_type in DEFAULT_ITEMS])
+
+        return {
+            "id": cursor.lastrowid,
+            "username": username,
+            "points": 50,
+            "created_at": created_at
+        }
+
+    def authenticate_user(self, username: str, password: str) -> Optional[Dict]:
+        """验证用户（KDF 计算较慢，可在工作线程中调用）；旧格式哈希在验证成功后自动升级"""
+        row = self.conn.execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None or not self._password_cache.verify(password, row["password_hash"]):
+            return None
+        if needs_rehash(row["password_hash"]):
+            new_hash = self._hash_password(password)
+            with self.conn:
+                self.conn.execute("UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                                  (new_hash, username, row["password_hash"]))
+            self._password_cache.remember(password, new_hash)
+        return self.get_user(username)
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        """获取用户信息"""
+        row = self.conn.execute(
+            "SELECT id, username, points, created_at FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "username": row["username"],
+            "points": row["points"],
+            "items": self._get_items(username),
+            "created_at": row["created_at"]
+        }
+
+    def update_user_points(self, username: str, points: int):
+        """更新用户积分"""
+        with self.conn:
+            cursor = self.conn.execute("UPDATE users SET points = points + ? WHERE username = ?", (points, username))
+        if cursor.rowcount == 0:
+            return None
+        return self.conn.execute("SELECT points FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+    def buy_item(self, username: str, item_type: str, cost: int) -> bool:
+        """购买道具（扣分与加道具在同一事务内完成）"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE users SET points = points - ? WHERE username = ? AND points >= ?",
+                (cost, username, cost))
+            if cursor.rowcount == 0:
+                return False
+            self.conn.execute(
+                "INSERT INTO user_items (username, item_type, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (username, item_type) DO UPDATE SET count = count + 1",
+                (username, item_type))
+        return True
+
+    def use_item(self, username: str, item_type: str) -> bool:
+        """使用道具"""
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE user_items SET count = count - 1 WHERE username = ? AND item_type = ? AND count > 0",
+                (username, item_type))
+        return cursor.rowcount > 0
+
+    # ========== 游戏记录 ==========
+
+    def add_game_result(self, username: str, game_mode: str, time_seconds: int,
+                        steps: int, score: int = 0, result: str = "victory"):
+        """添加游戏结果"""
+        created_at = datetime.now().isoformat()
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO game_results (username, game_mode, time_seconds, steps, score, result, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (username, game_mode, time_seconds, steps, score, result, created_at))
+        return {
+            "id": cursor.lastrowid,
+            "username": username,
+            "game_mode": game_mode,
+            "time_seconds": time_seconds,
+            "steps": steps,
+            "score": score,
+            "result": result,
+            "created_at": created_at
+        }
+
+    def get_user_history(self, username: str, limit: int = 100) -> List[Dict]:
+        """获取用户游戏历史（走 (username, created_at) 索引）"""
+        rows = self.conn.execute(
+            f"SELECT {RESULT_COLUMNS} FROM game_results WHERE username = ? "
+            "ORDER BY created_at DESC, id DESC LIMIT ?", (username, limit))
+        return [dict(row) for row in rows]
+
+    def get_leaderboard(self, game_mode: Optional[str] = None, sort_by: str = "time", limit: int = 10) -> List[Dict]:
+        """获取排行榜
+        sort_by: "time" 按时间排序, "steps" 按步数排序
+        """
+        order = {"time": "time_seconds, id", "steps": "steps, id"}.get(sort_by, "id")
+        if game_mode:
+            rows = self.conn.execute(
+                f"SELECT {RESULT_COLUMNS} FROM game_results WHERE game_mode = ? AND result = 'victory' "
+                f"ORDER BY {order} LIMIT ?", (game_mode, limit))
+        else:
+            rows = self.conn.execute(
+                f"SELECT {RESULT_COLUMNS} FROM game_results WHERE result = 'victory' "
+                f"ORDER BY {order} LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+    def get_user_best_records(self, username: str, game_mode: Optional[str] = None) -> Dict:
+        """获取用户最佳记录"""
+        where = "username = ? AND result = 'victory'"
+        params = [username]
+        if game_mode:
+            where += " AND game_mode = ?"
+            params.append(game_mode)
+
+        total = self.conn.execute(f"SELECT COUNT(*) FROM game_results WHERE {where}", params).fetchone()[0]
+        if total == 0:
+            return {
+                "fastest_time": None,
+                "fastest_time_date": None,
+                "fewest_steps": None,
+                "fewest_steps_date": None,
+                "total_games": 0
+            }
+
+        fastest = self.conn.execute(
+            f"SELECT time_seconds, created_at FROM game_results WHERE {where} "
+            "ORDER BY time_seconds, id LIMIT 1", params).fetchone()
+        fewest = self.conn.execute(
+            f"SELECT steps, created_at FROM game_results WHERE {where} "
+            "ORDER BY steps, id LIMIT 1", params).fetchone()
+
+        return {
+            "fastest_time": fastest["time_seconds"],
+            "fastest_time_date": fastest["created_at"],
+            "fewest_steps": fewest["steps"],
+            "fewest_steps_date": fewest["created_at"],
+            "total_games": total
+        }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 游戏代码以 1/ 为工作目录导入（如 from core.board import CardBoard）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+import core.board
+from modes.dynamic_maze import DynamicMazeGame
+
+
+@pytest.fixture(params=["numpy", "stdlib"])
+def board_backend(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(core.board, "np", None)
+    elif core.board.np is None:
+        pytest.skip("未安装 numpy")
+    return request.param
+
+
+def reference_completed(game: DynamicMazeGame) -> bool:
+    ignore = game.nodes.code_of(game.single_id) if game.single_id else None
+    return game.nodes.all_matched(ignore_code=ignore)
+
+
+@pytest.mark.parametrize("rows, cols", [(4, 4), (3, 5)])
+def test_incremental_state_matches_board_scan(board_backend, rows, cols):
+    random.seed(1)
+    game = DynamicMazeGame(rows, cols, clock=lambda: 0.0)
+    positions = [(r, c) for r in range(rows) for c in range(cols)]
+    for _ in range(2000):
+        if game.is_completed():
+            break
+        game.flip(*random.choice(positions))
+        if game.get_flipped_count() == 2:
+            game.hide_all_flipped()
+        # 计数器与整盘扫描一致；盖回后不应残留翻开未配对的卡片
+        assert game.is_completed() == reference_completed(game)
+        flipped_unmatched = sum(1 for card in game.nodes if card.is_flipped and not card.is_matched)
+        assert flipped_unmatched == game.get_flipped_count()
+    assert game.is_completed()
+
+
+def test_hide_flipped_keeps_matched_cards(board_backend):
+    board = core.board.CardBoard(["A", "A", "B", "B"])
+    board.set_matched(0)
+    board.set_matched(1)
+    board.flip(2)
+    board.hide_flipped([0, 2])
+    assert [card.is_flipped for card in board] == [True, True, False, False]
+    board.flip(3)
+    board.hide_flipped()
+    assert not board[3].is_flipped
+    assert not board.all_matched()
+    assert board.all_matched(ignore_code=board.code_of("B"))
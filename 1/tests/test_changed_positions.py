@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from modes.dynamic_maze import DynamicMazeGame
+from modes.simple_mode import SimpleGame
+
+
+def _make(kind):
+    if kind == "simple":
+        game = SimpleGame(4, 4)
+        game.verbose = False
+        game.shuffle_threshold = 2
+        return game
+    game = DynamicMazeGame(4, 4, clock=lambda: 100.0)
+    game.shuffle_threshold = 2
+    game.shuffle_counting_started = True
+    return game
+
+
+def _diff(before, after):
+    return {(r, c) for r, row in enumerate(after) for c, state in enumerate(row) if state != before[r][c]}
+
+
+@pytest.mark.parametrize("kind", ["simple", "dynamic"])
+def test_changed_positions_cover_every_visible_change(kind):
+    rng = random.Random(7)
+    game = _make(kind)
+    game.pop_changed_positions()
+    shuffled = False
+    for _ in range(200):
+        before = game.get_grid_state()
+        if game.get_flipped_count() == 2 or rng.random() < 0.1:
+            shuffled |= game.pending_shuffle
+            game.hide_all_flipped()
+        else:
+            game.flip(rng.randrange(4), rng.randrange(4))
+        assert _diff(before, game.get_grid_state()) <= game.pop_changed_positions()
+        if game.is_completed():
+            break
+    assert shuffled
+
+
+@pytest.mark.parametrize("kind", ["simple", "dynamic"])
+def test_changed_positions_are_cleared_when_taken(kind):
+    game = _make(kind)
+    game.pop_changed_positions()
+    game.flip(0, 0)
+    assert game.pop_changed_positions() == {(0, 0)}
+    assert game.pop_changed_positions() == set()
+    # 无效翻牌不产生重绘
+    game.flip(0, 0)
+    assert game.pop_changed_positions() == set()
@@ -0,0 +1,84 @@
+import pytest
+
+from core.flip_result import FlipResult
+from modes.dynamic_maze import DynamicMazeGame
+from modes.simple_mode import SimpleGame
+
+
+def _positions_by_id(game):
+    positions = {}
+    for r, row in enumerate(game.get_grid_state()):
+        for c, (card_id, _, _) in enumerate(row):
+            positions.setdefault(card_id, []).append((r, c))
+    return positions
+
+
+def _pair_and_mismatch(game):
+    positions = _positions_by_id(game)
+    pairs = [p for p in positions.values() if len(p) == 2]
+    return pairs[0], (pairs[1][0], pairs[2][0])
+
+
+@pytest.fixture(params=["simple", "dynamic"])
+def game(request):
+    if request.param == "simple":
+        game = SimpleGame(2, 4)
+        game.verbose = False
+        return game
+    return DynamicMazeGame(2, 4, clock=lambda: 0.0)
+
+
+def test_match_reports_both_positions(game):
+    (a, b), _ = _pair_and_mismatch(game)
+    first = game.flip(*a)
+    assert first.kind == FlipResult.FIRST
+    assert first.positions == (a,)
+    second = game.flip(*b)
+    assert second.matched and not second.mismatched
+    assert second.positions == (a, b)
+    assert game.get_flipped_count() == 0
+
+
+def test_mismatch_keeps_cards_until_hidden(game):
+    _, (a, b) = _pair_and_mismatch(game)
+    game.flip(*a)
+    result = game.flip(*b)
+    assert result.mismatched
+    assert result.positions == (a, b)
+    assert game.get_flipped_count() == 2
+    game.hide_all_flipped()
+    assert game.get_flipped_count() == 0
+    assert not game.get_card(*a).is_flipped
+
+
+def test_flipping_open_or_matched_card_is_ignored(game):
+    (a, b), (c, _) = _pair_and_mismatch(game)
+    game.flip(*c)
+    assert game.flip(*c).kind == FlipResult.IGNORED
+    game.hide_all_flipped()
+    game.flip(*a)
+    game.flip(*b)
+    ignored = game.flip(*a)
+    assert ignored.kind == FlipResult.IGNORED
+    assert ignored.positions == ()
+
+
+def test_flip_card_keeps_bool_interface(game):
+    (a, b), _ = _pair_and_mismatch(game)
+    assert game.flip_card(*a) is False
+    assert game.flip_card(*b) is True
+
+
+def test_completed_after_all_pairs(game):
+    for a, b in _positions_by_id(game).values():
+        game.flip(*a)
+        game.flip(*b)
+    assert game.is_completed()
+
+
+def test_timed_out_dynamic_flip_is_ignored():
+    now = [0.0]
+    game = DynamicMazeGame(2, 4, clock=lambda: now[0])
+    now[0] = game.time_limit_ms / 1000 + 1
+    assert game.flip(0, 0).kind == FlipResult.IGNORED
+    assert game.game_over
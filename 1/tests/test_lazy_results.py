@@ -0,0 +1,75 @@
+import pytest
+
+import local_storage
+from local_storage import LocalStorage
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "game_data.json")
+    storage = LocalStorage(path)
+    storage.register_user("alice", "pw")
+    for i in range(3):
+        storage.add_game_result("alice", "simple", 30 + i, 10 + i)
+    storage.close()
+    return path
+
+
+@pytest.fixture
+def section_reads(monkeypatch):
+    reads = []
+    original = local_storage.read_snapshot_section
+
+    def counting(path, section):
+        reads.append(section["name"])
+        return original(path, section)
+
+    monkeypatch.setattr(local_storage, "read_snapshot_section", counting)
+    return reads
+
+
+def test_results_are_not_read_until_queried(path, section_reads):
+    storage = LocalStorage(path)
+    assert storage.get_user("alice")["points"] == 50
+    assert section_reads == []
+    assert [r["time_seconds"] for r in storage.get_user_history("alice")] == [32, 31, 30]
+    assert section_reads == ["game_results"]
+    storage.get_leaderboard()
+    storage.get_user_best_records("alice")
+    assert section_reads == ["game_results"]
+    storage.close()
+
+
+def test_results_added_before_load_keep_order_and_ids(path, section_reads):
+    storage = LocalStorage(path)
+    added = storage.add_game_result("alice", "simple", 20, 9)
+    assert added["id"] == 4
+    assert section_reads == []
+
+    history = storage.get_user_history("alice")
+    assert [r["id"] for r in history] == [4, 3, 2, 1]
+    assert storage.get_user_best_records("alice")["fastest_time"] == 20
+    assert storage.get_leaderboard(limit=1)[0]["id"] == 4
+    storage.close()
+
+
+def test_compaction_while_lazy_keeps_all_results(path):
+    storage = LocalStorage(path)
+    storage.add_game_result("alice", "hard", 90, 40)
+    storage.compact()
+    storage.close()
+
+    reopened = LocalStorage(path)
+    assert [r["id"] for r in reopened.get_user_history("alice")] == [4, 3, 2, 1]
+    reopened.close()
+
+
+def test_journal_results_replayed_while_lazy(path):
+    storage = LocalStorage(path, compact_every=1000)
+    storage.add_game_result("alice", "simple", 25, 8)
+    storage._journal.close()
+
+    reopened = LocalStorage(path)
+    assert reopened.add_game_result("alice", "simple", 26, 8)["id"] == 5
+    assert [r["id"] for r in reopened.get_user_history("alice")] == [5, 4, 3, 2, 1]
+    reopened.close()
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import threading
+
+import pytest
+
+from core.passwords import needs_rehash
+from local_storage import LocalStorage
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "game_data.json")
+
+
+def _abandon(storage):
+    """模拟进程崩溃：不压缩、不写快照，直接丢弃存储对象"""
+    storage._journal.close()
+
+
+def test_journal_replay_restores_unsnapshotted_changes(path):
+    storage = LocalStorage(path, compact_every=1000)
+    storage.register_user("alice", "pw")
+    storage.update_user_points("alice", 7)
+    storage.buy_item("alice", "delay", 10)
+    storage.add_game_result("alice", "simple", 30, 12)
+    _abandon(storage)
+
+    reopened = LocalStorage(path, compact_every=1000)
+    user = reopened.get_user("alice")
+    assert user["points"] == 50 + 7 - 10
+    assert user["items"]["delay"] == 1
+    assert [r["steps"] for r in reopened.get_user_history("alice")] == [12]
+    reopened.close()
+
+
+def test_torn_journal_tail_is_truncated(path):
+    storage = LocalStorage(path, compact_every=1000)
+    storage.register_user("alice", "pw")
+    storage.update_user_points("alice", 5)
+    _abandon(storage)
+    with open(path + ".journal", "ab") as f:
+        f.write(b'{"op":"points","u":"alice","d":100,"s"')
+
+    reopened = LocalStorage(path, compact_every=1000)
+    assert reopened.get_user("alice")["points"] == 55
+    # 截断后继续追加的记录不会接在半行后面
+    reopened.update_user_points("alice", 1)
+    _abandon(reopened)
+
+    again = LocalStorage(path, compact_every=1000)
+    assert again.get_user("alice")["points"] == 56
+    again.close()
+
+
+def test_compaction_skips_records_already_in_snapshot(path):
+    storage = LocalStorage(path, compact_every=3)
+    storage.register_user("alice", "pw")
+    for _ in range(5):
+        storage.update_user_points("alice", 1)
+    _abandon(storage)
+
+    reopened = LocalStorage(path, compact_every=1000)
+    assert reopened.get_user("alice")["points"] == 55
+    reopened.close()
+
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+@pytest.mark.parametrize("write_behind_ms", [None, 5])
+def test_concurrent_buy_and_use_never_overspend(path, write_behind_ms):
+    storage = LocalStorage(path, write_behind_ms=write_behind_ms)
+    storage.register_user("alice", "pw")
+    bought = []
+    used = []
+    _run_threads(lambda: bought.append(storage.buy_item("alice", "delay", 15)), 16)
+    # 50 积分最多买 3 个
+    assert bought.count(True) == 3
+    _run_threads(lambda: used.append(storage.use_item("alice", "delay")), 16)
+    assert used.count(True) == 3
+    storage.close()
+
+    reopened = LocalStorage(path)
+    user = reopened.get_user("alice")
+    assert user["points"] == 5
+    assert user["items"]["delay"] == 0
+    reopened.close()
+
+
+def test_concurrent_results_get_unique_ids(path):
+    storage = LocalStorage(path, write_behind_ms=5)
+    _run_threads(lambda: storage.add_game_result("alice", "simple", 10, 10), 32)
+    ids = sorted(r["id"] for r in storage.get_user_history("alice"))
+    assert ids == list(range(1, 33))
+    storage.close()
+
+
+def _tamper(path, old, new):
+    """原地改写快照内容（长度不变），只有校验和能发现"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    assert raw.count(old) == 1
+    with open(path, "wb") as f:
+        f.write(raw.replace(old, new))
+
+
+def test_corrupt_snapshot_falls_back_to_backup(path):
+    storage = LocalStorage(path)
+    storage.register_user("alice", "pw")
+    storage.compact()
+    storage.update_user_points("alice", 10)
+    storage.compact()
+    storage.close()
+    # 最新快照的用户段校验失败，退回上一份快照（积分是压缩前的 50）
+    _tamper(path, b'"points":60', b'"points":99')
+
+    reopened = LocalStorage(path)
+    assert reopened.get_user("alice")["points"] == 50
+    reopened.close()
+
+
+def test_corrupt_results_section_falls_back_to_backup(path):
+    storage = LocalStorage(path)
+    storage.add_game_result("alice", "simple", 30, 12)
+    storage.compact()
+    storage.add_game_result("alice", "simple", 20, 11)
+    storage.compact()
+    storage.close()
+    _tamper(path, b'"time_seconds":20', b'"time_seconds":21')
+
+    reopened = LocalStorage(path)
+    # 游戏记录段延迟读取，读取时才发现校验失败，改用备份快照中的记录
+    assert [r["time_seconds"] for r in reopened.get_user_history("alice")] == [30]
+    reopened.close()
+
+
+def test_all_snapshots_corrupt_starts_empty_and_keeps_evidence(path, tmp_path):
+    storage = LocalStorage(path)
+    storage.register_user("alice", "pw")
+    storage.compact()
+    storage.close()
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot")
+
+    reopened = LocalStorage(path)
+    assert reopened.get_user("alice") is None
+    assert any(name.startswith("game_data.json.corrupt-") for name in os.listdir(tmp_path))
+    reopened.close()
+
+
+def test_concurrent_logins_upgrade_legacy_hash_once(path):
+    storage = LocalStorage(path)
+    storage.register_user("alice", "pw")
+    with storage._lock:
+        storage.data["users"]["alice"]["password_hash"] = hashlib.sha256(b"pw").hexdigest()
+    journal_size = os.path.getsize(path + ".journal")
+    results = []
+    _run_threads(lambda: results.append(storage.authenticate_user("alice", "pw")), 8)
+    assert all(user is not None and user["username"] == "alice" for user in results)
+    with open(path + ".journal", "rb") as f:
+        f.seek(journal_size)
+        assert f.read().count(b'"op":"password"') == 1
+    assert storage.authenticate_user("alice", "wrong") is None
+    storage.close()
+
+    reopened = LocalStorage(path)
+    assert not needs_rehash(reopened.data["users"]["alice"]["password_hash"])
+    assert reopened.authenticate_user("alice", "pw") is not None
+    reopened.close()
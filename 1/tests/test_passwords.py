@@ -0,0 +1,31 @@
+import hashlib
+
+from core import passwords
+
+
+def test_hash_round_trip_and_rehash_policy():
+    stored = passwords.hash_password("secret")
+    assert passwords.verify_password("secret", stored)
+    assert not passwords.verify_password("wrong", stored)
+    assert not passwords.needs_rehash(stored)
+
+    legacy = hashlib.sha256(b"secret").hexdigest()
+    assert passwords.verify_password("secret", legacy)
+    assert passwords.needs_rehash(legacy)
+    assert not passwords.verify_password("secret", "unknown$format")
+
+
+def test_pbkdf2_scheme_is_verified():
+    stored = passwords.hash_password("secret", scheme="pbkdf2_sha256")
+    assert passwords.verify_password("secret", stored)
+    assert passwords.needs_rehash(stored) == (passwords.DEFAULT_SCHEME != "pbkdf2_sha256")
+
+
+def test_verification_cache_tracks_hash_changes():
+    cache = passwords.VerificationCache(capacity=1)
+    stored = passwords.hash_password("secret")
+    assert cache.verify("secret", stored)
+    assert not cache.verify("wrong", stored)
+    new_hash = passwords.hash_password("secret")
+    cache.remember("secret", new_hash)
+    assert cache.verify("secret", new_hash)
@@ -0,0 +1,65 @@
+import pytest
+
+from local_storage import (LocalStorage, decode_results_columnar, decode_snapshot,
+                           encode_results_columnar, encode_snapshot)
+
+
+def _result(i, **overrides):
+    result = {
+        "id": i,
+        "username": f"user{i % 3}",
+        "game_mode": "simple" if i % 2 else "hard",
+        "time_seconds": 30 + i,
+        "steps": 10 + i,
+        "score": 100 * i,
+        "result": "victory",
+        "created_at": f"2024-05-0{1 + i % 9}T12:34:56.{i:06d}",
+    }
+    result.update(overrides)
+    return result
+
+
+def test_columnar_round_trip():
+    results = [_result(i) for i in range(1, 50)]
+    results.append(_result(50, created_at="2024-05-01T00:00:00", score=-5, username="张三"))
+    assert decode_results_columnar(encode_results_columnar(results)) == results
+    assert decode_results_columnar(encode_results_columnar([])) == []
+
+
+@pytest.mark.parametrize("overrides", [
+    {"time_seconds": 12.5},
+    {"score": None},
+    {"steps": 2 ** 31},
+    {"id": -2 ** 31 - 1},
+    {"score": True},
+    {"created_at": None},
+    {"created_at": "2024-05-01T12:00:00+08:00"},
+    {"extra": 1},
+])
+def test_columnar_rejects_lossy_records_with_value_error(overrides):
+    with pytest.raises(ValueError):
+        encode_results_columnar([_result(1, **overrides)])
+
+
+@pytest.mark.parametrize("overrides", [{"time_seconds": 12.5}, {"score": 2 ** 40}, {"steps": None}])
+def test_binary_snapshot_falls_back_to_json_results(overrides):
+    data = {"users": {}, "game_results": [_result(1), _result(2, **overrides)], "max_users": 10}
+    raw = encode_snapshot(data, "binary")
+    assert b'"encoding":"json"' in raw.split(b"\n", 1)[0]
+    decoded = decode_snapshot(raw)
+    assert decoded["game_results"] == data["game_results"]
+
+
+def test_binary_storage_reopens_with_same_results(tmp_path):
+    path = str(tmp_path / "game_data.json")
+    storage = LocalStorage(path, snapshot_format="binary")
+    for i in range(5):
+        storage.add_game_result("alice", "simple", 30 - i, 10 + i)
+    storage.close()
+    with open(path, "rb") as f:
+        assert b'"encoding":"columnar"' in f.readline()
+
+    reopened = LocalStorage(path)
+    assert [r["time_seconds"] for r in reopened.get_leaderboard(limit=3)] == [26, 27, 28]
+    assert len(reopened.get_user_history("alice")) == 5
+    reopened.close()
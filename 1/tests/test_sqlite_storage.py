@@ -0,0 +1,145 @@
+import os
+import threading
+
+import pytest
+
+from local_storage import LocalStorage, load_storage_data
+from sqlite_storage import SQLiteStorage
+
+
+@pytest.fixture
+def json_path(tmp_path):
+    return str(tmp_path / "game_data.json")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "game_data.db")
+
+
+def test_concurrent_registration_respects_user_limit(db_path):
+    storage = SQLiteStorage(db_path, max_users=3)
+    errors = []
+
+    def register(i):
+        try:
+            storage.register_user(f"user{i}", "pw")
+        except Exception as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=register, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    count = storage.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    ids = [row[0] for row in storage.conn.execute("SELECT id FROM users ORDER BY id")]
+    storage.close()
+    assert count == 3
+    assert ids == [1, 2, 3]
+    assert len(errors) == 5 and all("上限" in e for e in errors)
+
+
+def test_duplicate_username_is_rejected(db_path):
+    storage = SQLiteStorage(db_path)
+    storage.register_user("alice", "pw")
+    with pytest.raises(Exception, match="已存在"):
+        storage.register_user("alice", "pw")
+    storage.close()
+
+
+def test_import_includes_journal_records(json_path, db_path):
+    source = LocalStorage(json_path, compact_every=1000)
+    source.register_user("alice", "pw")
+    source.compact()
+    # 压缩之后的修改只存在于日志中
+    source.update_user_points("alice", 5)
+    source.buy_item("alice", "block", 15)
+    source.add_game_result("alice", "simple", 40, 20)
+    source._journal.close()
+
+    storage = SQLiteStorage(db_path, import_from=json_path)
+    user = storage.authenticate_user("alice", "pw")
+    assert user["points"] == 50 + 5 - 15
+    assert user["items"]["block"] == 1
+    assert [r["time_seconds"] for r in storage.get_user_history("alice")] == [40]
+    storage.close()
+
+
+def _populate(storage):
+    storage.register_user("alice", "pw")
+    storage.register_user("bob", "pw")
+    storage.buy_item("alice", "delay", 10)
+    storage.update_user_points("bob", 20)
+    storage.add_game_result("alice", "simple", 30, 12, score=100)
+    storage.add_game_result("bob", "simple", 25, 18, score=90)
+    storage.add_game_result("alice", "hard", 90, 40, score=200, result="timeout")
+    storage.add_game_result("bob", "hard", 80, 35, score=180)
+
+
+def test_sectioned_snapshot_round_trips_into_sqlite(json_path, db_path):
+    source = LocalStorage(json_path)
+    _populate(source)
+    source.close()
+    with open(json_path, "rb") as f:
+        # close() 压缩成带头部的分段快照
+        assert b"memory-maze-snapshot" in f.readline()
+
+    expected = LocalStorage(json_path)
+    storage = SQLiteStorage(db_path, import_from=json_path)
+    for username in ("alice", "bob"):
+        assert storage.get_user(username) == expected.get_user(username)
+        assert storage.get_user_history(username) == expected.get_user_history(username)
+        for game_mode in (None, "simple", "hard"):
+            assert (storage.get_user_best_records(username, game_mode)
+                    == expected.get_user_best_records(username, game_mode))
+    for sort_by in ("time", "steps"):
+        assert storage.get_leaderboard(sort_by=sort_by) == expected.get_leaderboard(sort_by=sort_by)
+    assert storage.authenticate_user("alice", "pw") is not None
+    storage.close()
+    expected.close()
+
+
+def test_import_falls_back_to_backup_snapshot(json_path, db_path):
+    source = LocalStorage(json_path)
+    _populate(source)
+    source.compact()
+    source.close()
+    # 模拟快照替换中途崩溃：正式快照已改名为 .bak，新快照还没有就位
+    os.replace(json_path, json_path + ".bak")
+
+    storage = SQLiteStorage(db_path, import_from=json_path)
+    assert storage.get_user("alice")["items"]["delay"] == 1
+    assert len(storage.get_leaderboard(limit=10)) == 3
+    storage.close()
+
+
+def _snapshot_files(tmp_path):
+    return {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+
+
+def test_load_storage_data_does_not_touch_files(json_path, tmp_path):
+    source = LocalStorage(json_path, compact_every=1000)
+    _populate(source)
+    source.compact()
+    source.compact()
+    source.update_user_points("alice", 5)
+    source._journal.close()
+    with open(json_path + ".journal", "ab") as f:
+        f.write(b'{"op":"points","u":"alice","d":100,"s"')
+    # 正式快照损坏，只能用 .bak
+    with open(json_path, "wb") as f:
+        f.write(b"not a snapshot")
+    before = _snapshot_files(tmp_path)
+
+    data = load_storage_data(json_path)
+    assert data["users"]["alice"]["points"] == 50 - 10 + 5
+    assert len(data["game_results"]) == 4
+    # 不截断日志半行、不把损坏快照改名、不新建任何文件
+    assert _snapshot_files(tmp_path) == before
+
+
+def test_load_storage_data_without_files_creates_nothing(json_path, tmp_path):
+    data = load_storage_data(json_path)
+    assert data["users"] == {} and data["game_results"] == []
+    assert os.listdir(tmp_path) == []
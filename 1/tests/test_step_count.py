@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("pygame")
+
+from core.timers import TimerScheduler
+from main import MemoryMatchGame
+from modes.simple_mode import SimpleGame
+
+
+@pytest.fixture
+def controller():
+    # 只测试翻牌计步逻辑，不创建窗口和存储
+    controller = MemoryMatchGame.__new__(MemoryMatchGame)
+    controller.current_game = SimpleGame(2, 4)
+    controller.current_game.verbose = False
+    controller.timers = TimerScheduler()
+    controller.step_count = 0
+    controller.points = 0
+    controller.user_logged_in = False
+    controller.waiting_to_hide = False
+    controller.victory_pending = False
+    return controller
+
+
+def test_ignored_flips_do_not_count_as_steps(controller):
+    controller.flip_card(0, 0)
+    assert controller.step_count == 1
+    # 再点同一张已翻开的卡牌是无效翻牌
+    controller.flip_card(0, 0)
+    assert controller.step_count == 1
+    controller.flip_card(0, 1)
+    assert controller.step_count == 2
@@ -0,0 +1,56 @@
+from core.timers import TimerScheduler
+
+
+def test_runs_due_callbacks_in_deadline_order():
+    timers = TimerScheduler()
+    fired = []
+    timers.schedule("b", 200, lambda: fired.append("b"))
+    timers.schedule("a", 100, lambda: fired.append("a"))
+    assert timers.next_deadline() == 100
+    assert timers.run_due(99) == 0
+    assert timers.run_due(250) == 2
+    assert fired == ["a", "b"]
+    assert timers.next_deadline() is None
+
+
+def test_schedule_replaces_timer_with_same_name():
+    timers = TimerScheduler()
+    fired = []
+    timers.schedule("hide", 100, lambda: fired.append("old"))
+    timers.schedule("hide", 300, lambda: fired.append("new"))
+    # 被替换的旧条目不再决定等待时长，也不会触发
+    assert timers.next_deadline() == 300
+    assert timers.run_due(200) == 0
+    assert timers.run_due(300) == 1
+    assert fired == ["new"]
+
+
+def test_cancel_and_cancel_all():
+    timers = TimerScheduler()
+    fired = []
+    timers.schedule("a", 100, lambda: fired.append("a"))
+    timers.schedule("b", 200, lambda: fired.append("b"))
+    timers.cancel("a")
+    timers.cancel("missing")
+    assert not timers.is_scheduled("a")
+    assert timers.is_scheduled("b")
+    assert timers.next_deadline() == 200
+    timers.cancel_all()
+    assert timers.next_deadline() is None
+    assert timers.run_due(1000) == 0
+    assert fired == []
+
+
+def test_callback_can_schedule_another_timer():
+    timers = TimerScheduler()
+    fired = []
+
+    def first():
+        fired.append("first")
+        timers.schedule("second", 150, lambda: fired.append("second"))
+
+    timers.schedule("first", 100, first)
+    assert timers.run_due(100) == 1
+    assert timers.is_scheduled("second")
+    assert timers.run_due(200) == 1
+    assert fired == ["first", "second"]
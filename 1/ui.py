@@ -1,6 +1,169 @@
 import pygame
+from collections import OrderedDict
 from typing import Tuple, Optional, List, Dict, Any
 
+
+class TextSurfaceCache:
+    """
+    文字渲染结果的 LRU 缓存。
+    以 (字体, 文本, 颜色, 抗锯齿) 为键复用 font.render 生成的 Surface，
+    避免每帧重复光栅化同样的文字（中文字形尤其耗时）。
+    返回的 Surface 是共享的，调用方只能 blit，不能修改。
+    """
+
+    def __init__(self, capacity: int = 512):
+        self.capacity = capacity
+        self._surfaces: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text: str, antialias: bool, color) -> pygame.Surface:
+        key = (font, text, tuple(color), bool(antialias))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self._surfaces[key] = surface
+        if len(self._surfaces) > self.capacity:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._surfaces),
+            "capacity": self.capacity,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class BoardLayout:
+    """
+    棋盘布局：按 (rows, cols, 屏幕尺寸) 计算一次卡牌尺寸、间距和起点，
+    渲染与点击检测共用同一份数据，点击定位通过除以步长直接得到行列。
+    """
+
+    def __init__(self, rows: int, cols: int, screen_width: int, screen_height: int):
+        self.rows = rows
+        self.cols = cols
+        self.key = (rows, cols, screen_width, screen_height)
+
+        # 根据网格大小调整卡牌尺寸，确保界面美观
+        if rows <= 4 and cols <= 4:
+            # 简单模式：4x4，使用较大的卡牌
+            card_width, card_height = 100, 120
+            spacing = 15
+        else:
+            # 困难模式：7x7，使用较小的卡牌
+            card_width, card_height = 60, 80
+            spacing = 8
+
+        # 计算总宽度和起始位置，确保居中
+        total_width = cols * (card_width + spacing) - spacing
+        total_height = rows * (card_height + spacing) - spacing
+        start_x = (screen_width - total_width) // 2
+        start_y = 100  # HUD下方
+
+        # 确保不会超出屏幕
+        max_y = start_y + total_height
+        if max_y > screen_height - 120:  # 留出按钮空间
+            # 如果超出，缩小卡牌尺寸
+            scale = (screen_height - 120 - start_y) / total_height
+            card_width = int(card_width * scale)
+            card_height = int(card_height * scale)
+            spacing = int(spacing * scale)
+            total_width = cols * (card_width + spacing) - spacing
+            start_x = (screen_width - total_width) // 2
+
+        self.card_width = card_width
+        self.card_height = card_height
+        self.spacing = spacing
+        self.start_x = start_x
+        self.start_y = start_y
+        self.pitch_x = card_width + spacing
+        self.pitch_y = card_height + spacing
+
+        # 按钮位置：卡牌网格下方，且不超出屏幕
+        grid_bottom = start_y + rows * self.pitch_y - spacing
+        self.button_y = min(grid_bottom + 20, screen_height - 50)
+
+    def cell_position(self, row: int, col: int) -> Tuple[int, int]:
+        """卡牌左上角坐标"""
+        return self.start_x + col * self.pitch_x, self.start_y + row * self.pitch_y
+
+    def cell_at(self, pos) -> Optional[Tuple[int, int]]:
+        """由屏幕坐标直接算出所在卡牌 (row, col)，落在间隙或网格外返回 None"""
+        dx = pos[0] - self.start_x
+        dy = pos[1] - self.start_y
+        if dx < 0 or dy < 0:
+            return None
+        col, offset_x = divmod(dx, self.pitch_x)
+        row, offset_y = divmod(dy, self.pitch_y)
+        if row >= self.rows or col >= self.cols:
+            return None
+        if offset_x >= self.card_width or offset_y >= self.card_height:
+            return None  # 点在卡牌之间的间隙上
+        return row, col
+
+
+class CardSpriteAtlas:
+    """
+    卡牌精灵图集：按当前卡牌尺寸预先绘制好背面、各图案正面和已配对三类 Surface，
+    渲染棋盘时只需批量 blit，不再每帧绘制圆角矩形。
+    正面按图案首次出现时生成并缓存；卡牌尺寸（布局缩放）变化时整体重建。
+    """
+
+    def __init__(self, colors: Dict[str, Tuple], font, render_text):
+        self.colors = colors
+        self.font = font
+        self.render_text = render_text
+        self.size: Optional[Tuple[int, int]] = None
+        self.back: Optional[pygame.Surface] = None
+        self.matched: Optional[pygame.Surface] = None
+        self.fronts: Dict[str, pygame.Surface] = {}
+
+    def ensure_size(self, width: int, height: int):
+        """卡牌尺寸变化时重建图集"""
+        if self.size == (width, height):
+            return
+        self.size = (width, height)
+        self.fronts = {}
+        self.back = self._build(self.colors['card_back'])
+        self.matched = self._build(self.colors['matched'], "✓")
+
+    def _build(self, color, label: Optional[str] = None) -> pygame.Surface:
+        width, height = self.size
+        # 使用带透明通道的 Surface，圆角外的区域保持透明
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        pygame.draw.rect(surface, color, (0, 0, width, height), border_radius=8)
+        pygame.draw.rect(surface, (50, 50, 50), (0, 0, width, height), 2, border_radius=8)
+        if label is not None:
+            text = self.render_text(self.font, label, True, (0, 0, 0))
+            surface.blit(text, text.get_rect(center=(width // 2, height // 2)))
+        return surface
+
+    def get_sprite(self, card_id, is_flipped: bool, is_matched: bool) -> pygame.Surface:
+        """返回卡牌当前状态对应的精灵"""
+        if is_matched:
+            return self.matched
+        if not is_flipped:
+            return self.back
+        key = str(card_id)
+        sprite = self.fronts.get(key)
+        if sprite is None:
+            sprite = self._build(self.colors['card_front'], key)
+            self.fronts[key] = sprite
+        return sprite
+
+
 class GameUI:
     """游戏界面渲染器"""
 
@@ -33,6 +196,9 @@ class GameUI:
             self.chinese_button_font = pygame.font.Font(None, 28)
             self.chinese_title_font = pygame.font.Font(None, 72)
 
+        # 文字 Surface 缓存（所有 render_* 方法共用）
+        self.text_cache = TextSurfaceCache()
+
         # 定义颜色方案
         self.colors = {
             'background': (135, 206, 235),         # 天蓝色背景
@@ -54,6 +220,12 @@ class GameUI:
             'message_text': (255, 255, 255),       # 白色消息文字
         }
         
+        # 棋盘布局缓存（渲染与点击检测共用）
+        self.board_layout: Optional[BoardLayout] = None
+
+        # 卡牌精灵图集（按卡牌尺寸惰性构建）
+        self.card_atlas = CardSpriteAtlas(self.colors, self.card_font, self.render_text)
+
         # 初始化按钮布局
         self.init_buttons()
         self.init_login_inputs()
@@ -63,6 +235,18 @@ class GameUI:
         self.message = None
         self.message_timer = 0
         self.message_duration = 3000  # 消息显示持续时间（毫秒）
+        self.timers = None  # 主控制器注入的 TimerScheduler
+
+        # 重绘标记：只有界面内容可能变化时才需要重新渲染
+        self.dirty = True
+
+        # 脏矩形模式：游戏界面只把变化的卡牌、HUD、按钮区域提交到屏幕
+        # （软件渲染/远程桌面环境下整屏 flip 代价很高）
+        self.dirty_rects_enabled = True
+        self.frame_key = None      # 上一次整屏绘制时的画面结构
+        self.frame_board = False   # 上一次整屏绘制是否画了卡牌网格
+        self.frame_hud: Dict[str, Tuple[str, pygame.Rect]] = {}
+        self.frame_buttons: Dict[str, Tuple[str, bool]] = {}
         
         # 输入框状态
         self.login_username = ""
@@ -230,48 +414,9 @@ class GameUI:
     def get_game_action(self, mouse_pos, current_game):
         """获取游戏界面点击动作（按钮检测）"""
         # 注意：这个方法只检测按钮，不检测卡牌
-        # 按钮位置需要与render_game_interface中的位置一致
-        # 由于按钮位置是动态计算的，我们需要重新计算
-        
-        # 计算按钮位置（与render_game_interface中的逻辑完全一致）
-        button_y = 500  # 默认位置
-        if current_game and hasattr(current_game, 'get_grid_state'):
-            grid_state = current_game.get_grid_state()
-            rows = len(grid_state)
-            cols = len(grid_state[0]) if rows > 0 else 0
-            
-            # 使用与render_game_interface相同的卡牌尺寸计算
-            if rows <= 4 and cols <= 4:
-                card_width, card_height = 100, 120
-                spacing = 15
-            else:
-                card_width, card_height = 60, 80
-                spacing = 8
-            
-            # 计算总宽度和起始位置，确保居中（与render_game_interface一致）
-            total_width = cols * (card_width + spacing) - spacing
-            total_height = rows * (card_height + spacing) - spacing
-            start_x = (self.width - total_width) // 2
-            start_y = 100  # HUD下方
-            
-            # 确保不会超出屏幕（与render_game_interface一致）
-            max_y = start_y + total_height
-            if max_y > self.height - 120:  # 留出按钮空间
-                # 如果超出，缩小卡牌尺寸
-                scale = (self.height - 120 - start_y) / total_height
-                card_width = int(card_width * scale)
-                card_height = int(card_height * scale)
-                spacing = int(spacing * scale)
-                total_width = cols * (card_width + spacing) - spacing
-                start_x = (self.width - total_width) // 2
-                total_height = rows * (card_height + spacing) - spacing
-            
-            # 计算按钮位置，确保在卡牌网格下方（与render_game_interface一致）
-            grid_bottom = start_y + rows * (card_height + spacing) - spacing
-            button_y = grid_bottom + 20
-            # 确保按钮不会超出屏幕
-            if button_y > self.height - 50:
-                button_y = self.height - 50
+        # 按钮位置来自与 render_game_interface 共用的棋盘布局
+        layout = self.get_board_layout(current_game)
+        button_y = layout.button_y if layout is not None else 500
         
         # 按钮位置（与render_game_interface一致）
         delay_button = pygame.Rect(50, button_y, 100, 40)
@@ -342,8 +487,44 @@ class GameUI:
         return self.register_password
     
 
+    def render_text(self, font, text: str, antialias: bool, color) -> pygame.Surface:
+        """渲染文字（带缓存），参数顺序与 font.render 一致"""
+        return self.text_cache.render(font, text, antialias, color)
+
+    def get_text_cache_stats(self) -> Dict[str, Any]:
+        """文字缓存命中/未命中统计"""
+        return self.text_cache.stats()
+
+    def invalidate(self):
+        """标记界面需要重绘"""
+        self.dirty = True
+
+    def get_message_deadline(self) -> Optional[int]:
+        """当前消息的过期时刻（pygame ticks），没有消息时返回 None"""
+        if not self.message:
+            return None
+        return self.message_timer + self.message_duration
+
+    def expire_message(self, now: int):
+        """消息到期后清除并标记重绘"""
+        deadline = self.get_message_deadline()
+        if deadline is not None and now >= deadline:
+            self.message = None
+            self.invalidate()
+
     def render(self, game_state: str, current_game, waiting_to_hide: bool, elapsed_time: int, step_count: int, points: int, user_logged_in: bool, username: str, user_items=None):
         """根据游戏状态渲染界面"""
+        # 脏矩形模式：游戏进行中、没有消息浮层且画面结构未变时，只提交变化的区域
+        layout = self.get_board_layout(current_game) if game_state == "game" else None
+        frame_key = (game_state, id(current_game), layout.key if layout else None, self.message)
+        if (self.dirty_rects_enabled and game_state == "game" and layout is not None
+                and self.message is None and frame_key == self.frame_key and self.frame_board):
+            dirty_rects = self.render_game_partial(current_game, elapsed_time, step_count, points)
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+            self.dirty = False
+            return
+
         self.screen.fill(self.colors['background'])
 
         if game_state == "menu":
@@ -376,13 +557,16 @@ class GameUI:
                 self.render_message(self.message)
             else:
                 self.message = None  # 消息超时，清除
+                frame_key = None
 
         pygame.display.flip()
+        self.frame_key = frame_key
+        self.dirty = False
 
     def render_menu(self, user_logged_in: bool = False):
         """渲染主菜单界面，根据登录状态显示不同按钮"""
         # 绘制标题
-        title_text = self.chinese_title_font.render("*记忆迷宫*", True, (50, 50, 150))
+        title_text = self.render_text(self.chinese_title_font, "*记忆迷宫*", True, (50, 50, 150))
         title_rect = title_text.get_rect(center=(self.width // 2, 150))
         self.screen.blit(title_text, title_rect)
 
@@ -403,7 +587,7 @@ class GameUI:
             pygame.draw.rect(self.screen, bg_color, button_rect, border_radius=10)
             pygame.draw.rect(self.screen, (50, 50, 50), button_rect, 2, border_radius=10)
             label = labels.get(action_id, action_id)
-            text_surface = self.chinese_button_font.render(label, True, self.colors['text'])
+            text_surface = self.render_text(self.chinese_button_font, label, True, self.colors['text'])
             text_rect = text_surface.get_rect(center=button_rect.center)
             self.screen.blit(text_surface, text_rect)
 
@@ -411,7 +595,7 @@ class GameUI:
         """渲染登录界面"""
         self.screen.fill(self.colors['background'])
         # 绘制标题
-        title_text = self.chinese_title_font.render("登录", True, (50, 50, 150))
+        title_text = self.render_text(self.chinese_title_font, "登录", True, (50, 50, 150))
         title_rect = title_text.get_rect(center=(self.width // 2, 200))
         self.screen.blit(title_text, title_rect)
         # 将标签与输入框放在同一水平线上
@@ -420,7 +604,7 @@ class GameUI:
 
         # 用户名行
         username_y = 300
-        username_label_surf = self.chinese_small_font.render("用户名:", True, self.colors['text'])
+        username_label_surf = self.render_text(self.chinese_small_font, "用户名:", True, self.colors['text'])
         label_w, label_h = self.input_font.size("用户名:")
         total_w = label_w + gap + input_w
         start_x = (self.width - total_w) // 2
@@ -444,13 +628,13 @@ class GameUI:
                     display_text = display_text[1:]
                     text_width, _ = self.input_font.size("..." + display_text)
                 display_text = "..." + display_text
-            text_surface = self.input_font.render(display_text, True, (0, 0, 0))
+            text_surface = self.render_text(self.input_font, display_text, True, (0, 0, 0))
             text_rect = text_surface.get_rect(midleft=(self.login_username_input.x + 5, self.login_username_input.centery))
             self.screen.blit(text_surface, text_rect)
 
         # 密码行
         password_y = username_y + 60
-        password_label_surf = self.chinese_small_font.render("密码:", True, self.colors['text'])
+        password_label_surf = self.render_text(self.chinese_small_font, "密码:", True, self.colors['text'])
         label_w2, label_h2 = self.input_font.size("密码:")
         label_x2 = start_x
         label_y2 = password_y + (input_h - label_h2) // 2
@@ -472,7 +656,7 @@ class GameUI:
                     password_display = password_display[1:]
                     text_width, _ = self.input_font.size("..." + password_display)
                 password_display = "..." + password_display
-            text_surface = self.input_font.render(password_display, True, (0, 0, 0))
+            text_surface = self.render_text(self.input_font, password_display, True, (0, 0, 0))
             text_rect = text_surface.get_rect(midleft=(self.login_password_input.x + 5, self.login_password_input.centery))
             self.screen.blit(text_surface, text_rect)
         
@@ -486,7 +670,7 @@ class GameUI:
             pygame.draw.rect(self.screen, bg_color, button_rect, border_radius=10)
             pygame.draw.rect(self.screen, (50, 50, 50), button_rect, 2, border_radius=10)
             button_label = "登录" if button_id == "login" else "返回"
-            text_surface = self.chinese_button_font.render(button_label, True, self.colors['text'])
+            text_surface = self.render_text(self.chinese_button_font, button_label, True, self.colors['text'])
             text_rect = text_surface.get_rect(center=button_rect.center)
             self.screen.blit(text_surface, text_rect)
 
@@ -495,7 +679,7 @@ class GameUI:
         self.screen.fill(self.colors['background'])
         
         # 绘制标题
-        title_text = self.chinese_title_font.render("注册", True, (50, 50, 150))
+        title_text = self.render_text(self.chinese_title_font, "注册", True, (50, 50, 150))
         title_rect = title_text.get_rect(center=(self.width // 2, 200))
         self.screen.blit(title_text, title_rect)
         
@@ -505,7 +689,7 @@ class GameUI:
 
         # 用户名行
         username_y = 300
-        username_label_surf = self.chinese_small_font.render("用户名:", True, self.colors['text'])
+        username_label_surf = self.render_text(self.chinese_small_font, "用户名:", True, self.colors['text'])
         label_w, label_h = self.input_font.size("用户名:")
         total_w = label_w + gap + input_w
         start_x = (self.width - total_w) // 2
@@ -529,13 +713,13 @@ class GameUI:
                     display_text = display_text[1:]
                     text_width, _ = self.input_font.size("..." + display_text)
                 display_text = "..." + display_text
-            text_surface = self.input_font.render(display_text, True, (0, 0, 0))
+            text_surface = self.render_text(self.input_font, display_text, True, (0, 0, 0))
             text_rect = text_surface.get_rect(midleft=(self.register_username_input.x + 5, self.register_username_input.centery))
             self.screen.blit(text_surface, text_rect)
 
         # 密码行（移除邮箱行）
         password_y = username_y + 60
-        password_label_surf = self.chinese_small_font.render("密码:", True, self.colors['text'])
+        password_label_surf = self.render_text(self.chinese_small_font, "密码:", True, self.colors['text'])
         label_w2, label_h2 = self.input_font.size("密码:")
         label_x2 = start_x
         label_y2 = password_y + (input_h - label_h2) // 2
@@ -557,7 +741,7 @@ class GameUI:
                     password_display = password_display[1:]
                     text_width, _ = self.input_font.size("..." + password_display)
                 password_display = "..." + password_display
-            text_surface = self.input_font.render(password_display, True, (0, 0, 0))
+            text_surface = self.render_text(self.input_font, password_display, True, (0, 0, 0))
             text_rect = text_surface.get_rect(midleft=(self.register_password_input.x + 5, self.register_password_input.centery))
             self.screen.blit(text_surface, text_rect)
         
@@ -571,7 +755,7 @@ class GameUI:
             pygame.draw.rect(self.screen, bg_color, button_rect, border_radius=10)
             pygame.draw.rect(self.screen, (50, 50, 50), button_rect, 2, border_radius=10)
             button_label = "注册" if button_id == "register" else "返回"
-            text_surface = self.chinese_button_font.render(button_label, True, self.colors['text'])
+            text_surface = self.render_text(self.chinese_button_font, button_label, True, self.colors['text'])
             text_rect = text_surface.get_rect(center=button_rect.center)
             self.screen.blit(text_surface, text_rect)
 
@@ -580,12 +764,12 @@ class GameUI:
         self.screen.fill(self.colors['background'])
         
         # 绘制标题
-        title_text = self.chinese_title_font.render("商城", True, (50, 50, 150))
+        title_text = self.render_text(self.chinese_title_font, "商城", True, (50, 50, 150))
         title_rect = title_text.get_rect(center=(self.width // 2, 100))
         self.screen.blit(title_text, title_rect)
         
         # 显示用户当前积分
-        points_text = self.chinese_font.render(f"当前积分: {points}", True, (50, 150, 50))
+        points_text = self.render_text(self.chinese_font, f"当前积分: {points}", True, (50, 150, 50))
         points_rect = points_text.get_rect(center=(self.width // 2, 150))
         self.screen.blit(points_text, points_rect)
         
@@ -614,10 +798,10 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, buy_delay_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), buy_delay_button, 2, border_radius=10)
-        delay_text = self.chinese_button_font.render(f"延时道具 ({item_costs['delay']['cost']}积分)", True, self.colors['text'])
+        delay_text = self.render_text(self.chinese_button_font, f"延时道具 ({item_costs['delay']['cost']}积分)", True, self.colors['text'])
         delay_rect = delay_text.get_rect(center=(buy_delay_button.centerx, buy_delay_button.y + 15))
         self.screen.blit(delay_text, delay_rect)
-        delay_desc = self.menu_font.render(f"{item_costs['delay']['desc']} | 拥有: {user_items.get('delay', 0)}", True, (100, 100, 100))
+        delay_desc = self.render_text(self.menu_font, f"{item_costs['delay']['desc']} | 拥有: {user_items.get('delay', 0)}", True, (100, 100, 100))
         delay_desc_rect = delay_desc.get_rect(center=(buy_delay_button.centerx, buy_delay_button.y + 40))
         self.screen.blit(delay_desc, delay_desc_rect)
         
@@ -628,10 +812,10 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, buy_block_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), buy_block_button, 2, border_radius=10)
-        block_text = self.chinese_button_font.render(f"阻挡道具 ({item_costs['block']['cost']}积分)", True, self.colors['text'])
+        block_text = self.render_text(self.chinese_button_font, f"阻挡道具 ({item_costs['block']['cost']}积分)", True, self.colors['text'])
         block_rect = block_text.get_rect(center=(buy_block_button.centerx, buy_block_button.y + 15))
         self.screen.blit(block_text, block_rect)
-        block_desc = self.menu_font.render(f"{item_costs['block']['desc']} | 拥有: {user_items.get('block', 0)}", True, (100, 100, 100))
+        block_desc = self.render_text(self.menu_font, f"{item_costs['block']['desc']} | 拥有: {user_items.get('block', 0)}", True, (100, 100, 100))
         block_desc_rect = block_desc.get_rect(center=(buy_block_button.centerx, buy_block_button.y + 40))
         self.screen.blit(block_desc, block_desc_rect)
         
@@ -642,10 +826,10 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, buy_reveal_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), buy_reveal_button, 2, border_radius=10)
-        reveal_text = self.chinese_button_font.render(f"翻牌道具 ({item_costs['reveal']['cost']}积分)", True, self.colors['text'])
+        reveal_text = self.render_text(self.chinese_button_font, f"翻牌道具 ({item_costs['reveal']['cost']}积分)", True, self.colors['text'])
         reveal_rect = reveal_text.get_rect(center=(buy_reveal_button.centerx, buy_reveal_button.y + 15))
         self.screen.blit(reveal_text, reveal_rect)
-        reveal_desc = self.menu_font.render(f"{item_costs['reveal']['desc']} | 拥有: {user_items.get('reveal', 0)}", True, (100, 100, 100))
+        reveal_desc = self.render_text(self.menu_font, f"{item_costs['reveal']['desc']} | 拥有: {user_items.get('reveal', 0)}", True, (100, 100, 100))
         reveal_desc_rect = reveal_desc.get_rect(center=(buy_reveal_button.centerx, buy_reveal_button.y + 40))
         self.screen.blit(reveal_desc, reveal_desc_rect)
         
@@ -656,7 +840,7 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, back_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), back_button, 2, border_radius=10)
-        back_text = self.chinese_button_font.render("返回", True, self.colors['text'])
+        back_text = self.render_text(self.chinese_button_font, "返回", True, self.colors['text'])
         back_rect = back_text.get_rect(center=back_button.center)
         self.screen.blit(back_text, back_rect)
 
@@ -664,11 +848,11 @@ class GameUI:
         """渲染历史记录界面"""
         self.screen.fill(self.colors['background'])
         # 绘制标题
-        title_text = self.chinese_title_font.render("历史记录", True, (50, 50, 150))
+        title_text = self.render_text(self.chinese_title_font, "历史记录", True, (50, 50, 150))
         title_rect = title_text.get_rect(center=(self.width // 2, 200))
         self.screen.blit(title_text, title_rect)
         # 提示无数据
-        no_data_text = self.menu_font.render("暂无历史记录", True, self.colors['text'])
+        no_data_text = self.render_text(self.menu_font, "暂无历史记录", True, self.colors['text'])
         no_data_rect = no_data_text.get_rect(center=(self.width // 2, 400))
         self.screen.blit(no_data_text, no_data_rect)
         # 返回按钮
@@ -680,87 +864,28 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, back_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), back_button, 2, border_radius=10)
-        back_text = self.chinese_button_font.render("返回", True, self.colors['text'])
+        back_text = self.render_text(self.chinese_button_font, "返回", True, self.colors['text'])
         back_rect = back_text.get_rect(center=back_button.center)
         self.screen.blit(back_text, back_rect)
 
-    def render_game_interface(self, current_game, waiting_to_hide: bool, elapsed_time: int, step_count: int, points: int):
-        """渲染游戏界面，包括计时器、步数、卡牌等"""
-        # 绘制背景
-        self.screen.fill(self.colors['background'])
-        # 绘制HUD（计时器、步数、积分）
+    def get_game_hud_items(self, current_game, elapsed_time: int, step_count: int, points: int):
+        """HUD 各部件 (名称, 文本, 位置)"""
         hud_y = 20
-        
         # 检查是否是困难模式，如果是则显示剩余时间
         if hasattr(current_game, 'get_remaining_time_ms'):
-            remaining_time_ms = current_game.get_remaining_time_ms()
-            remaining_time_sec = remaining_time_ms // 1000
-            timer_text = self.menu_font.render(f"剩余时间: {remaining_time_sec} 秒", True, self.colors['text'])
+            remaining_time_sec = current_game.get_remaining_time_ms() // 1000
+            timer_label = f"剩余时间: {remaining_time_sec} 秒"
         else:
             # 简单模式显示已用时间
-            timer_text = self.menu_font.render(f"时间: {elapsed_time} 秒", True, self.colors['text'])
-        
-        self.screen.blit(timer_text, (50, hud_y))
-        steps_text = self.menu_font.render(f"步数: {step_count}", True, self.colors['text'])
-        self.screen.blit(steps_text, (250, hud_y))
-        points_text = self.menu_font.render(f"积分: {points}", True, self.colors['text'])
-        self.screen.blit(points_text, (450, hud_y))
-        # 渲染卡牌网格
-        if hasattr(current_game, 'get_grid_state'):
-            grid_state = current_game.get_grid_state()
-            rows = len(grid_state)
-            cols = len(grid_state[0]) if rows > 0 else 0
-            
-            # 根据网格大小调整卡牌尺寸，确保界面美观
-            if rows <= 4 and cols <= 4:
-                # 简单模式：4x4，使用较大的卡牌
-                card_width, card_height = 100, 120
-                spacing = 15
-            else:
-                # 困难模式：7x7，使用较小的卡牌
-                card_width, card_height = 60, 80
-                spacing = 8
-            
-            # 计算总宽度和起始位置，确保居中
-            total_width = cols * (card_width + spacing) - spacing
-            total_height = rows * (card_height + spacing) - spacing
-            start_x = (self.width - total_width) // 2
-            start_y = 100  # HUD下方
-            
-            # 确保不会超出屏幕
-            max_y = start_y + total_height
-            if max_y > self.height - 120:  # 留出按钮空间
-                # 如果超出，缩小卡牌尺寸
-                scale = (self.height - 120 - start_y) / total_height
-                card_width = int(card_width * scale)
-                card_height = int(card_height * scale)
-                spacing = int(spacing * scale)
-                total_width = cols * (card_width + spacing) - spacing
-                start_x = (self.width - total_width) // 2
-            
-            for r in range(rows):
-                for c in range(cols):
-                    card_id, is_flipped, is_matched = grid_state[r][c]
-                    x = start_x + c * (card_width + spacing)
-                    y = start_y + r * (card_height + spacing)
-                    self.render_single_card(x, y, card_width, card_height, card_id, is_flipped, is_matched)
-            
-            # 计算按钮位置，确保在卡牌网格下方
-            grid_bottom = start_y + rows * (card_height + spacing) - spacing
-            button_y = grid_bottom + 20
-            # 确保按钮不会超出屏幕
-            if button_y > self.height - 50:
-                button_y = self.height - 50
-        else:
-            button_y = 500
-        
-        # 渲染游戏按钮
-        delay_button = pygame.Rect(50, button_y, 100, 40)
-        block_button = pygame.Rect(160, button_y, 100, 40)
-        restart_button = pygame.Rect(270, button_y, 100, 40)
-        menu_button = pygame.Rect(380, button_y, 100, 40)
-        mouse_pos = pygame.mouse.get_pos()
-        
+            timer_label = f"时间: {elapsed_time} 秒"
+        return [
+            ("timer", timer_label, (50, hud_y)),
+            ("steps", f"步数: {step_count}", (250, hud_y)),
+            ("points", f"积分: {points}", (450, hud_y)),
+        ]
+
+    def get_game_buttons(self, current_game, button_y: int):
+        """游戏界面按钮 (名称, 区域, 文本)"""
         # 获取道具数量（仅困难模式显示）
         delay_count = 0
         block_count = 0
@@ -768,84 +893,131 @@ class GameUI:
             counts = current_game.get_item_counts()
             delay_count = counts.get('delay', 0)
             block_count = counts.get('block', 0)
-        
-        # 延时按钮
-        if delay_button.collidepoint(mouse_pos):
-            bg_color = self.colors['button_hover']
+        return [
+            ("delay", pygame.Rect(50, button_y, 100, 40), f"延时({delay_count})"),
+            ("block", pygame.Rect(160, button_y, 100, 40), f"阻挡({block_count})"),
+            ("restart", pygame.Rect(270, button_y, 100, 40), "重启"),
+            ("menu", pygame.Rect(380, button_y, 100, 40), "菜单"),
+        ]
+
+    def draw_hud_text(self, name: str, label: str, pos) -> pygame.Rect:
+        """绘制一个 HUD 文本部件，返回本次覆盖的屏幕区域（含上一帧文字的区域）"""
+        text_surface = self.render_text(self.menu_font, label, True, self.colors['text'])
+        rect = text_surface.get_rect(topleft=pos)
+        area = rect
+        previous = self.frame_hud.get(name)
+        if previous is not None:
+            area = rect.union(previous[1])
+            self.screen.fill(self.colors['background'], area)
+        self.screen.blit(text_surface, rect)
+        self.frame_hud[name] = (label, rect)
+        return area
+
+    def draw_game_button(self, name: str, rect: pygame.Rect, label: str, hovered: bool):
+        """绘制一个游戏界面按钮"""
+        bg_color = self.colors['button_hover'] if hovered else self.colors['button']
+        pygame.draw.rect(self.screen, bg_color, rect, border_radius=10)
+        pygame.draw.rect(self.screen, (50, 50, 50), rect, 2, border_radius=10)
+        text_surface = self.render_text(self.chinese_button_font, label, True, self.colors['text'])
+        self.screen.blit(text_surface, text_surface.get_rect(center=rect.center))
+        self.frame_buttons[name] = (label, hovered)
+
+    def get_flat_cells(self, current_game) -> List[Tuple[str, bool, bool]]:
+        """按行优先展开的卡牌状态列表"""
+        cells = []
+        for row in current_game.get_grid_state():
+            cells.extend(row)
+        return cells
+
+    def render_game_interface(self, current_game, waiting_to_hide: bool, elapsed_time: int, step_count: int, points: int):
+        """渲染游戏界面，包括计时器、步数、卡牌等"""
+        # 绘制背景
+        self.screen.fill(self.colors['background'])
+        # 绘制HUD（计时器、步数、积分）
+        self.frame_hud = {}
+        for name, label, pos in self.get_game_hud_items(current_game, elapsed_time, step_count, points):
+            self.draw_hud_text(name, label, pos)
+        # 渲染卡牌网格
+        layout = self.get_board_layout(current_game)
+        self.frame_board = False
+        if layout is not None:
+            cells = self.get_flat_cells(current_game)
+            # 整屏已按当前状态绘制，之前累积的变化位置不再需要局部重绘
+            current_game.pop_changed_positions()
+            
+            # 从图集中取出每张卡牌的精灵，一次性批量绘制
+            self.card_atlas.ensure_size(layout.card_width, layout.card_height)
+            get_sprite = self.card_atlas.get_sprite
+            card_blits = []
+            for index, (card_id, is_flipped, is_matched) in enumerate(cells):
+                r, c = divmod(index, layout.cols)
+                card_blits.append((get_sprite(card_id, is_flipped, is_matched), layout.cell_position(r, c)))
+            self.screen.blits(card_blits, doreturn=False)
+            self.frame_board = True
+            button_y = layout.button_y
         else:
-            bg_color = self.colors['button']
-        pygame.draw.rect(self.screen, bg_color, delay_button, border_radius=10)
-        pygame.draw.rect(self.screen, (50, 50, 50), delay_button, 2, border_radius=10)
-        delay_text = self.chinese_button_font.render(f"延时({delay_count})", True, self.colors['text'])
-        delay_rect = delay_text.get_rect(center=delay_button.center)
-        self.screen.blit(delay_text, delay_rect)
+            button_y = 500
         
-        # 阻挡按钮
-        if block_button.collidepoint(mouse_pos):
-            bg_color = self.colors['button_hover']
-        else:
-            bg_color = self.colors['button']
-        pygame.draw.rect(self.screen, bg_color, block_button, border_radius=10)
-        pygame.draw.rect(self.screen, (50, 50, 50), block_button, 2, border_radius=10)
-        block_text = self.chinese_button_font.render(f"阻挡({block_count})", True, self.colors['text'])
-        block_rect = block_text.get_rect(center=block_button.center)
-        self.screen.blit(block_text, block_rect)
-        if restart_button.collidepoint(mouse_pos):
-            bg_color = self.colors['button_hover']
-        else:
-            bg_color = self.colors['button']
-        pygame.draw.rect(self.screen, bg_color, restart_button, border_radius=10)
-        pygame.draw.rect(self.screen, (50, 50, 50), restart_button, 2, border_radius=10)
-        restart_text = self.chinese_button_font.render("重启", True, self.colors['text'])
-        restart_rect = restart_text.get_rect(center=restart_button.center)
-        self.screen.blit(restart_text, restart_rect)
-        if menu_button.collidepoint(mouse_pos):
-            bg_color = self.colors['button_hover']
-        else:
-            bg_color = self.colors['button']
-        pygame.draw.rect(self.screen, bg_color, menu_button, border_radius=10)
-        pygame.draw.rect(self.screen, (50, 50, 50), menu_button, 2, border_radius=10)
-        menu_text = self.chinese_button_font.render("菜单", True, self.colors['text'])
-        menu_rect = menu_text.get_rect(center=menu_button.center)
-        self.screen.blit(menu_text, menu_rect)
+        # 渲染游戏按钮
+        self.frame_buttons = {}
+        mouse_pos = pygame.mouse.get_pos()
+        for name, rect, label in self.get_game_buttons(current_game, button_y):
+            self.draw_game_button(name, rect, label, rect.collidepoint(mouse_pos))
+
+    def render_game_partial(self, current_game, elapsed_time: int, step_count: int, points: int) -> List[pygame.Rect]:
+        """
+        脏矩形模式：只重绘发生变化的卡牌、HUD 文本和按钮，返回需要提交到屏幕的区域列表。
+        变化的卡牌由游戏在翻牌/配对/盖回/洗牌时记录，不复制整个网格做对比。
+        """
+        dirty_rects: List[pygame.Rect] = []
+        layout = self.get_board_layout(current_game)
+
+        get_sprite = self.card_atlas.get_sprite
+        background = self.colors['background']
+        for r, c in current_game.pop_changed_positions():
+            card = current_game.get_card(r, c)
+            rect = pygame.Rect(layout.cell_position(r, c), (layout.card_width, layout.card_height))
+            # 先用背景色盖掉旧卡牌（圆角处透明），再贴新精灵
+            self.screen.fill(background, rect)
+            self.screen.blit(get_sprite(card.id, card.is_flipped, card.is_matched), rect)
+            dirty_rects.append(rect)
+
+        for name, label, pos in self.get_game_hud_items(current_game, elapsed_time, step_count, points):
+            previous = self.frame_hud.get(name)
+            if previous is None or previous[0] != label:
+                dirty_rects.append(self.draw_hud_text(name, label, pos))
+
+        mouse_pos = pygame.mouse.get_pos()
+        for name, rect, label in self.get_game_buttons(current_game, layout.button_y):
+            hovered = rect.collidepoint(mouse_pos)
+            if self.frame_buttons.get(name) != (label, hovered):
+                self.screen.fill(background, rect)
+                self.draw_game_button(name, rect, label, hovered)
+                dirty_rects.append(rect)
+
+        return dirty_rects
 
     def render_single_card(self, x, y, width, height, card_id, is_flipped, is_matched):
-        """渲染单张卡牌"""
-        if is_matched:
-            color = self.colors['matched']
-        elif is_flipped:
-            color = self.colors['card_front']
-        else:
-            color = self.colors['card_back']
-        # 绘制卡牌背景
-        pygame.draw.rect(self.screen, color, (x, y, width, height), border_radius=8)
-        pygame.draw.rect(self.screen, (50, 50, 50), (x, y, width, height), 2, border_radius=8)
-        # 如果卡牌翻开且未匹配，显示卡牌ID
-        if is_flipped and not is_matched:
-            card_text = self.card_font.render(str(card_id), True, (0, 0, 0))
-            text_rect = card_text.get_rect(center=(x + width // 2, y + height // 2))
-            self.screen.blit(card_text, text_rect)
-        elif is_matched:
-            matched_text = self.card_font.render("✓", True, (0, 0, 0))
-            text_rect = matched_text.get_rect(center=(x + width // 2, y + height // 2))
-            self.screen.blit(matched_text, text_rect)
+        """渲染单张卡牌（使用精灵图集）"""
+        self.card_atlas.ensure_size(width, height)
+        self.screen.blit(self.card_atlas.get_sprite(card_id, is_flipped, is_matched), (x, y))
 
     def render_victory_interface(self, points_earned=0, total_points=0):
         """渲染胜利界面"""
         overlay = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 128))
         self.screen.blit(overlay, (0, 0))
-        victory_text = self.chinese_title_font.render("🎉 恭喜胜利！ 🎉", True, self.colors['victory'])
+        victory_text = self.render_text(self.chinese_title_font, "🎉 恭喜胜利！ 🎉", True, self.colors['victory'])
         victory_rect = victory_text.get_rect(center=(self.width // 2, 200))
         self.screen.blit(victory_text, victory_rect)
         
         # 显示积分奖励信息
         if points_earned > 0:
-            reward_text = self.chinese_font.render(f"获得 {points_earned} 积分！", True, self.colors['text'])
+            reward_text = self.render_text(self.chinese_font, f"获得 {points_earned} 积分！", True, self.colors['text'])
             reward_rect = reward_text.get_rect(center=(self.width // 2, 250))
             self.screen.blit(reward_text, reward_rect)
             
-            total_text = self.chinese_font.render(f"当前总积分: {total_points}", True, self.colors['text'])
+            total_text = self.render_text(self.chinese_font, f"当前总积分: {total_points}", True, self.colors['text'])
             total_rect = total_text.get_rect(center=(self.width // 2, 280))
             self.screen.blit(total_text, total_rect)
         
@@ -858,7 +1030,7 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, restart_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), restart_button, 2, border_radius=10)
-        restart_text = self.chinese_button_font.render("重新开始", True, self.colors['text'])
+        restart_text = self.render_text(self.chinese_button_font, "重新开始", True, self.colors['text'])
         restart_rect = restart_text.get_rect(center=restart_button.center)
         self.screen.blit(restart_text, restart_rect)
         if menu_button.collidepoint(mouse_pos):
@@ -867,7 +1039,7 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, menu_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), menu_button, 2, border_radius=10)
-        menu_text = self.chinese_button_font.render("返回菜单", True, self.colors['text'])
+        menu_text = self.render_text(self.chinese_button_font, "返回菜单", True, self.colors['text'])
         menu_rect = menu_text.get_rect(center=menu_button.center)
         self.screen.blit(menu_text, menu_rect)
 
@@ -876,7 +1048,7 @@ class GameUI:
         overlay = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 128))
         self.screen.blit(overlay, (0, 0))
-        defeat_text = self.chinese_title_font.render("😞 时间到！ 😞", True, self.colors['defeat'])
+        defeat_text = self.render_text(self.chinese_title_font, "😞 时间到！ 😞", True, self.colors['defeat'])
         defeat_rect = defeat_text.get_rect(center=(self.width // 2, 200))
         self.screen.blit(defeat_text, defeat_rect)
         restart_button = pygame.Rect(300, 300, 150, 40)
@@ -888,7 +1060,7 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, restart_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), restart_button, 2, border_radius=10)
-        restart_text = self.chinese_button_font.render("重新开始", True, self.colors['text'])
+        restart_text = self.render_text(self.chinese_button_font, "重新开始", True, self.colors['text'])
         restart_rect = restart_text.get_rect(center=restart_button.center)
         self.screen.blit(restart_text, restart_rect)
         if menu_button.collidepoint(mouse_pos):
@@ -897,14 +1069,14 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, menu_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), menu_button, 2, border_radius=10)
-        menu_text = self.chinese_button_font.render("返回菜单", True, self.colors['text'])
+        menu_text = self.render_text(self.chinese_button_font, "返回菜单", True, self.colors['text'])
         menu_rect = menu_text.get_rect(center=menu_button.center)
         self.screen.blit(menu_text, menu_rect)
 
     def render_leaderboard_interface(self, leaderboard_data):
         """渲染排行榜界面"""
         self.screen.fill(self.colors['background'])
-        title_text = self.chinese_title_font.render("🏆 排行榜 🏆", True, (50, 50, 150))
+        title_text = self.render_text(self.chinese_title_font, "🏆 排行榜 🏆", True, (50, 50, 150))
         title_rect = title_text.get_rect(center=(self.width // 2, 100))
         self.screen.blit(title_text, title_rect)
         y_offset = 200
@@ -917,11 +1089,11 @@ class GameUI:
                 steps = entry.get('steps', 0)
                 score = entry.get('score', 0)
                 entry_text = f"{rank}. {name} - 时间: {time_str} - 步数: {steps} - 得分: {score}"
-                entry_surface = self.menu_font.render(entry_text, True, self.colors['text'])
+                entry_surface = self.render_text(self.menu_font, entry_text, True, self.colors['text'])
                 entry_rect = entry_surface.get_rect(center=(self.width // 2, y_offset + idx * 40))
                 self.screen.blit(entry_surface, entry_rect)
         else:
-            no_data_text = self.menu_font.render("暂无排行榜数据", True, self.colors['text'])
+            no_data_text = self.render_text(self.menu_font, "暂无排行榜数据", True, self.colors['text'])
             no_data_rect = no_data_text.get_rect(center=(self.width // 2, 300))
             self.screen.blit(no_data_text, no_data_rect)
         back_button = pygame.Rect(200, 500, 150, 40)
@@ -933,7 +1105,7 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, back_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), back_button, 2, border_radius=10)
-        back_text = self.chinese_button_font.render("返回", True, self.colors['text'])
+        back_text = self.render_text(self.chinese_button_font, "返回", True, self.colors['text'])
         back_rect = back_text.get_rect(center=back_button.center)
         self.screen.blit(back_text, back_rect)
         if refresh_button.collidepoint(mouse_pos):
@@ -942,7 +1114,7 @@ class GameUI:
             bg_color = self.colors['button']
         pygame.draw.rect(self.screen, bg_color, refresh_button, border_radius=10)
         pygame.draw.rect(self.screen, (50, 50, 50), refresh_button, 2, border_radius=10)
-        refresh_text = self.chinese_button_font.render("刷新", True, self.colors['text'])
+        refresh_text = self.render_text(self.chinese_button_font, "刷新", True, self.colors['text'])
         refresh_rect = refresh_text.get_rect(center=refresh_button.center)
         self.screen.blit(refresh_text, refresh_rect)
 
@@ -953,6 +1125,11 @@ class GameUI:
         else:
             self.message = title
         self.message_timer = pygame.time.get_ticks()
+        # 由主控制器的定时调度器在到期时清除消息，无需每帧轮询
+        if self.timers is not None:
+            self.timers.schedule("message_expiry", self.get_message_deadline(),
+                                 lambda: self.expire_message(pygame.time.get_ticks()))
+        self.invalidate()
     
     def render_message(self, message):
         """渲染消息提示"""
@@ -963,9 +1140,9 @@ class GameUI:
         self.screen.blit(overlay, (0, 0))
         # 使用中文字体渲染消息
         if self.chinese_font_path:
-            msg_surface = self.chinese_font.render(message, True, self.colors['message_text'])
+            msg_surface = self.render_text(self.chinese_font, message, True, self.colors['message_text'])
         else:
-            msg_surface = self.message_font.render(message, True, self.colors['message_text'])
+            msg_surface = self.render_text(self.message_font, message, True, self.colors['message_text'])
         msg_rect = msg_surface.get_rect(center=(self.width // 2, self.height // 2))
         self.screen.blit(msg_surface, msg_rect)
 
@@ -1114,51 +1291,18 @@ class GameUI:
                     if len(self.register_password) < max_length:
                         self.register_password += text
 
+    def get_board_layout(self, current_game) -> Optional[BoardLayout]:
+        """获取当前棋盘的布局（按行列数和屏幕尺寸缓存，只在变化时重新计算）"""
+        if not current_game or not hasattr(current_game, 'rows') or not hasattr(current_game, 'cols'):
+            return None
+        key = (current_game.rows, current_game.cols, self.width, self.height)
+        if self.board_layout is None or self.board_layout.key != key:
+            self.board_layout = BoardLayout(current_game.rows, current_game.cols, self.width, self.height)
+        return self.board_layout
+
     def get_card_position(self, mouse_pos, current_game):
-        """根据鼠标位置获取卡牌位置（必须与渲染逻辑一致）"""
-        if not current_game or not hasattr(current_game, 'get_grid_state'):
+        """根据鼠标位置获取卡牌位置（与渲染共用同一布局，直接算术定位）"""
+        layout = self.get_board_layout(current_game)
+        if layout is None:
             return None
-        
-        grid_state = current_game.get_grid_state()
-        rows = len(grid_state)
-        cols = len(grid_state[0]) if rows > 0 else 0
-        
-        # 使用与渲染相同的尺寸计算逻辑
-        if rows <= 4 and cols <= 4:
-            # 简单模式：4x4，使用较大的卡牌
-            card_width, card_height = 100, 120
-            spacing = 15
-        else:
-            # 困难模式：7x7，使用较小的卡牌
-            card_width, card_height = 60, 80
-            spacing = 8
-        
-        # 计算总宽度和起始位置，确保居中（与渲染逻辑一致）
-        total_width = cols * (card_width + spacing) - spacing
-        total_height = rows * (card_height + spacing) - spacing
-        start_x = (self.width - total_width) // 2
-        start_y = 100  # HUD下方
-        
-        # 确保不会超出屏幕（与渲染逻辑一致）
-        max_y = start_y + total_height
-        if max_y > self.height - 120:  # 留出按钮空间
-            # 如果超出，缩小卡牌尺寸
-            scale = (self.height - 120 - start_y) / total_height
-            card_width = int(card_width * scale)
-            card_height = int(card_height * scale)
-            spacing = int(spacing * scale)
-            total_width = cols * (card_width + spacing) - spacing
-            start_x = (self.width - total_width) // 2
-        
-        mouse_x, mouse_y = mouse_pos
-        
-        # 检查点击是否在卡牌区域内
-        for r in range(rows):
-            for c in range(cols):
-                card_x = start_x + c * (card_width + spacing)
-                card_y = start_y + r * (card_height + spacing)
-                card_rect = pygame.Rect(card_x, card_y, card_width, card_height)
-                if card_rect.collidepoint(mouse_pos):
-                    return (r, c)
-        
-        return None
\ No newline at end of file
+        return layout.cell_at(mouse_pos)